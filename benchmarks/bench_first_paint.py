@@ -0,0 +1,59 @@
+"""
+Time from setting a highlighter to the first paint with the visible lines
+highlighted, against the time a whole-document lexing pass takes.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_first_paint
+"""
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, PygmentsSyntaxHighlighter
+from src.editor.document.piece_table import PieceTable
+
+
+def make_text(line_count):
+    block = (
+        'class Handler{0}(Base):\n'
+        '    """Handles request {0}."""\n'
+        '\n'
+        '    def run(self, value={0}):\n'
+        '        # Scale the value\n'
+        '        return self.scale * value + {0}  # done\n'
+        '\n'
+    )
+    return ''.join(block.format(i) for i in range(line_count // 7))
+
+
+def first_paint(app, text, scroll_fraction):
+    editor = TextEditor(text, 'bench.py')
+    editor.resize(800, 600)
+    editor.show()
+    app.processEvents()
+    scroll_bar = editor.verticalScrollBar()
+    scroll_bar.setValue(int(scroll_bar.maximum() * scroll_fraction))
+    editor.set_highlighter(PygmentsSyntaxHighlighter('python'))
+    while editor.first_highlight_paint_time is None:
+        app.processEvents()
+        time.sleep(0.001)
+    editor.highlight_worker.cancel()
+    editor.close()
+    return editor.first_highlight_paint_time
+
+
+def full_pass(text):
+    start = time.perf_counter()
+    PygmentsSyntaxHighlighter('python').highlight(PieceTable(text))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    print(f"{'lines':>10} {'full pass':>12} {'first paint (top)':>18} {'first paint (middle)':>21}")
+    for line_count in (10_000, 50_000, 100_000):
+        text = make_text(line_count)
+        full = full_pass(text)
+        top = first_paint(app, text, 0.0)
+        middle = first_paint(app, text, 0.5)
+        print(f"{line_count:>10} {full * 1000:>9.0f} ms {top * 1000:>15.1f} ms {middle * 1000:>18.1f} ms")
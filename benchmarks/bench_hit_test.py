@@ -0,0 +1,53 @@
+"""
+Mouse hit testing on a long minified line: the per-character measuring loop
+the mouse handlers used before, against ColumnOffsets' cached offsets, for a
+drag sweeping across the line.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_hit_test
+"""
+import time
+
+from PyQt6.QtGui import QFont, QFontMetrics
+from PyQt6.QtWidgets import QApplication
+
+from src.editor.rendering import ColumnOffsets
+
+LINE_LENGTH = 20_000
+DRAG_EVENTS = 200
+
+
+def make_line():
+    chunk = 'function(a,b){return a.map(function(x){return x*b+1})};var q="\tok";'
+    return (chunk * (LINE_LENGTH // len(chunk) + 1))[:LINE_LENGTH]
+
+
+def loop_column_at(fm, line, x):
+    cumulative_width = 0
+    for i, char in enumerate(line):
+        char_width = fm.horizontalAdvance(char)
+        if cumulative_width + char_width / 2 >= x:
+            return i
+        cumulative_width += char_width
+    return len(line)
+
+
+def drag(hit_test, line, width):
+    start = time.perf_counter()
+    for i in range(DRAG_EVENTS):
+        hit_test(line, width * i / DRAG_EVENTS)
+    return (time.perf_counter() - start) / DRAG_EVENTS
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    for family in ('Monospace', 'Sans Serif'):
+        font = QFont(family, 12)
+        fm = QFontMetrics(font)
+        for name, line in (('ascii', make_line().replace('\t', ' ')), ('tabs', make_line())):
+            offsets = ColumnOffsets(font)
+            width = offsets.x_for(line, len(line))
+            old = drag(lambda line, x: loop_column_at(fm, line, x), line, width)
+            new = drag(offsets.column_at, line, width)
+            print(f"{family:<11} {name:<6} per drag event: loop {old * 1000:8.3f} ms   "
+                  f"offsets {new * 1000:8.3f} ms   ({old / new:,.0f}x)")
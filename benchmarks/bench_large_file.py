@@ -0,0 +1,82 @@
+"""
+Opening a large log file: the time until the first screen is painted, the
+time the background indexing takes to find every line, and scrolling to the
+end once it has, with the memory of the process after each step (on Linux).
+Anonymous memory is what the process allocated; file-backed memory is pages
+of the mapped file, which the system can drop at any time. The log is
+written to a temporary file first.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display),
+optionally with the file size in MB (default 1024):
+    python -m benchmarks.bench_large_file [size_mb]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, cursor_blinker
+from src.editor.document import MappedDocument
+from benchmarks.bench_scroll_paint import interaction_times, report, scroll_by
+
+
+def write_log(path, size):
+    """Write about size bytes of log lines to path."""
+    rng = random.Random(1)
+    lines = [f"2026-10-17 12:{minute:02}:{second:02} INFO worker-{rng.randrange(16)} request "
+             f"id={rng.randrange(10 ** 9)} path=/api/v1/items/{rng.randrange(10 ** 5)} took {rng.randrange(900)} ms\n"
+             for minute in range(60) for second in range(60)]
+    block = ''.join(lines).encode()
+    with open(path, 'wb') as file:
+        for _ in range(size // len(block) + 1):
+            file.write(block)
+
+
+def memory():
+    """Return the resident anonymous and file-backed memory of the process, as text."""
+    try:
+        with open('/proc/self/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+    except OSError:
+        return 'memory not available'
+    anonymous, file_backed = (int(fields[name].split()[0]) // 1024 for name in ('RssAnon', 'RssFile'))
+    return f"memory {anonymous} MB anonymous, {file_backed} MB file-backed"
+
+
+if __name__ == '__main__':
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        write_log(path, size_mb * 1024 * 1024)
+        print(f"{os.path.getsize(path) / 2 ** 20:.0f} MB log, before opening: {memory()}")
+
+        start = time.perf_counter()
+        document = MappedDocument(path)
+        editor = TextEditor(file_path=path, document=document)
+        editor.resize(1000, 800)
+        editor.show()
+        app.processEvents()
+        print(f"{'first screen':<24} {(time.perf_counter() - start) * 1000:8.1f} ms   "
+              f"({document.line_count()} lines indexed)")
+
+        while editor.index_timer.isActive():
+            app.processEvents()
+            time.sleep(0.005)
+        print(f"{'indexed':<24} {(time.perf_counter() - start) * 1000:8.1f} ms   "
+              f"({document.line_count()} lines, {memory()})")
+
+        line_height = editor.font_metrics.line_height
+        scroll_bar = editor.verticalScrollBar()
+        start = time.perf_counter()
+        scroll_bar.setValue(scroll_bar.maximum())
+        app.processEvents()
+        print(f"{'jump to end':<24} {(time.perf_counter() - start) * 1000:8.1f} ms")
+        report('scroll 3 lines', interaction_times(app, editor, scroll_by(editor, 3 * line_height)))
+        print(f"after scrolling: {memory()}")
+        editor.close()
+        document.close()
@@ -0,0 +1,71 @@
+"""
+Editing a file whose second line is 5 MB of minified code: the time to open
+it and to jump into the middle of the line, then typing, arrow keys and
+horizontal scrolling there, with and without soft wrap. A frame budget of
+16.7 ms gives 60 fps.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_long_line
+"""
+import time
+
+from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, cursor_blinker
+from benchmarks.bench_scroll_paint import interaction_times, report
+
+LINE_LENGTH = 5_000_000
+MINIFIED = 'function a(b){return b*2+"x"};var q={k:[1,2,3]};'
+
+
+def make_minified(length):
+    return (MINIFIED * (length // len(MINIFIED) + 1))[:length]
+
+
+def press(editor, key, text=''):
+    def action(frame):
+        editor.keyPressEvent(QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier, text))
+    return action
+
+
+def move_to_middle(editor):
+    editor.cursor_line, editor.cursor_column = 1, LINE_LENGTH // 2
+    editor.ensure_cursor_visible()
+
+
+def scroll_right(editor):
+    def action(frame):
+        scroll_bar = editor.horizontalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + editor.viewport().width() // 4)
+    return action
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    text = 'first\n' + make_minified(LINE_LENGTH) + '\nlast'
+
+    start = time.perf_counter()
+    editor = TextEditor(text, 'bench.js')
+    editor.resize(1000, 800)
+    editor.show()
+    app.processEvents()
+    print(f"{'open':<24} {(time.perf_counter() - start) * 1000:6.1f} ms")
+    editor.setFocus()
+    start = time.perf_counter()
+    move_to_middle(editor)
+    app.processEvents()
+    print(f"{'jump to middle':<24} {(time.perf_counter() - start) * 1000:6.1f} ms")
+
+    report('typing', interaction_times(app, editor, press(editor, Qt.Key.Key_W, 'w')))
+    move_to_middle(editor)
+    report('arrow right', interaction_times(app, editor, press(editor, Qt.Key.Key_Right)))
+    report('scroll right', interaction_times(app, editor, scroll_right(editor)))
+
+    editor.set_word_wrap(True)
+    move_to_middle(editor)
+    app.processEvents()
+    report('typing, wrapped', interaction_times(app, editor, press(editor, Qt.Key.Key_W, 'w')))
+    report('arrow down, wrapped', interaction_times(app, editor, press(editor, Qt.Key.Key_Down)))
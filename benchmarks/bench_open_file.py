@@ -0,0 +1,118 @@
+"""
+Opening a file: reading and decoding it on the GUI thread and then creating
+the editor, against loading it with the DocumentLoader and creating the
+editor from the result. For each, the time until the editor shows the first
+screen highlighted, and the longest the GUI thread went without handling
+events meanwhile, which is how long the window froze. A Python file is
+written to a temporary file first.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display),
+optionally with the file size in MB (default 20):
+    python -m benchmarks.bench_open_file [size_mb]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, PygmentsSyntaxHighlighter, lexer_registry, cursor_blinker
+from src.editor.document import document_loader
+
+
+class StallMeter:
+    """Records the longest gap between turns of the event loop."""
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.setInterval(1)
+        self.timer.timeout.connect(self.tick)
+        self.longest = 0.0
+        self.last = None
+
+    def start(self):
+        self.longest = 0.0
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.longest = max(self.longest, now - self.last)
+        self.last = now
+
+    def stop(self):
+        self.tick()
+        self.timer.stop()
+        return self.longest
+
+
+def write_source(path, size):
+    """Write about size bytes of Python code to path."""
+    block = ''.join(f"def function_{i}(value, *args):\n"
+                    f"    \"\"\"Return value scaled by {i}.\"\"\"\n"
+                    f"    return [value * {i} for _ in args]  # {i:08}\n\n" for i in range(1000))
+    with open(path, 'w', encoding='utf-8') as file:
+        for _ in range(size // len(block) + 1):
+            file.write(block)
+
+
+def open_on_gui_thread(path):
+    """Open the file the way tabs were opened before the DocumentLoader."""
+    for encoding in ('utf-8', 'latin1', 'cp1252', 'ascii'):
+        try:
+            with open(path, 'r', encoding=encoding) as file:
+                content = file.read()
+            break
+        except UnicodeDecodeError:
+            continue
+    editor = TextEditor(content, path)
+    editor.set_highlighter(PygmentsSyntaxHighlighter(lexer_registry.detect_language(path, content)))
+    return editor
+
+
+def open_with_loader(app, path):
+    """Open the file through the DocumentLoader, handling events until it is loaded."""
+    results = []
+    document_loader.finished.connect(results.append)
+    document_loader.load(path)
+    while not results:
+        app.processEvents()
+        time.sleep(0.001)
+    document_loader.finished.disconnect(results.append)
+    loaded = results[0]
+    editor = TextEditor(file_path=path, document=loaded.buffer, line_widths=loaded.line_widths)
+    editor.set_highlighter(loaded.highlighter, loaded.highlighted_lines)
+    return editor
+
+
+def measure(app, name, path, open_editor):
+    lexer_registry.forget(path)
+    meter = StallMeter()
+    meter.start()
+    start = time.perf_counter()
+    editor = open_editor()
+    editor.resize(1000, 800)
+    editor.show()
+    while not editor.highlighter.covers(*editor.visible_lines()):
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} first screen {elapsed * 1000:8.1f} ms   GUI blocked up to {meter.stop() * 1000:8.1f} ms")
+    editor.highlight_worker.cancel()
+    editor.close()
+
+
+if __name__ == '__main__':
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    lexer_registry.get_lexer('python')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.py')
+        write_source(path, size_mb * 1024 * 1024)
+        print(f"{os.path.getsize(path) / 2 ** 20:.0f} MB Python file")
+        measure(app, 'GUI thread', path, lambda: open_on_gui_thread(path))
+        measure(app, 'DocumentLoader', path, lambda: open_with_loader(app, path))
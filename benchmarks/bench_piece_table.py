@@ -0,0 +1,50 @@
+"""
+Edit latency of the piece table buffer versus the old list-of-lines storage.
+
+Run from the repository root:
+    python -m benchmarks.bench_piece_table
+"""
+import time
+
+from src.editor.document.piece_table import PieceTable
+
+EDITS = 2000
+
+
+def make_text(line_count):
+    return '\n'.join(f'{i:08d} INFO request handled in {i % 97} ms' for i in range(line_count))
+
+
+def bench_piece_table(text):
+    buffer = PieceTable(text)
+    pos = buffer.line_start(10) + 5
+    start = time.perf_counter()
+    for i in range(EDITS):
+        buffer.insert(pos + i, 'x')
+        if i % 10 == 9:
+            buffer.insert(pos + i + 1, '\n')
+            buffer.delete((pos + i + 1, pos + i + 2))
+        buffer.line(10)
+    return (time.perf_counter() - start) / EDITS
+
+
+def bench_line_list(text):
+    lines = text.split('\n')
+    start = time.perf_counter()
+    for i in range(EDITS):
+        line = lines[10]
+        lines[10] = line[:5 + i] + 'x' + line[5 + i:]
+        if i % 10 == 9:
+            line = lines[10]
+            lines[10:11] = [line[:6 + i], line[6 + i:]]
+            lines[10:12] = [lines[10] + lines[11]]
+    return (time.perf_counter() - start) / EDITS
+
+
+if __name__ == '__main__':
+    print(f"{'lines':>10} {'piece table':>14} {'line list':>14}")
+    for line_count in (1_000, 10_000, 100_000, 500_000):
+        text = make_text(line_count)
+        pt = bench_piece_table(text)
+        ll = bench_line_list(text)
+        print(f"{line_count:>10} {pt * 1e6:>11.1f} us {ll * 1e6:>11.1f} us")
@@ -0,0 +1,76 @@
+"""
+Starting the editor with a session of restored tabs: the time to build the
+window, until the current tab shows its editor, and until nothing is
+loading any more, with the longest the GUI thread went without handling
+events over that whole period. Python files are written to a temporary
+directory, with a settings file listing them, first.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display),
+optionally with the number of tabs (default 100) and lines per file (default 5000):
+    python -m benchmarks.bench_restore_tabs [tabs] [lines]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, cursor_blinker
+from src.editor.document import document_loader
+from src.ui.window import MainWindow
+from benchmarks.bench_open_file import StallMeter
+
+
+def write_session(directory, tabs, lines):
+    """Write tabs Python files of lines lines each and a settings file restoring them."""
+    block = ''.join(f"def function_{i}(value):\n"
+                    f"    return value * {i}  # {i:08}\n\n" for i in range(lines // 3))
+    open_tabs = []
+    for tab in range(tabs):
+        path = os.path.join(directory, f'module_{tab}.py')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(block)
+        open_tabs.append({"file_path": path, "cursor_position": [lines // 2, 4],
+                          "scroll_position": {"vertical": 0, "horizontal": 0}})
+    settings_file = os.path.join(directory, 'settings.json')
+    with open(settings_file, 'w', encoding='utf-8') as file:
+        json.dump({"editor": {"cursor_blink": False}, "open_tabs": open_tabs}, file)
+    return settings_file
+
+
+def wait_until(app, condition):
+    while not condition():
+        app.processEvents()
+        time.sleep(0.001)
+
+
+if __name__ == '__main__':
+    tabs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    with tempfile.TemporaryDirectory() as directory:
+        MainWindow.SETTINGS_FILE = write_session(directory, tabs, lines)
+        print(f"{tabs} tabs of {lines} lines")
+
+        meter = StallMeter()
+        meter.start()
+        start = time.perf_counter()
+        window = MainWindow()
+        window.show()
+        built = time.perf_counter() - start
+        wait_until(app, lambda: isinstance(window.tab_widget.currentWidget().findChild(TextEditor), TextEditor))
+        current = time.perf_counter() - start
+        wait_until(app, lambda: not document_loader.jobs and not window.prefetch_timer.isActive())
+        idle = time.perf_counter() - start
+        editors = sum(1 for index in range(window.tab_widget.count())
+                      if window.tab_widget.widget(index).findChild(TextEditor))
+
+        print(f"window built          {built * 1000:8.1f} ms")
+        print(f"current tab editable  {current * 1000:8.1f} ms")
+        print(f"nothing loading       {idle * 1000:8.1f} ms   ({editors} editors created)")
+        print(f"GUI blocked up to     {meter.stop() * 1000:8.1f} ms")
+        window.save_settings = lambda: None
+        window.close()
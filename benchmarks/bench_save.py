@@ -0,0 +1,63 @@
+"""
+Saving a file: joining the text and writing it on the GUI thread, the way
+files were saved before the DocumentSaver, against saving it with the
+DocumentSaver. For each, the time until the file is on disk and the longest
+the GUI thread went without handling events meanwhile.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display),
+optionally with the file size in MB (default 100):
+    python -m benchmarks.bench_save [size_mb]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+from src.editor.document import PieceTable, document_saver
+from benchmarks.bench_open_file import StallMeter
+
+
+def make_document(size):
+    """Return a document of about size characters, edited in a few places."""
+    line = "The quick brown fox jumps over the lazy dog, again and again and again.\n"
+    document = PieceTable(line * (size // len(line)))
+    for position in range(0, len(document), len(document) // 8):
+        document.insert(position, "edited ")
+    return document
+
+
+def save_on_gui_thread(app, path, document):
+    with open(path, 'wb') as file:
+        file.write(document.file_format.encode(document.text()))
+
+
+def save_with_saver(app, path, document):
+    results = []
+    document_saver.finished.connect(results.append)
+    document_saver.save(path, document)
+    while not results:
+        app.processEvents()
+        time.sleep(0.001)
+    document_saver.finished.disconnect(results.append)
+    assert results[0].error is None, results[0].error
+
+
+def measure(app, name, path, document, save):
+    meter = StallMeter()
+    meter.start()
+    start = time.perf_counter()
+    save(app, path, document)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} saved in {elapsed * 1000:8.1f} ms   GUI blocked up to {meter.stop() * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    app = QApplication.instance() or QApplication([])
+    document = make_document(size_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.txt')
+        measure(app, 'GUI thread', path, document, save_on_gui_thread)
+        measure(app, 'DocumentSaver', path, document, save_with_saver)
@@ -0,0 +1,123 @@
+"""
+Frame time of an editor repaint while scrolling through a highlighted file,
+and the time to handle and paint a cursor blink, an arrow key press, a drag
+selection growing by one line and a scroll step, the last one also in a
+1M-line file. A frame budget of 16.7 ms gives 60 fps.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_scroll_paint
+"""
+import statistics
+import time
+
+from PyQt6.QtCore import QEvent, QPointF, Qt
+from PyQt6.QtGui import QKeyEvent, QMouseEvent
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, PygmentsSyntaxHighlighter, cursor_blinker
+from benchmarks.bench_first_paint import make_text
+
+FRAMES = 300
+
+
+def settled_editor(app, text):
+    editor = TextEditor(text, 'bench.py')
+    editor.resize(1000, 800)
+    editor.show()
+    editor.set_highlighter(PygmentsSyntaxHighlighter('python'))
+    while (editor.highlight_worker.is_busy() or editor.highlight_timer.isActive()
+           or editor.highlight_slice_timer.isActive() or not editor.highlighter.is_complete()):
+        app.processEvents()
+        time.sleep(0.001)
+    cursor_blinker.set_enabled(False)
+    editor.setFocus()
+    app.processEvents()
+    return editor
+
+
+def frame_times(editor, step):
+    """Repaint FRAMES times, scrolling by step pixels before each frame."""
+    scroll_bar = editor.verticalScrollBar()
+    scroll_bar.setValue(0)
+    viewport = editor.viewport()
+    times = []
+    for frame in range(FRAMES):
+        if step:
+            # Scroll down and back up so cached lines come round again
+            scroll_bar.setValue((frame % 100) * step if frame % 200 < 100 else (100 - frame % 100) * step)
+        else:
+            editor.blink_cursor()
+        start = time.perf_counter()
+        viewport.repaint()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def interaction_times(app, editor, action):
+    """Run action FRAMES times, each followed by the repaint it scheduled."""
+    editor.verticalScrollBar().setValue(0)
+    app.processEvents()
+    times = []
+    for frame in range(FRAMES):
+        start = time.perf_counter()
+        action(frame)
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def press_arrow(editor):
+    def action(frame):
+        key = Qt.Key.Key_Down if frame % 40 < 20 else Qt.Key.Key_Up
+        editor.keyPressEvent(QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier))
+    return action
+
+
+def drag_select(editor):
+    line_height = editor.fontMetrics().height()
+
+    def action(frame):
+        # Drag down by one line a frame, starting again every 20 lines
+        y = (frame % 20) * line_height + line_height // 2
+        button = Qt.MouseButton.LeftButton
+        if frame % 20 == 0:
+            editor.clear_selection()
+            editor.cursor_line, editor.cursor_column = 0, 0
+        event = QMouseEvent(QEvent.Type.MouseMove, QPointF(200, y), QPointF(200, y),
+                            button, button, Qt.KeyboardModifier.NoModifier)
+        editor.mouseMoveEvent(event)
+    return action
+
+
+def scroll_by(editor, step):
+    def action(frame):
+        # Scroll down for 100 frames, then back up
+        scroll_bar = editor.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + (step if frame % 200 < 100 else -step))
+    return action
+
+
+def report(name, times):
+    times = sorted(times)
+    print(f"{name:<24} median {statistics.median(times) * 1000:6.2f} ms   "
+          f"p95 {times[int(len(times) * 0.95)] * 1000:6.2f} ms")
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    editor = settled_editor(app, make_text(20_000))
+    line_height = editor.fontMetrics().height()
+    report('cursor blink', frame_times(editor, 0))
+    report('scroll 3 lines/frame', frame_times(editor, 3 * line_height))
+    report('scroll 1 page/frame', frame_times(editor, editor.viewport().height()))
+    report('blink (event loop)', interaction_times(app, editor, lambda frame: editor.blink_cursor()))
+    report('arrow key', interaction_times(app, editor, press_arrow(editor)))
+    report('drag select', interaction_times(app, editor, drag_select(editor)))
+    report('scroll 3 lines', interaction_times(app, editor, scroll_by(editor, 3 * line_height)))
+
+    large = TextEditor(make_text(1_000_000), 'bench.txt')
+    large.resize(1000, 800)
+    large.show()
+    app.processEvents()
+    report('scroll 3 lines, 1M lines', interaction_times(app, large, scroll_by(large, 3 * line_height)))
+    report('scroll 1 page, 1M lines', interaction_times(app, large, scroll_by(large, large.viewport().height())))
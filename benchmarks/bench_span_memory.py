@@ -0,0 +1,34 @@
+"""
+Memory held by the highlight spans of a large document, stored as packed span
+arrays against the previous lists of (start, length, format_name) tuples.
+
+Run from the repository root:
+    python -m benchmarks.bench_span_memory
+"""
+import tracemalloc
+
+from src.editor import PygmentsSyntaxHighlighter
+from src.editor.document.piece_table import PieceTable
+from src.editor.highlighting.formats import SPAN_FIELDS, unpack_spans
+from benchmarks.bench_first_paint import make_text
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == '__main__':
+    print(f"{'lines':>10} {'tokens':>10} {'tuples':>10} {'arrays':>10}")
+    # About a million tokens at the largest size
+    for line_count in (10_000, 175_000):
+        text = make_text(line_count)
+        buffer = PieceTable(text)
+        buffer.text()
+        packed, packed_size = measure(lambda: PygmentsSyntaxHighlighter('python').highlight(buffer))
+        _, tuple_size = measure(lambda: [list(unpack_spans(spans)) for spans in packed])
+        tokens = sum(len(spans) for spans in packed) // SPAN_FIELDS
+        print(f"{line_count:>10} {tokens:>10} {tuple_size / 2**20:>7.1f} MB {packed_size / 2**20:>7.1f} MB")
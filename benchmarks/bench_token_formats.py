@@ -0,0 +1,49 @@
+"""
+Tokens per second of a whole-document highlight pass, with token types
+resolved through the shared format ID table against resolving every token
+through token_to_format_name.
+
+Run from the repository root:
+    python -m benchmarks.bench_token_formats
+"""
+import time
+
+from src.editor import PygmentsSyntaxHighlighter
+from src.editor.document.piece_table import PieceTable
+from src.editor.highlighting.formats import SPAN_FIELDS
+from benchmarks.bench_first_paint import make_text
+
+
+class NoCache(dict):
+    """Format ID table that never keeps anything."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class UncachedHighlighter(PygmentsSyntaxHighlighter):
+    _format_ids = NoCache()
+
+
+def highlight_time(highlighter_class, buffer):
+    highlighter = highlighter_class('python')
+    start = time.perf_counter()
+    highlighted_lines = highlighter.highlight(buffer)
+    return time.perf_counter() - start, highlighted_lines
+
+
+if __name__ == '__main__':
+    print(f"{'lines':>10} {'tokens':>10} {'uncached':>14} {'cached':>14} {'speedup':>8}")
+    for line_count in (10_000, 100_000):
+        buffer = PieceTable(make_text(line_count))
+        buffer.text()
+        # Alternate the two and keep the best of each to even out machine noise
+        before = after = float('inf')
+        for _ in range(5):
+            elapsed, _ = highlight_time(UncachedHighlighter, buffer)
+            before = min(before, elapsed)
+            elapsed, highlighted_lines = highlight_time(PygmentsSyntaxHighlighter, buffer)
+            after = min(after, elapsed)
+        tokens = sum(len(spans) for spans in highlighted_lines) // SPAN_FIELDS
+        print(f"{line_count:>10} {tokens:>10} {tokens / before:>10.0f} t/s {tokens / after:>10.0f} t/s "
+              f"{before / after:>7.2f}x")
@@ -0,0 +1,62 @@
+"""
+Keystroke latency, including the scroll bar and repaint work it triggers,
+when typing into a 200k-line file. Backspacing on the widest line is the
+case that used to make the editor measure every line again.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_typing
+"""
+import statistics
+import time
+
+from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, cursor_blinker
+
+LINE_COUNT = 200_000
+KEYSTROKES = 200
+
+
+def make_text():
+    lines = [f'{i:08d} INFO request handled in {i % 97} ms' for i in range(LINE_COUNT)]
+    lines[LINE_COUNT // 2] += ' with a much longer message than any other line in the file'
+    return '\n'.join(lines)
+
+
+def keystroke_times(app, editor, line, keys):
+    editor.cursor_line = line
+    editor.cursor_column = editor.buffer.line_length(line)
+    editor.ensure_cursor_visible()
+    app.processEvents()
+    times = []
+    for key, text in keys:
+        start = time.perf_counter()
+        editor.keyPressEvent(QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier, text))
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    times = sorted(times)
+    print(f"{name:<30} median {statistics.median(times) * 1000:7.2f} ms   "
+          f"p95 {times[int(len(times) * 0.95)] * 1000:7.2f} ms   max {times[-1] * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    start = time.perf_counter()
+    editor = TextEditor(make_text(), 'bench.log')
+    editor.resize(1000, 800)
+    editor.show()
+    app.processEvents()
+    print(f"open {LINE_COUNT} lines: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    typing = [(Qt.Key.Key_A, 'x')] * KEYSTROKES
+    backspaces = [(Qt.Key.Key_Backspace, '')] * KEYSTROKES
+    report('type on a short line', keystroke_times(app, editor, 10, typing))
+    report('type on the widest line', keystroke_times(app, editor, LINE_COUNT // 2, typing))
+    report('backspace on the widest line', keystroke_times(app, editor, LINE_COUNT // 2, backspaces))
@@ -0,0 +1,73 @@
+"""
+Soft wrap in a 200k-line file of prose: the time to turn wrapping on and to
+resize the window, the background reflow that wraps the lines off screen,
+and typing, arrow keys and scrolling once every line is wrapped. A frame
+budget of 16.7 ms gives 60 fps.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen without a display):
+    python -m benchmarks.bench_wrap
+"""
+import random
+import time
+
+from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+from src.editor import TextEditor, cursor_blinker
+from benchmarks.bench_scroll_paint import interaction_times, press_arrow, report, scroll_by
+
+LINES = 200_000
+WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit']
+
+
+def make_prose(lines):
+    """Paragraph-like lines, from a few words to several rows long."""
+    rng = random.Random(1)
+    return '\n'.join(' '.join(rng.choice(WORDS) for _ in range(rng.choice((3, 8, 30, 60))))
+                     for _ in range(lines))
+
+
+def timed(app, action):
+    start = time.perf_counter()
+    action()
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def reflow_time(app, editor):
+    """Run the event loop until every line is wrapped."""
+    start = time.perf_counter()
+    while editor.reflow_timer.isActive():
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+def type_text(editor):
+    def action(frame):
+        text = ' ' if frame % 6 == 5 else 'w'
+        editor.keyPressEvent(QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_W, Qt.KeyboardModifier.NoModifier, text))
+    return action
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication([])
+    cursor_blinker.set_enabled(False)
+    editor = TextEditor(make_prose(LINES), 'bench.txt')
+    editor.resize(1000, 800)
+    editor.show()
+    app.processEvents()
+
+    print(f"{'turn wrapping on':<24} {timed(app, lambda: editor.set_word_wrap(True)) * 1000:6.1f} ms")
+    print(f"{'background reflow':<24} {reflow_time(app, editor) * 1000:6.0f} ms   ({editor.row_count()} rows)")
+    print(f"{'resize':<24} {timed(app, lambda: editor.resize(800, 800)) * 1000:6.1f} ms")
+    reflow_time(app, editor)
+
+    line_height = editor.font_metrics.line_height
+    editor.verticalScrollBar().setValue(editor.verticalScrollBar().maximum() // 2)
+    editor.setFocus()
+    app.processEvents()
+    editor.cursor_line, editor.cursor_column = editor.visible_lines()[0] + 5, 0
+    report('typing', interaction_times(app, editor, type_text(editor)))
+    report('arrow key', interaction_times(app, editor, press_arrow(editor)))
+    report('scroll 3 rows', interaction_times(app, editor, scroll_by(editor, 3 * line_height)))
@@ -0,0 +1,65 @@
+"""
+Checks that a MappedDocument shows the same text, and records the same
+FileFormat, as decode_file() gives for the same bytes, for files in the
+single-byte encodings and UTF-8 with a byte order mark, and that UTF-16 files
+and files with old Mac '\\r' line endings are left to the loader. The files
+are written to a temporary directory and are a few times larger than
+MappedDocument.INDEX_CHUNK, so they are indexed in the background as large
+files are.
+
+Run from the repository root; exits with status 1 on a mismatch:
+    python -m benchmarks.check_mapped_encoding
+"""
+import codecs
+import os
+import sys
+import tempfile
+
+from src.editor.document import MappedDocument, decode_file
+
+
+def sample_files():
+    """Return (name, bytes) of the files to check."""
+    lines = range(MappedDocument.INDEX_CHUNK // 16)
+    return [
+        ('latin-1', ''.join(f"ligne {i}: café, naïve, Ærø\r\n" for i in lines).encode('latin-1')),
+        ('latin-1, byte cp1252 leaves undefined',
+         ("x\x81y\n" + ''.join(f"{i} déjà vu\n" for i in lines)).encode('latin-1')),
+        ('cp1252', ''.join(f"{i} “quoted” €5 — dash\n" for i in lines).encode('cp1252')),
+        ('utf-8 with BOM', codecs.BOM_UTF8 + ''.join(f"{i} 日本語 ü\n" for i in lines).encode('utf-8')),
+    ]
+
+
+def check(path, data):
+    text, file_format = decode_file(data)
+    document = MappedDocument(path)
+    try:
+        while not document.is_indexed():
+            pass
+        return document.text() == text and document.file_format == file_format, document.file_format
+    finally:
+        document.close()
+
+
+if __name__ == '__main__':
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'check.txt')
+        for name, data in sample_files():
+            with open(path, 'wb') as file:
+                file.write(data)
+            same, file_format = check(path, data)
+            failed |= not same
+            print(f"{name:<40} {'same' if same else 'DIFFERENT':<10} {file_format}")
+
+        unmapped = [
+            ('utf-16', "hello\nworld\n".encode('utf-16')),
+            ("'\\r' line endings", b"hello\rworld\r"),
+        ]
+        for name, data in unmapped:
+            with open(path, 'wb') as file:
+                file.write(data * (MappedDocument.LARGE_FILE_SIZE // len(data) + 1))
+            mapped = MappedDocument.is_large(path)
+            failed |= mapped
+            print(f"{name:<40} {'MAPPED' if mapped else 'loaded':<10}")
+    sys.exit(1 if failed else 0)
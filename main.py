@@ -2,9 +2,11 @@ import sys
 from PyQt6.QtWidgets import QApplication
 from src.ui.window import MainWindow
 from src.editor.themes.theme import Theme
+from src.editor.highlighting.lexers import lexer_registry
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    lexer_registry.prewarm()
     Theme.initialize_scaling()
     window = MainWindow()
     window.show()
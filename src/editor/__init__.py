@@ -1,15 +1,19 @@
 from .base import TextEditor
 from .themes.theme import Theme
 from .highlighting.pygments import PygmentsSyntaxHighlighter
+from .highlighting.lexers import lexer_registry
 from .actions.handlers import FileOperationsMixin, EditActionsMixin
 from .signals import editor_signals
+from .cursor_blink import cursor_blinker
 
 
 __all__ = [
     'TextEditor',
     'Theme',
     'PygmentsSyntaxHighlighter',
+    'lexer_registry',
     'FileOperationsMixin',
     'EditActionsMixin',
     'editor_signals',
+    'cursor_blinker',
 ]
@@ -1,6 +1,8 @@
 from PyQt6.QtWidgets import QMessageBox, QFileDialog
 from src.editor.highlighting.pygments import PygmentsSyntaxHighlighter
+from src.editor.highlighting.lexers import lexer_registry
 from src.editor.base import TextEditor
+from src.editor.document import MappedDocument, document_saver
 import os 
 
 class FileOperationsMixin:
@@ -9,15 +11,24 @@ class FileOperationsMixin:
         file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                self.add_new_tab(content,
-                                 title=file_path.split('/')[-1],
-                                 file_path=file_path)  # Pass the file path
-                self.no_tabs_label.hide()
+                # Read in the background; errors while reading are reported when it finishes
+                self.load_file_in_tab(file_path)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not open file:\n{e}")
 
+    def open_large_file(self, file_path):
+        """Open a file too large to load into memory in a read-only tab, returning the tab's index."""
+        index = self.add_new_tab(title=os.path.basename(file_path), file_path=file_path,
+                                 document=MappedDocument(file_path))
+        self.tab_widget.setTabToolTip(index, self.large_file_tooltip(file_path))
+        return index
+
+    @staticmethod
+    def large_file_tooltip(file_path):
+        """Tooltip of the tab of a file opened read only by open_large_file."""
+        size_mb = MappedDocument.LARGE_FILE_SIZE // (1024 * 1024)
+        return f"{file_path}\nRead only: files over {size_mb} MB are shown from disk instead of being loaded"
+
     def open_folder(self):
         """Open a folder dialog to select a directory and load it in the FileTreeContainer."""
         folder_path = QFileDialog.getExistingDirectory(self, "Open Folder", "", QFileDialog.Option.ShowDirsOnly)
@@ -31,69 +42,153 @@ class FileOperationsMixin:
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not open folder:\n{e}")
 
+    def text_editors(self):
+        """Yield (index, text_editor) for every tab showing an editor, looking each one up once."""
+        for index in range(self.tab_widget.count()):
+            text_editor = self.tab_widget.widget(index).findChild(TextEditor)
+            if text_editor:
+                yield index, text_editor
+
+    def save_editor(self, text_editor, file_path=None):
+        """
+        Save the editor's document to file_path, or to its own path, in the
+        background. on_document_saved marks it unmodified once it is written.
+        """
+        document = text_editor.buffer
+        # Only the outcome of the latest save of a document is acted on
+        self.pending_saves[document] = (text_editor, document.version)
+        document_saver.save(file_path or text_editor.file_path, document)
+
+    def save_editors(self, text_editors):
+        """
+        Save several editors at once; the saver writes them concurrently. The
+        files that could not be written are reported together once all are
+        done, rather than in a dialog each.
+        """
+        for text_editor in text_editors:
+            self.save_batch.add(text_editor.buffer)
+        for text_editor in text_editors:
+            self.save_editor(text_editor)
+
+    def on_document_saved(self, result):
+        """Mark the editor whose document was saved as unmodified, unless it changed since, or report the error."""
+        text_editor, version = self.pending_saves.get(result.document, (None, None))
+        if text_editor is None or result.version < version:
+            if result.error and text_editor is None:
+                QMessageBox.critical(self, "Error", f"Could not save {result.path}:\n{result.error}")
+            return  # Superseded by a later save of the same document
+        del self.pending_saves[result.document]
+
+        in_batch = result.document in self.save_batch
+        self.save_batch.discard(result.document)
+        if result.error:
+            self.close_after_save.discard(text_editor)
+            if in_batch:
+                self.save_failures.append(result)
+            else:
+                self.closing_after_save = False
+                QMessageBox.critical(self, "Error", f"Could not save {result.path}:\n{result.error}")
+        else:
+            # Set to UTF-8 when the file's encoding could not hold the text
+            text_editor.buffer.file_format = result.file_format
+            if text_editor.buffer.version == result.version and text_editor.file_path == result.path:
+                text_editor.set_modified(False)
+
+        index = self.tab_widget.indexOf(text_editor.parent())
+        if index != -1:
+            self.update_tab_title(text_editor)
+            if text_editor in self.close_after_save:
+                self.close_after_save.discard(text_editor)
+                if not text_editor.is_modified:
+                    self.close_tab(index)  # Otherwise edited while it was written
+
+        if in_batch and not self.save_batch and self.save_failures:
+            failures = "\n".join(f"• {failure.path}: {failure.error}"
+                                  for failure in sorted(self.save_failures, key=lambda failure: failure.path))
+            self.save_failures = []
+            self.closing_after_save = False
+            QMessageBox.critical(self, "Error", f"The following files could not be saved:\n{failures}")
+        if self.closing_after_save and not self.save_batch and not document_saver.is_saving():
+            # Every save the user asked for on exit has been confirmed
+            self.closing_after_save = False
+            self.close()
+
+    def unsaved_tabs(self):
+        """Return (index, text_editor, name) for every tab with unsaved changes."""
+        return [(index, text_editor, self.SAVING_SUFFIX.sub('', self.tab_widget.tabText(index)).rstrip('*'))
+                for index, text_editor in self.text_editors() if text_editor.is_modified]
+
+    def ask_save_paths(self, unsaved_tabs):
+        """Ask where to save the untitled ones among unsaved_tabs. Returns False if the user cancelled."""
+        for index, text_editor, name in unsaved_tabs:
+            if not text_editor.file_path:
+                self.tab_widget.setCurrentIndex(index)
+                file_path, _ = QFileDialog.getSaveFileName(self, "Save File As", name,
+                                                           "Text Files (*.txt);;All Files (*)")
+                if not file_path:
+                    return False
+                text_editor.file_path = file_path
+                self.tab_widget.setTabText(index, os.path.basename(file_path))
+        return True
+
+    def save_all_files(self):
+        """Save every file with unsaved changes."""
+        unsaved_tabs = self.unsaved_tabs()
+        if self.ask_save_paths(unsaved_tabs):
+            self.save_editors([text_editor for _, text_editor, _ in unsaved_tabs])
+
     def save_file(self):
         """Save the current file."""
         current_widget = self.tab_widget.currentWidget()
         if current_widget:
             text_editor = current_widget.findChild(TextEditor)
             if text_editor:
+                if text_editor.buffer.read_only:
+                    return  # Opened from disk and never modified
                 if text_editor.file_path:  # If file was previously saved
-                    try:
-                        with open(text_editor.file_path, 'w', encoding='utf-8') as file:
-                            file.write(text_editor.toPlainText())
-                        text_editor.set_modified(False)
-                        self.update_tab_title(text_editor)
-                    except Exception as e:
-                        QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
+                    self.save_editor(text_editor)
                 else:
                     self.save_file_as()  # This will handle updating the highlighter
 
 
     def save_file_as(self):
         """Save the current file with a new name."""
+        current_widget = self.tab_widget.currentWidget()
+        text_editor = current_widget.findChild(TextEditor) if current_widget else None
+        if text_editor and text_editor.buffer.read_only:
+            QMessageBox.information(self, "Save As", "Large files are opened read only and cannot be saved "
+                                                     "under a new name.")
+            return
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Save File As", "Untitled.txt",
             "Text Files (*.txt);;All Files (*)"
         )
-        if file_path:
-            current_widget = self.tab_widget.currentWidget()
-            if current_widget:
-                text_editor = current_widget.findChild(TextEditor)
-                if text_editor:
-                    try:
-                        with open(file_path, 'w', encoding='utf-8') as file:
-                            file.write(text_editor.toPlainText())
-                        text_editor.file_path = file_path
-                        text_editor.set_modified(False)
-                        index = self.tab_widget.indexOf(current_widget)
-                        self.tab_widget.setTabText(index, os.path.basename(file_path))
-
-                        # **Update the syntax highlighter based on new file extension**
-                        _, ext = os.path.splitext(file_path)
-                        ext = ext.lower().lstrip('.')
-                        language = self.get_language_from_extension(ext)
-                        if language:
-                            highlighter = PygmentsSyntaxHighlighter(language)
-                            text_editor.set_highlighter(highlighter)
-                        else:
-                            text_editor.set_highlighter(None)
-                        text_editor.update_highlighting()
-
-                    except Exception as e:
-                        QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
+        if file_path and text_editor:
+            text_editor.file_path = file_path
+            index = self.tab_widget.indexOf(current_widget)
+            self.tab_widget.setTabText(index, os.path.basename(file_path))
+            self.save_editor(text_editor)
+
+            # **Update the syntax highlighter based on new file extension**
+            language = lexer_registry.detect_language(file_path, text_editor.toPlainText())
+            if language:
+                highlighter = PygmentsSyntaxHighlighter(language)
+                text_editor.set_highlighter(highlighter)
+            else:
+                text_editor.set_highlighter(None)
 
 
     def closeEvent(self, event):
         """Check for unsaved changes before closing."""
-        unsaved_tabs = []
-        for index in range(self.tab_widget.count()):
-            widget = self.tab_widget.widget(index)
-            text_editor = widget.findChild(TextEditor)
-            if text_editor and text_editor.is_modified:
-                unsaved_tabs.append((index, self.tab_widget.tabText(index).rstrip('*')))
+        if self.save_batch or document_saver.is_saving():
+            # Closed again by on_document_saved once the files being saved are written
+            self.closing_after_save = True
+            event.ignore()
+            return
 
+        unsaved_tabs = self.unsaved_tabs()
         if unsaved_tabs:
-            tab_names = "\n".join([f"• {name}" for _, name in unsaved_tabs])
+            tab_names = "\n".join([f"• {name}" for _, _, name in unsaved_tabs])
             reply = QMessageBox.question(
                 self, 'Unsaved Changes',
                 f"The following files have unsaved changes:\n{tab_names}\n\nDo you want to save them before exiting?",
@@ -101,38 +196,11 @@ class FileOperationsMixin:
                 QMessageBox.StandardButton.Save
             )
             if reply == QMessageBox.StandardButton.Save:
-                for index, name in unsaved_tabs:
-                    widget = self.tab_widget.widget(index)
-                    text_editor = widget.findChild(TextEditor)
-                    if text_editor:
-                        if text_editor.file_path:
-                            try:
-                                with open(text_editor.file_path, 'w', encoding='utf-8') as file:
-                                    file.write(text_editor.toPlainText())
-                                text_editor.set_modified(False)
-                                self.update_tab_title(text_editor)
-                            except Exception as e:
-                                QMessageBox.critical(self, "Error", f"Could not save file '{name}':\n{e}")
-                                event.ignore()
-                                return
-                        else:
-                            file_path, _ = QFileDialog.getSaveFileName(self, "Save File As", name,
-                                                                       "Text Files (*.txt);;All Files (*)")
-                            if file_path:
-                                try:
-                                    with open(file_path, 'w', encoding='utf-8') as file:
-                                        file.write(text_editor.toPlainText())
-                                    text_editor.file_path = file_path
-                                    text_editor.set_modified(False)
-                                    self.tab_widget.setTabText(index, file_path.split('/')[-1])
-                                except Exception as e:
-                                    QMessageBox.critical(self, "Error", f"Could not save file '{name}':\n{e}")
-                                    event.ignore()
-                                    return
-                            else:
-                                event.ignore()
-                                return
-                event.accept()
+                if self.ask_save_paths(unsaved_tabs):
+                    self.save_editors([text_editor for _, text_editor, _ in unsaved_tabs])
+                    # The window closes once every file has been written; see on_document_saved
+                    self.closing_after_save = True
+                event.ignore()
             elif reply == QMessageBox.StandardButton.Discard:
                 event.accept()
             else:
@@ -177,6 +245,34 @@ class EditActionsMixin:
             if text_editor:
                 text_editor.paste()
 
+    def zoom_in_editor(self):
+        current_widget = self.tab_widget.currentWidget()
+        if current_widget:
+            text_editor = current_widget.findChild(TextEditor)
+            if text_editor:
+                text_editor.zoom_in()
+
+    def zoom_out_editor(self):
+        current_widget = self.tab_widget.currentWidget()
+        if current_widget:
+            text_editor = current_widget.findChild(TextEditor)
+            if text_editor:
+                text_editor.zoom_out()
+
+    def reset_zoom_editor(self):
+        current_widget = self.tab_widget.currentWidget()
+        if current_widget:
+            text_editor = current_widget.findChild(TextEditor)
+            if text_editor:
+                text_editor.reset_zoom()
+
+    def toggle_word_wrap(self):
+        self.word_wrap = not self.word_wrap
+        for index in range(self.tab_widget.count()):
+            text_editor = self.tab_widget.widget(index).findChild(TextEditor)
+            if text_editor:
+                text_editor.set_word_wrap(self.word_wrap)
+
     def select_all_text(self):
         current_widget = self.tab_widget.currentWidget()
         if current_widget:
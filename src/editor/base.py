@@ -1,5 +1,5 @@
 from PyQt6.QtWidgets import QWidget, QAbstractScrollArea, QApplication
-from PyQt6.QtGui import QKeyEvent, QFontMetrics, QPainter, QPalette
+from PyQt6.QtGui import QKeyEvent, QPainter, QPalette
 from PyQt6.QtCore import Qt, QTimer, QEvent, pyqtSignal, QRect, QSize
 
 from .themes.theme import Theme
@@ -8,8 +8,21 @@ from .mixins.selection import SelectionMixin
 from .mixins.clipboard import ClipboardMixin
 from .mixins.undoredo import UndoRedoMixin
 from .mixins.painting import PaintingMixin
+from .mixins.zoom import ZoomMixin
+from .mixins.wrapping import WrapMixin
+from .document.piece_table import PieceTable
+from .document.mapped import MappedDocument
+from .highlighting.worker import HighlightWorker
+from .highlighting.formats import NO_SPANS
+from .rendering.line_cache import LineRenderCache
+from .rendering.column_offsets import ColumnOffsets
+from .rendering.line_widths import LineWidths, measure_lines
+from .rendering.font_metrics import EditorFontMetrics
+from .rendering.wrap_index import WrapIndex
+from .cursor_blink import cursor_blinker
 
 import logging
+import time
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
@@ -21,6 +34,8 @@ class LineNumberArea(QWidget):
         super().__init__(editor)
         self.editor = editor
         self.setFont(self.editor.font())
+        # Painted in full by line_number_area_paint_event, so it can be scrolled
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
         
         # Set background color from theme
         self.setAutoFillBackground(True)
@@ -41,6 +56,9 @@ class TextEditorViewport(QWidget):
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.setAttribute(Qt.WidgetAttribute.WA_InputMethodEnabled)
         self.setAttribute(Qt.WidgetAttribute.WA_KeyCompression, False)
+        # The editor paints every pixel itself, which lets scrolling shift the
+        # painted contents instead of repainting the whole viewport
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
         
         # Set background color from theme
         self.setAutoFillBackground(True)
@@ -85,35 +103,32 @@ class EditorSyncMixin:
         """Ensure cursor_line is within valid bounds."""
         if not hasattr(self, 'cursor_line'):
             self.cursor_line = 0
-        if not hasattr(self, 'lines'):
-            self.lines = ['']
-        self.cursor_line = max(0, min(self.cursor_line, len(self.lines) - 1))
+        if not hasattr(self, 'buffer'):
+            self.buffer = PieceTable()
+        self.cursor_line = max(0, min(self.cursor_line, self.buffer.line_count() - 1))
         return self.cursor_line
 
     def safe_cursor_column(self):
         """Ensure cursor_column is within valid bounds for the current line."""
         if not hasattr(self, 'cursor_column'):
             self.cursor_column = 0
-        line = self.lines[self.safe_cursor_line()]
-        self.cursor_column = max(0, min(self.cursor_column, len(line)))
+        line_length = self.buffer.line_length(self.safe_cursor_line())
+        self.cursor_column = max(0, min(self.cursor_column, line_length))
         return self.cursor_column
 
     def ensure_valid_state(self):
         """Ensure all editor state is valid and consistent."""
-        # Ensure we have at least one line
-        if not self.lines:
-            self.lines = ['']
-        
         # Initialize highlighted_lines if it doesn't exist
         if not hasattr(self, 'highlighted_lines'):
-            self.highlighted_lines = [{}]
+            self.highlighted_lines = [NO_SPANS]
             
         # Synchronize highlighted_lines with actual lines
         # This is critical for avoiding index out of range errors
-        while len(self.highlighted_lines) > len(self.lines):
+        line_count = self.buffer.line_count()
+        while len(self.highlighted_lines) > line_count:
             self.highlighted_lines.pop()
-        while len(self.highlighted_lines) < len(self.lines):
-            self.highlighted_lines.append({})
+        while len(self.highlighted_lines) < line_count:
+            self.highlighted_lines.append(NO_SPANS)
             
         # Ensure cursor position is valid
         self.safe_cursor_line()
@@ -135,13 +150,14 @@ class EditorSyncMixin:
         end_line, end_col = self.selection_end
         
         # Check line bounds
-        if not (0 <= start_line < len(self.lines) and 0 <= end_line < len(self.lines)):
+        line_count = self.buffer.line_count()
+        if not (0 <= start_line < line_count and 0 <= end_line < line_count):
             return False
             
         # Check column bounds
-        if not (0 <= start_col <= len(self.lines[start_line])):
+        if not (0 <= start_col <= self.buffer.line_length(start_line)):
             return False
-        if not (0 <= end_col <= len(self.lines[end_line])):
+        if not (0 <= end_col <= self.buffer.line_length(end_line)):
             return False
             
         return True
@@ -150,51 +166,34 @@ class EditorSyncMixin:
         """
         Synchronize all editor state after a change.
         This should be called after any operation that modifies the text or cursor position.
+
+        Highlighting, scroll bar extents, the line number area and repainting
+        follow the buffer's change events and only touch the edited lines, so
+        this only handles state that depends on the cursor.
         """
         try:
             # Ensure basic state is valid
             self.ensure_valid_state()
-            
-            # Update syntax highlighting if enabled
-            if hasattr(self, 'highlighter') and self.highlighter:
-                try:
-                    # Create a new highlighted_lines list with the correct size
-                    self.highlighted_lines = self.highlighter.highlight(self.lines)
-                    # Ensure the highlighted_lines length matches lines length
-                    while len(self.highlighted_lines) < len(self.lines):
-                        self.highlighted_lines.append({})
-                except Exception as e:
-                    logging.error(f"Error updating syntax highlighting: {e}")
-                    # Reset highlighting on error
-                    self.highlighted_lines = [{} for _ in self.lines]
-            
-            # Update scroll bars and geometry
-            self.update_scrollbars()
-            self.updateGeometry()
-            
-            # Update UI elements
-            if hasattr(self, 'line_number_area'):
-                self.update_line_number_area_width(0)
-                self.line_number_area.update()
-                
+
             # Ensure cursor is visible
             self.ensure_cursor_visible()
             
             # Mark as modified
             self.set_modified(True)
             
-            # Final viewport update
-            self.update()
+            # The cursor may have moved away from the edited lines
+            self.update_cursor_and_selection()
             
         except Exception as e:
             logging.error(f"Error synchronizing editor state: {e}")
             # Attempt to recover to a safe state
-            self.lines = ['']
+            self.set_buffer(PieceTable())
             self.cursor_line = 0
             self.cursor_column = 0
-            self.highlighted_lines = [{}]
+            self.update_highlighting()
             self.clear_selection()
-            self.update()
+            self.update_scrollbars()
+            self.viewport().update()
 
     def after_text_change(self):
         """
@@ -203,17 +202,27 @@ class EditorSyncMixin:
         """
         self.synchronize_editor_state()
 
-class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, UndoRedoMixin, PaintingMixin, QAbstractScrollArea):
+class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, UndoRedoMixin, PaintingMixin, ZoomMixin, WrapMixin, QAbstractScrollArea):
     modifiedChanged = pyqtSignal(object)
+    textChanged = pyqtSignal(object)  # Emits the TextChange describing each edit
+
+    # Delay before rehighlighting, so a burst of keystrokes costs a single pass
+    HIGHLIGHT_DELAY = 100  # ms
+
+    # How often the lines a large file's background indexing found are taken in
+    INDEX_POLL_INTERVAL = 100  # ms
 
-    def __init__(self, content='', file_path=None, main_window=None):
+    def __init__(self, content='', file_path=None, main_window=None, document=None,
+                 max_measured_chars=ColumnOffsets.MAX_MEASURED_CHARS, line_widths=None):
         super().__init__()
         
         self.main_window = main_window
         
-        # Set editor font
+        # Set editor font. Everything measured with it is rebuilt by apply_font
+        # when the font changes, e.g. when zooming.
         self.editor_font = Theme.get_default_font()
         self.setFont(self.editor_font)
+        self.font_metrics = EditorFontMetrics(self.font())
         
         # Configure editor colors using theme
         self.setStyleSheet(f"""
@@ -262,14 +271,15 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         self.setAttribute(Qt.WidgetAttribute.WA_InputMethodEnabled)
         self.setAttribute(Qt.WidgetAttribute.WA_KeyCompression, False)
 
-        self.lines = content.split('\n') if content else ['']
+        # A document such as a MappedDocument can be passed instead of content
+        self.set_buffer(document if document is not None else PieceTable(content))
         self.cursor_line = 0
         self.cursor_column = 0
 
         # Initialize line number area with theme colors
         self.line_number_area = LineNumberArea(self)
         self.update_line_number_area_width(0)
-        self.verticalScrollBar().valueChanged.connect(self.line_number_area.update)
+        self.verticalScrollBar().valueChanged.connect(self.reprioritize_highlighting)
 
         self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
 
@@ -277,42 +287,242 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         self._is_modified = False
 
         self.highlighter = None
-        self.highlighted_lines = [{} for _ in self.lines]
-
-        # Cursor blinking setup
+        self.highlighted_lines = [NO_SPANS] * self.buffer.line_count()
+        self.highlight_timer = QTimer(self)
+        self.highlight_timer.setSingleShot(True)
+        self.highlight_timer.setInterval(self.HIGHLIGHT_DELAY)
+        self.highlight_timer.timeout.connect(self.rehighlight_changes)
+        self.highlight_worker = HighlightWorker(self)
+        self.highlight_worker.finished.connect(self.apply_highlighting)
+        # Further slices of a partly highlighted document run whenever the event loop is idle
+        self.highlight_slice_timer = QTimer(self)
+        self.highlight_slice_timer.setSingleShot(True)
+        self.highlight_slice_timer.setInterval(0)
+        self.highlight_slice_timer.timeout.connect(self.rehighlight_changes)
+        self.highlight_started = None       # When the current full pass was requested
+        self.first_paint_pending = False    # Report the next paint as the first highlighted one
+        self.first_highlight_paint_time = None
+
+        # Column x offsets for hit testing, the cursor and selection, and the
+        # shaped lines reused by every repaint until their text or spans change
+        self.column_offsets = ColumnOffsets(self.font())
+        self.column_offsets.set_max_measured_chars(max_measured_chars)
+        self.line_render_cache = LineRenderCache(self.column_offsets)
+        self.line_render_cache.set_font(self.font())
+
+        # Visual rows of wrapped lines; lines only estimated yet are wrapped when idle
+        self.wrap_index = WrapIndex(self.column_offsets)
+        self.reflow_timer = QTimer(self)
+        self.reflow_timer.setSingleShot(True)
+        self.reflow_timer.setInterval(0)
+        self.reflow_timer.timeout.connect(self.reflow_lines)
+
+        # Lines of a large file are shown as its background indexing finds them
+        self.indexed_line_count = self.buffer.line_count()
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(self.INDEX_POLL_INTERVAL)
+        self.index_timer.timeout.connect(self.follow_indexing)
+        if self.is_large_file() and not self.buffer.is_indexed():
+            self.index_timer.start()
+
+        # Each part of the view follows edits on its own and only updates what changed
+        self.content_width = 0
+        self.line_widths = LineWidths()
+        self.textChanged.connect(self.update_highlighting_for_change)
+        self.textChanged.connect(self.update_wrap_for_change)
+        self.textChanged.connect(self.update_scrollbars_for_change)
+        self.textChanged.connect(self.update_line_numbers_for_change)
+        self.textChanged.connect(self.repaint_change)
+
+        # The shared cursor_blinker blinks the cursor while the editor has focus
         self.cursor_visible = True
-        self.cursor_timer = QTimer()
-        self.cursor_timer.timeout.connect(self.blink_cursor)
-        self.cursor_timer.start(500)
 
         # Selection setup
         self.selection_start = None
         self.selection_end = None
 
+        # Cursor position and selection as of the last repaint request, so
+        # that only rows which changed since are repainted
+        self.painted_cursor = (self.cursor_line, self.cursor_column)
+        self.painted_selection = None
+
         # Scrollbar setup
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
 
-        self.update_scrollbars()
+        # Widths measured ahead, e.g. by the DocumentLoader with the default font
+        # and the same max_measured_chars, save measuring every line here
+        self.update_scrollbars(line_widths)
+
+    def set_buffer(self, buffer):
+        """Replace the document buffer, moving the change listener over to it."""
+        if getattr(self, 'buffer', None) is not None:
+            self.buffer.remove_listener(self.on_buffer_changed)
+        self.buffer = buffer
+        self.buffer.add_listener(self.on_buffer_changed)
+
+    def is_large_file(self):
+        """Whether the document is a memory-mapped large file, which is read only and not measured line by line."""
+        return isinstance(self.buffer, MappedDocument)
+
+    def follow_indexing(self):
+        """Take in the lines of a large file found since the last call, repainting them if they are in view."""
+        line_count = self.buffer.line_count()
+        if line_count != self.indexed_line_count:
+            first_new = self.indexed_line_count
+            self.indexed_line_count = line_count
+            self.update_line_number_area_width(0)
+            self.update_scrollbars()
+            if first_new <= self.visible_lines()[1] + 1:
+                self.viewport().update()
+        if self.buffer.is_indexed():
+            self.index_timer.stop()
+
+    def on_buffer_changed(self, change):
+        """Forward buffer edits to the textChanged signal."""
+        self.textChanged.emit(change)
+
+    def line_rect(self, first_line, last_line=None):
+        """Viewport rectangle covering the rows of the given lines, or down to the bottom if last_line is None."""
+        line_height = self.font_metrics.line_height
+        y_offset = self.verticalScrollBar().value()
+        # Rows recorded before an edit may be past the end of the document now
+        last_document_line = self.buffer.line_count() - 1
+        first_line = min(first_line, last_document_line)
+        top = self.first_row(first_line) * line_height - y_offset
+        if last_line is None:
+            bottom = self.viewport().height()
+        else:
+            last_line = min(last_line, last_document_line)
+            last_row = self.first_row(last_line) + len(self.row_starts(last_line)) - 1
+            bottom = (last_row + 1) * line_height - y_offset
+        return QRect(0, top, self.viewport().width(), max(0, bottom - top))
+
+    def text_rect(self, first_line, last_line=None):
+        """
+        line_rect grown into the neighbouring rows, for changes to the text itself.
+
+        Glyphs such as underscores reach a pixel or two past their row, so
+        redrawing changed text also has to clear what it drew there before.
+        """
+        margin = self.font_metrics.line_height // 4
+        return self.line_rect(first_line, last_line).adjusted(0, -margin, 0, margin)
 
-    def set_highlighter(self, highlighter):
+    def update_highlighting_for_change(self, change):
+        """Keep highlight spans aligned with the edited lines and schedule a rehighlight."""
+        first = change.first_line + 1
+        self.highlighted_lines[first:first + change.removed_lines] = [NO_SPANS] * change.inserted_lines
+        if self.highlighter:
+            # A pass still running on the previous version is no longer useful
+            self.highlight_worker.cancel()
+            self.highlight_slice_timer.stop()
+            self.highlighter.invalidate(change)
+            self.highlight_timer.start()
+
+    def visible_lines(self):
+        """Return the (first, last) lines shown in the viewport."""
+        line_height = self.font_metrics.line_height
+        y_offset = self.verticalScrollBar().value()
+        first = self.line_at_row(y_offset // line_height)[0]
+        last = self.line_at_row((y_offset + self.viewport().height()) // line_height)[0]
+        return first, min(last, self.buffer.line_count() - 1)
+
+    def rehighlight_changes(self):
+        """Highlight the next slice of the document in the background, visible lines first."""
+        if self.highlighter:
+            self.highlight_worker.submit(self.buffer, self.highlighter, self.highlighted_lines,
+                                         self.visible_lines())
+
+    def reprioritize_highlighting(self):
+        """After scrolling, move on to the lines now in view if they are not highlighted yet."""
+        if not self.highlighter or self.highlight_timer.isActive():
+            return
+        if not self.highlighter.covers(*self.visible_lines()):
+            self.highlight_slice_timer.stop()
+            self.rehighlight_changes()
+
+    def apply_highlighting(self, result):
+        """Install the spans from a background pass and repaint the lines that changed."""
+        if not self.highlighter or result.version != self.buffer.version:
+            return  # The text changed after the pass started; a new one is scheduled
+        self.highlighter.adopt(result.highlighter)
+        self.highlighted_lines = result.highlighted_lines
+        if result.lines:
+            self.viewport().update(self.text_rect(*result.lines))
+        if self.highlight_started is not None and self.highlighter.covers(*self.visible_lines()):
+            self.first_paint_pending = True
+        if not self.highlighter.is_complete():
+            self.highlight_slice_timer.start()
+
+    def report_first_highlighted_paint(self):
+        """Log how long the visible lines took to appear highlighted after a full rehighlight."""
+        self.first_paint_pending = False
+        self.first_highlight_paint_time = time.perf_counter() - self.highlight_started
+        self.highlight_started = None
+        logging.info(f"First highlighted paint of {self.file_path or 'untitled'} after "
+                     f"{self.first_highlight_paint_time * 1000:.1f} ms")
+
+    def update_scrollbars_for_change(self, change):
+        """Adjust scroll bar ranges, measuring only the lines touched by an edit."""
+        measure = self.measure_line
+        first = change.first_line
+        widths = [measure(self.buffer.line(line)) for line in range(first, change.inserted_end[0] + 1)]
+        self.line_widths.splice(first, change.removed_lines + 1, widths)
+        self.content_width = self.line_widths.max() + Theme.CONTENT_WIDTH_PADDING
+        self.apply_scrollbar_ranges()
+
+    def update_line_numbers_for_change(self, change):
+        """Repaint line numbers below an edit that added or removed lines."""
+        if not change.line_delta:
+            return
+        if self.line_number_area_width() != self.line_number_area.width():
+            self.update_line_number_area_width(0)
+            self.line_number_area.update()
+        else:
+            rect = self.line_rect(change.first_line)
+            self.line_number_area.update(0, rect.top(), self.line_number_area.width(), rect.height())
+
+    def repaint_change(self, change):
+        """Repaint the rows affected by an edit, or everything below it if lines moved."""
+        last_line = None if change.line_delta else change.inserted_end[0]
+        self.viewport().update(self.text_rect(change.first_line, last_line))
+
+    def set_highlighter(self, highlighter, highlighted_lines=None):
+        """
+        Use highlighter for the document. highlighted_lines can hold spans it
+        has already produced for the current buffer, such as the first screen
+        lexed while the file was loading; highlighting then carries on from them.
+        """
         self.highlighter = highlighter
-        self.update_highlighting()
+        if highlighted_lines is None:
+            self.update_highlighting()
+            return
+        self.highlighted_lines = highlighted_lines
+        self.viewport().update()
+        if highlighter and not highlighter.is_complete():
+            self.highlight_slice_timer.start()
 
     def update_highlighting(self):
+        """Rehighlight the whole document in the background."""
+        self.highlight_timer.stop()
+        self.highlight_slice_timer.stop()
+        self.highlight_worker.cancel()
         if self.highlighter:
-            self.highlighted_lines = self.highlighter.highlight(self.lines)
+            self.highlight_started = time.perf_counter()
+            self.first_paint_pending = False
+            self.highlighter.reset()
+            self.rehighlight_changes()
         else:
-            self.highlighted_lines = [{} for _ in self.lines]
-        self.update()
+            # New spans are repainted as they arrive; dropping them shows at once
+            self.highlighted_lines = [NO_SPANS] * self.buffer.line_count()
+            self.viewport().update()
 
     def ensure_cursor_visible(self):
-        fm = QFontMetrics(self.font())
-        line_height = fm.height()
-        char_width = fm.horizontalAdvance(' ')
+        line_height = self.font_metrics.line_height
+        char_width = self.font_metrics.space_width
 
-        cursor_x = fm.horizontalAdvance(self.lines[self.cursor_line][:self.cursor_column])
-        cursor_y = self.cursor_line * line_height
+        cursor_row, cursor_x = self.row_and_x(self.cursor_line, self.cursor_column)
+        cursor_y = cursor_row * line_height
 
         viewport_width = self.viewport().width()
         viewport_height = self.viewport().height()
@@ -333,9 +543,43 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         elif cursor_y > y_offset + viewport_height - line_height:
             self.verticalScrollBar().setValue(cursor_y - viewport_height + line_height + vertical_padding)
 
+    def changeEvent(self, event):
+        # The first FontChange arrives from __init__, before there is anything to rebuild
+        if event.type() == QEvent.Type.FontChange and hasattr(self, 'line_widths'):
+            self.apply_font()
+        super().changeEvent(event)
+
+    def apply_font(self):
+        """Rebuild everything measured with the previous font, keeping the same line at the top."""
+        top = self.top_position()
+        font = self.font()
+        self.font_metrics = EditorFontMetrics(font)
+        self.column_offsets.set_font(font)
+        self.line_render_cache.set_font(font)
+        self.line_number_area.setFont(font)
+        self.update_line_number_area_width(0)
+        self.update_scrollbars()
+        self.scroll_to_position(*top)
+        self.viewport().update()
+
+    def set_max_measured_chars(self, count):
+        """Approximate the columns of lines longer than count characters instead of measuring them."""
+        if count == self.column_offsets.max_measured_chars:
+            return
+        self.column_offsets.set_max_measured_chars(count)
+        self.line_render_cache.clear()
+        self.update_scrollbars()
+        self.viewport().update()
+
+    def measure_line(self, text):
+        """Return the width of a line, approximated like its columns when it is too long to measure."""
+        if len(text) > self.column_offsets.max_measured_chars:
+            return self.column_offsets.x_for(text, len(text))
+        return self.font_metrics.width(text)
+
     def blink_cursor(self):
         self.cursor_visible = not self.cursor_visible
-        self.update()
+        self.viewport().update(self.cursor_rect())
 
     def event(self, event):
         if event.type() == QEvent.Type.KeyPress and event.key() == Qt.Key.Key_Tab:
@@ -344,46 +588,59 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         return super().event(event)
 
     def line_number_area_width(self):
-        digits = len(str(max(1, len(self.lines))))
-        fm = QFontMetrics(self.font())
-        max_width = fm.horizontalAdvance('9' * digits) + Theme.LINE_NUMBER_PADDING
+        digits = len(str(max(1, self.buffer.line_count())))
+        max_width = self.font_metrics.digit_width * digits + Theme.LINE_NUMBER_PADDING
         return max_width
 
     def update_line_number_area_width(self, _):
-        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+        width = self.line_number_area_width()
+        self.setViewportMargins(width, 0, 0, 0)
+        cr = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), width, cr.height()))
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         cr = self.contentsRect()
         self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
+        # Also called for resizes of the viewport alone, e.g. when the gutter grows
+        self.rewrap()
+
+    def scrollContentsBy(self, dx, dy):
+        """
+        Shift what is already painted and repaint only the rows scrolled into view.
+
+        QWidget.scroll moves the pixels in the backing store, along with any
+        pending dirty regions, so the painter only sees the exposed strip.
+        Edits and highlighting keep repainting the rows they change.
+        """
+        self.viewport().scroll(dx, dy)
+        if dy:
+            self.line_number_area.scroll(0, dy)
 
     def line_number_area_paint_event(self, event):
         """Paint the line numbers."""
         painter = QPainter(self.line_number_area)
         painter.fillRect(event.rect(), Theme.EDITOR_LINE_NUMBER_BACKGROUND)
 
-        fm = QFontMetrics(self.font())
-        line_height = fm.height()
+        line_height = self.font_metrics.line_height
         block_top = self.verticalScrollBar().value()
 
         viewport_offset = block_top
         paint_rect = event.rect()
 
-        first_visible_line = max(0, int(viewport_offset / line_height))
-        last_visible_line = min(
-            len(self.lines) - 1,
-            int((viewport_offset + self.viewport().height()) / line_height) + 1
-        )
+        first_visible_row = max(0, int(viewport_offset / line_height))
+        last_visible_row = int((viewport_offset + self.viewport().height()) / line_height) + 1
 
         painter.setPen(Theme.EDITOR_LINE_NUMBER_COLOR)
         painter.setFont(self.font())
         number_width = self.line_number_area.width()
 
-        for line_number in range(first_visible_line, last_visible_line + 1):
+        for row, line_number, _, start, _ in self.iter_rows(first_visible_row, last_visible_row):
 
-            y_pos = (line_number * line_height) - viewport_offset
+            y_pos = (row * line_height) - viewport_offset
 
-            if y_pos >= paint_rect.top() - line_height and y_pos <= paint_rect.bottom():
+            # Rows continuing a wrapped line have no number
+            if start == 0 and y_pos >= paint_rect.top() - line_height and y_pos <= paint_rect.bottom():
                 number = str(line_number + 1)
                 painter.drawText(
                     0, 
@@ -421,11 +678,27 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         # Additional language-specific rules can be added here
         return False
 
-    def update_scrollbars(self):
-        fm = QFontMetrics(self.font())
-        line_height = fm.height()
-        content_width = max(fm.horizontalAdvance(line) for line in self.lines) + Theme.CONTENT_WIDTH_PADDING
-        content_height = line_height * len(self.lines) + Theme.CONTENT_HEIGHT_PADDING
+    def update_scrollbars(self, line_widths=None):
+        """Measure every line, unless their widths are given, and reset both scroll bar ranges."""
+        if self.is_large_file():
+            # Far too many lines to measure: the longest at the average advance
+            self.content_width = (int(self.buffer.max_line_length() * self.column_offsets.average_width)
+                                  + Theme.CONTENT_WIDTH_PADDING)
+        else:
+            if line_widths is None:
+                line_widths = measure_lines(self.buffer.iter_lines(), self.font_metrics, self.column_offsets)
+            self.line_widths.reset(line_widths)
+            self.content_width = self.line_widths.max() + Theme.CONTENT_WIDTH_PADDING
+        self.reset_wrap()
+        self.apply_scrollbar_ranges()
+        self.line_number_area.update()
+
+    def apply_scrollbar_ranges(self):
+        """Apply the tracked content size to the scroll bars."""
+        line_height = self.font_metrics.line_height
+        # Wrapped lines never reach past the viewport
+        content_width = 0 if self.word_wrap else self.content_width
+        content_height = line_height * self.row_count() + Theme.CONTENT_HEIGHT_PADDING
 
         self.verticalScrollBar().setRange(0, max(0, content_height - self.viewport().height()))
         self.verticalScrollBar().setPageStep(int(self.viewport().height() * 0.1))
@@ -433,9 +706,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
 
         self.horizontalScrollBar().setRange(0, max(0, content_width - self.viewport().width()))
         self.horizontalScrollBar().setPageStep(int(self.viewport().width() * 0.2))
-        self.horizontalScrollBar().setSingleStep(int(fm.horizontalAdvance(' ')))
-
-        self.line_number_area.update()
+        self.horizontalScrollBar().setSingleStep(self.font_metrics.space_width)
 
     def keyPressEvent(self, event: QKeyEvent):
         modifiers = event.modifiers()
@@ -452,9 +723,13 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         elif key == Qt.Key.Key_Y and modifiers & Qt.KeyboardModifier.ControlModifier:
             self.redo()
             return
+        elif modifiers & Qt.KeyboardModifier.ControlModifier and self.handle_zoom_key(key):
+            return
         elif key in (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down):
             self.handle_cursor_movement(key, modifiers)
             return
+        elif self.buffer.read_only:
+            super().keyPressEvent(event)
         elif key == Qt.Key.Key_Backspace:
             self.handle_backspace(cursor_before)
         elif key == Qt.Key.Key_Delete:
@@ -484,7 +759,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         elif key == Qt.Key.Key_Down:
             self.move_cursor_down()
         self.clear_selection()
-        self.update()
+        self.update_cursor_and_selection()
 
     def is_identifier_char(self, char):
         """Check if a character can be part of an identifier."""
@@ -667,14 +942,13 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             self.delete_selection()
             return
 
-        line = self.lines[self.cursor_line]
+        line = self.buffer.line(self.cursor_line)
         if self.cursor_column >= len(line):
-            if self.cursor_line < len(self.lines) - 1:
+            if self.cursor_line < self.buffer.line_count() - 1:
                 # At end of line - delete newline and combine with next line
                 deleted_text = '\n'
                 self.add_undo_action('delete', (self.cursor_line, len(line)), deleted_text, cursor_before, "Delete Line Break")
-                next_line = self.lines.pop(self.cursor_line + 1)
-                self.lines[self.cursor_line] += next_line
+                self.delete_text((self.cursor_line, len(line)), deleted_text)
         else:
             # Find token boundaries
             _, token_end = self.get_token_boundaries(line, self.cursor_column)
@@ -683,7 +957,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             deleted_text = line[self.cursor_column:token_end]
             description = f"Delete Token: '{deleted_text}'"
             self.add_undo_action('delete', (self.cursor_line, self.cursor_column), deleted_text, cursor_before, description)
-            self.lines[self.cursor_line] = line[:self.cursor_column] + line[token_end:]
+            self.delete_text((self.cursor_line, self.cursor_column), deleted_text)
 
         self.after_text_change()
 
@@ -696,17 +970,16 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             self.delete_selection()
             return
 
-        line = self.lines[self.cursor_line]
+        line = self.buffer.line(self.cursor_line)
         if self.cursor_column == 0:
             if self.cursor_line > 0:
                 # At start of line - delete newline and combine with previous line
-                prev_line = self.lines[self.cursor_line - 1]
+                prev_length = self.buffer.line_length(self.cursor_line - 1)
                 deleted_text = '\n'
-                self.add_undo_action('delete', (self.cursor_line - 1, len(prev_line)), deleted_text, cursor_before, "Delete Line Break")
+                self.add_undo_action('delete', (self.cursor_line - 1, prev_length), deleted_text, cursor_before, "Delete Line Break")
                 self.cursor_line -= 1
-                self.cursor_column = len(prev_line)
-                self.lines[self.cursor_line] = prev_line + line
-                self.lines.pop(self.cursor_line + 1)
+                self.cursor_column = prev_length
+                self.delete_text((self.cursor_line, prev_length), deleted_text)
         else:
             # Find token boundaries
             token_start, _ = self.get_token_boundaries(line, self.cursor_column - 1)
@@ -715,7 +988,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             deleted_text = line[token_start:self.cursor_column]
             description = f"Delete Token: '{deleted_text}'"
             self.add_undo_action('delete', (self.cursor_line, token_start), deleted_text, cursor_before, description)
-            self.lines[self.cursor_line] = line[:token_start] + line[self.cursor_column:]
+            self.delete_text((self.cursor_line, token_start), deleted_text)
             self.cursor_column = token_start
 
         self.after_text_change()
@@ -732,16 +1005,15 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
                 self.add_undo_action('delete', (selection[0], selection[1]), text, cursor_before, "Delete Selection")
                 self.delete_selection()
             else:
-                line = self.lines[self.cursor_line]
+                line = self.buffer.line(self.cursor_line)
                 if self.cursor_column < len(line):
                     deleted_text = line[self.cursor_column]
                     self.add_undo_action('delete', (self.cursor_line, self.cursor_column), deleted_text, cursor_before, "Delete Character")
-                    self.lines[self.cursor_line] = line[:self.cursor_column] + line[self.cursor_column + 1:]
-                elif self.cursor_line < len(self.lines) - 1:
+                    self.delete_text((self.cursor_line, self.cursor_column), deleted_text)
+                elif self.cursor_line < self.buffer.line_count() - 1:
                     deleted_text = '\n'
                     self.add_undo_action('delete', (self.cursor_line, len(line)), deleted_text, cursor_before, "Join Lines")
-                    next_line = self.lines.pop(self.cursor_line + 1)
-                    self.lines[self.cursor_line] += next_line
+                    self.delete_text((self.cursor_line, len(line)), deleted_text)
             self.after_text_change()
 
     def handle_backspace(self, cursor_before):
@@ -756,7 +1028,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
                 self.add_undo_action('delete', (selection[0], selection[1]), text, cursor_before, "Delete Selection")
                 self.delete_selection()
             else:
-                line = self.lines[self.cursor_line]
+                line = self.buffer.line(self.cursor_line)
                 if self.cursor_column > 0:
                     # Check if we're at the end of a tab (multiple spaces)
                     if self.cursor_column >= 4:
@@ -764,26 +1036,25 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
                         if preceding == '    ':  # If previous 4 characters are spaces
                             deleted_text = preceding
                             self.add_undo_action('delete', (self.cursor_line, self.cursor_column - 4), deleted_text, cursor_before, "Delete Tab")
-                            self.lines[self.cursor_line] = line[:self.cursor_column - 4] + line[self.cursor_column:]
+                            self.delete_text((self.cursor_line, self.cursor_column - 4), deleted_text)
                             self.cursor_column -= 4
                         else:  # Normal single character deletion
                             deleted_text = line[self.cursor_column - 1]
                             self.add_undo_action('delete', (self.cursor_line, self.cursor_column - 1), deleted_text, cursor_before, "Delete Character")
-                            self.lines[self.cursor_line] = line[:self.cursor_column - 1] + line[self.cursor_column:]
+                            self.delete_text((self.cursor_line, self.cursor_column - 1), deleted_text)
                             self.cursor_column -= 1
                     else:  # Normal single character deletion
                         deleted_text = line[self.cursor_column - 1]
                         self.add_undo_action('delete', (self.cursor_line, self.cursor_column - 1), deleted_text, cursor_before, "Delete Character")
-                        self.lines[self.cursor_line] = line[:self.cursor_column - 1] + line[self.cursor_column:]
+                        self.delete_text((self.cursor_line, self.cursor_column - 1), deleted_text)
                         self.cursor_column -= 1
                 elif self.cursor_line > 0:  # Join with previous line
-                    prev_line = self.lines[self.cursor_line - 1]
-                    curr_line = self.lines.pop(self.cursor_line)
+                    prev_length = self.buffer.line_length(self.cursor_line - 1)
                     deleted_text = '\n'
-                    self.add_undo_action('delete', (self.cursor_line - 1, len(prev_line)), deleted_text, cursor_before, "Join Lines")
+                    self.add_undo_action('delete', (self.cursor_line - 1, prev_length), deleted_text, cursor_before, "Join Lines")
                     self.cursor_line -= 1
-                    self.cursor_column = len(prev_line)
-                    self.lines[self.cursor_line] = prev_line + curr_line
+                    self.cursor_column = prev_length
+                    self.delete_text((self.cursor_line, prev_length), deleted_text)
 
             self.after_text_change()
 
@@ -795,12 +1066,11 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             self.add_undo_action('delete', (selection[0], selection[1]), text, cursor_before)
             self.delete_selection()
 
-        current_line = self.lines[self.cursor_line]
+        current_line = self.buffer.line(self.cursor_line)
         current_indent = self.get_line_indentation(current_line)
         
         # Split the current line at cursor position
         line_before_cursor = current_line[:self.cursor_column]
-        line_after_cursor = current_line[self.cursor_column:]
         
         # Calculate the new indentation level
         new_indent = current_indent
@@ -817,9 +1087,8 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
         full_text = '\n' + indent_str
         self.add_undo_action('insert', (self.cursor_line, self.cursor_column), full_text, cursor_before)
         
-        # Update the lines
-        self.lines[self.cursor_line] = line_before_cursor
-        self.lines.insert(self.cursor_line + 1, indent_str + line_after_cursor)
+        # Update the buffer
+        self.insert_text((self.cursor_line, self.cursor_column), full_text)
         
         # Update cursor position
         self.cursor_line += 1
@@ -841,8 +1110,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
 
         tab_spaces = '    '
         self.add_undo_action('insert', (self.cursor_line, self.cursor_column), tab_spaces, cursor_before, "Insert Tab")
-        line = self.lines[self.cursor_line]
-        self.lines[self.cursor_line] = line[:self.cursor_column] + tab_spaces + line[self.cursor_column:]
+        self.insert_text((self.cursor_line, self.cursor_column), tab_spaces)
         self.cursor_column += len(tab_spaces)
         self.after_text_change()
 
@@ -855,8 +1123,7 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
             self.delete_selection()
         
         self.add_undo_action('insert', (self.cursor_line, self.cursor_column), text, cursor_before, f"Insert '{text}'")
-        line = self.lines[self.cursor_line]
-        self.lines[self.cursor_line] = line[:self.cursor_column] + text + line[self.cursor_column:]
+        self.insert_text((self.cursor_line, self.cursor_column), text)
         self.cursor_column += len(text)
         self.after_text_change()
 
@@ -882,13 +1149,13 @@ class TextEditor(EditorSyncMixin, CursorMixin, SelectionMixin, ClipboardMixin, U
 
     def focusInEvent(self, event):
         self.cursor_visible = True
-        self.cursor_timer.start(500)
-        self.update()
+        cursor_blinker.attach(self)
+        self.viewport().update(self.cursor_rect())
 
     def focusOutEvent(self, event):
         self.cursor_visible = False
-        self.cursor_timer.stop()
-        self.update()
+        cursor_blinker.detach(self)
+        self.viewport().update(self.cursor_rect())
 
     def toPlainText(self):
-        return '\n'.join(self.lines)
+        return self.buffer.text()
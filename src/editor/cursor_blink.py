@@ -0,0 +1,101 @@
+from PyQt6.QtCore import QObject, QTimer, Qt
+from PyQt6.QtGui import QGuiApplication
+from PyQt6 import sip
+
+
+class CursorBlinker(QObject):
+    """
+    One blink clock for every editor in the application.
+
+    Only the editor that has focus is attached, so hidden or unfocused tabs
+    never wake up. The clock stops while the application is inactive, and can
+    be switched off entirely, in which case the cursor stays solid. The
+    interval follows the platform's cursor flash time, where a flash time of
+    zero (the usual accessibility or remote-desktop setting) also means a
+    solid cursor.
+    """
+
+    # Used when the platform does not report a flash time
+    DEFAULT_INTERVAL = 500  # ms
+
+    def __init__(self):
+        super().__init__()
+        self.editor = None
+        self.enabled = True
+        self.timer = None
+
+    def _ensure_timer(self):
+        # Created on first use, once the application exists
+        if self.timer is None:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.blink)
+            app = QGuiApplication.instance()
+            if app is not None:
+                app.applicationStateChanged.connect(self.on_application_state_changed)
+
+    def interval(self):
+        """Half the platform's cursor flash time, or 0 if it asks for no blinking."""
+        app = QGuiApplication.instance()
+        if app is None:
+            return self.DEFAULT_INTERVAL
+        flash_time = app.styleHints().cursorFlashTime()
+        return flash_time // 2 if flash_time > 0 else 0
+
+    def set_enabled(self, enabled):
+        """Turn blinking on or off for every editor."""
+        self.enabled = enabled
+        if self.editor is not None:
+            self.restart()
+
+    def attach(self, editor):
+        """Blink the cursor of editor, which just received focus."""
+        self._ensure_timer()
+        if self.editor is not editor:
+            if self.editor is not None:
+                self.editor.destroyed.disconnect(self.on_editor_destroyed)
+            self.editor = editor
+            editor.destroyed.connect(self.on_editor_destroyed)
+        self.restart()
+
+    def detach(self, editor):
+        """Stop blinking editor, which lost focus."""
+        if self.editor is editor:
+            editor.destroyed.disconnect(self.on_editor_destroyed)
+            self.editor = None
+            self.stop_timer()
+
+    def restart(self):
+        """Show the cursor and start a new blink period, e.g. after a keystroke."""
+        if self.editor is None:
+            return
+        if not self.editor.cursor_visible:
+            self.editor.blink_cursor()
+        interval = self.interval()
+        app = QGuiApplication.instance()
+        active = app is None or app.applicationState() == Qt.ApplicationState.ApplicationActive
+        if self.enabled and interval > 0 and active:
+            self.timer.start(interval)
+        else:
+            self.timer.stop()
+
+    def blink(self):
+        if self.editor is not None and self.editor.isVisible():
+            self.editor.blink_cursor()
+
+    def on_application_state_changed(self, state):
+        if state == Qt.ApplicationState.ApplicationActive:
+            self.restart()
+        else:
+            self.stop_timer()
+
+    def on_editor_destroyed(self):
+        self.editor = None
+        self.stop_timer()
+
+    def stop_timer(self):
+        # Editors losing focus while the application shuts down can outlive the timer
+        if self.timer is not None and not sip.isdeleted(self.timer):
+            self.timer.stop()
+
+
+cursor_blinker = CursorBlinker()
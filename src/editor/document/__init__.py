@@ -0,0 +1,29 @@
+# src/editor/document/__init__.py
+
+from .piece_table import PieceTable
+from .line_index import LineIndex
+from .changes import TextChange
+from .mapped import MappedDocument
+from .encoding import FileFormat, decode_file, sniff_encoding, detect_line_ending
+from .loader import DocumentLoader, LoadedFile, document_loader
+from .saver import DocumentSaver, SaveResult, document_saver
+from .hibernation import write_snapshot, read_snapshot
+
+__all__ = [
+    'PieceTable',
+    'LineIndex',
+    'TextChange',
+    'MappedDocument',
+    'DocumentLoader',
+    'LoadedFile',
+    'document_loader',
+    'DocumentSaver',
+    'SaveResult',
+    'document_saver',
+    'write_snapshot',
+    'read_snapshot',
+    'FileFormat',
+    'decode_file',
+    'sniff_encoding',
+    'detect_line_ending',
+]
@@ -0,0 +1,40 @@
+class TextChange:
+    """
+    Describes a single edit applied to a document buffer.
+
+    Positions are (line, column) tuples. removed_end is expressed in the
+    coordinates of the document before the edit, inserted_end in the
+    coordinates after it; both start at the same position.
+    """
+    __slots__ = ('start', 'removed_end', 'inserted_end', 'offset', 'removed_length', 'inserted_length', 'version')
+
+    def __init__(self, start, removed_end, inserted_end, offset, removed_length, inserted_length, version):
+        self.start = start                      # (line, column) where the edit begins
+        self.removed_end = removed_end          # End of the removed text, old coordinates
+        self.inserted_end = inserted_end        # End of the inserted text, new coordinates
+        self.offset = offset                    # Absolute offset of start
+        self.removed_length = removed_length    # Number of characters removed
+        self.inserted_length = inserted_length  # Number of characters inserted
+        self.version = version                  # Buffer version after the edit
+
+    @property
+    def first_line(self):
+        return self.start[0]
+
+    @property
+    def removed_lines(self):
+        """Number of line breaks removed by the edit."""
+        return self.removed_end[0] - self.start[0]
+
+    @property
+    def inserted_lines(self):
+        """Number of line breaks inserted by the edit."""
+        return self.inserted_end[0] - self.start[0]
+
+    @property
+    def line_delta(self):
+        return self.inserted_lines - self.removed_lines
+
+    def __repr__(self):
+        return (f"TextChange(start={self.start}, removed_end={self.removed_end}, "
+                f"inserted_end={self.inserted_end}, version={self.version})")
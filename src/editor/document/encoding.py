@@ -0,0 +1,142 @@
+import codecs
+import os
+
+
+# Checked in order, so UTF-32 LE is not taken for UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Bytes of the start of a file checked by sniff_encoding
+SNIFF_BYTES = 64 * 1024
+
+# Bytes cp1252 leaves undefined; text containing them is read as latin-1
+CP1252_UNDEFINED = (b'\x81', b'\x8d', b'\x8f', b'\x90', b'\x9d')
+
+# Every byte outside 0x80-0x9f, the only range where cp1252 and latin-1 differ
+NOT_C1 = bytes(range(0x80)) + bytes(range(0xa0, 0x100))
+
+
+class FileFormat:
+    """
+    How a document is stored on disk: its encoding, the byte order mark it
+    starts with, if any, and the line ending its lines were separated by.
+
+    Documents hold their text with '\\n' line endings; encode() turns it back
+    into the bytes of the file.
+    """
+    __slots__ = ('encoding', 'bom', 'line_ending')
+
+    def __init__(self, encoding='utf-8', bom=b'', line_ending=os.linesep):
+        self.encoding = encoding
+        self.bom = bom
+        self.line_ending = line_ending
+
+    def encode(self, text):
+        """Return text as the bytes of a file in this format. Raises UnicodeEncodeError if it cannot hold it."""
+        if self.line_ending != '\n':
+            text = text.replace('\n', self.line_ending)
+        return self.bom + text.encode(self.encoding)
+
+    def __eq__(self, other):
+        return (isinstance(other, FileFormat) and self.encoding == other.encoding
+                and self.bom == other.bom and self.line_ending == other.line_ending)
+
+    def __repr__(self):
+        return f"FileFormat({self.encoding!r}, {self.bom!r}, {self.line_ending!r})"
+
+
+def sniff_encoding(data, sample=SNIFF_BYTES):
+    """
+    Return the (encoding, bom) of the bytes of a file.
+
+    A byte order mark decides. Otherwise the first sample bytes are checked:
+    UTF-16 without a mark shows up as a zero in every other byte, and UTF-8
+    is validated with an incremental decoder, so a character cut off at the
+    end of the sample does not count against it. Anything else is taken to
+    be cp1252, or latin-1 if it uses a byte cp1252 does not define. Only the
+    sample is looked at, so decode_file() still confirms UTF-8 on the rest.
+    """
+    encoding, bom = _sniff_unicode(data, sample)
+    return encoding or single_byte_encoding(data), bom
+
+
+def _sniff_unicode(data, sample):
+    """Return the (encoding, bom) of data if it looks like UTF-8, UTF-16 or UTF-32, else (None, b'')."""
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding, bom
+
+    prefix = data[:sample]
+    half = len(prefix) // 2
+    if half:
+        even_zeros = prefix[0::2].count(0)
+        odd_zeros = prefix[1::2].count(0)
+        if odd_zeros > half * 0.3 and even_zeros < half * 0.05:
+            return 'utf-16-le', b''
+        if even_zeros > half * 0.3 and odd_zeros < half * 0.05:
+            return 'utf-16-be', b''
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=len(prefix) == len(data))
+        return 'utf-8', b''
+    except UnicodeDecodeError:
+        return None, b''
+
+
+def _cp1252_undefined(c1):
+    return any(byte in c1 for byte in CP1252_UNDEFINED)
+
+
+def single_byte_encoding(data):
+    """Return 'cp1252' if it can decode data, else 'latin-1', which decodes anything."""
+    return 'latin-1' if _cp1252_undefined(data.translate(None, NOT_C1)) else 'cp1252'
+
+
+def decode_single_byte(data):
+    """Decode data in the encoding single_byte_encoding() picks and return (text, encoding)."""
+    c1 = data.translate(None, NOT_C1)
+    if _cp1252_undefined(c1):
+        return str(data, 'latin-1'), 'latin-1'
+    if not c1:
+        # The two agree on every other byte, and latin-1 decodes much faster
+        return str(data, 'latin-1'), 'cp1252'
+    return str(data, 'cp1252'), 'cp1252'
+
+
+def detect_line_ending(text, default=os.linesep):
+    """Return the line ending of the first line of text that has one, or default if none does."""
+    newline = text.find('\n')
+    carriage_return = text.find('\r', 0, newline if newline != -1 else len(text))
+    if carriage_return == -1:
+        return '\n' if newline != -1 else default
+    return '\r\n' if carriage_return == newline - 1 else '\r'
+
+
+def decode_file(data):
+    """
+    Decode the bytes of a file in a single pass and return (text, FileFormat).
+
+    The text has '\\n' line endings, whatever the file used; the FileFormat
+    records what it did use, so saving writes the file back the same way.
+    Should the rest of a file that looked like UTF-8 turn out not to be, it
+    is decoded as a single-byte encoding instead.
+    """
+    encoding, bom = _sniff_unicode(data, SNIFF_BYTES)
+    text = None
+    if encoding is not None:
+        try:
+            text = str(memoryview(data)[len(bom):], encoding)
+        except UnicodeDecodeError:
+            pass  # Valid in the sample only
+    if text is None:
+        text, encoding = decode_single_byte(data)
+        bom = b''
+    line_ending = detect_line_ending(text)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, FileFormat(encoding, bom, line_ending)
@@ -0,0 +1,78 @@
+import json
+import struct
+import zlib
+
+from .encoding import FileFormat
+from ..actions.action import Action
+
+
+# Start of every snapshot file, followed by the header length
+MAGIC = b'EDSNAP1\n'
+HEADER_LENGTH = struct.Struct('<I')
+
+# zlib level; snapshots are written and read back within a session, so speed matters more than size
+COMPRESSION_LEVEL = 1
+
+ACTION_FIELDS = ('action_type', 'position', 'text', 'selection_start', 'selection_end',
+                 'cursor_before', 'cursor_after', 'description')
+
+
+def _action_to_list(action):
+    return [getattr(action, field) for field in ACTION_FIELDS]
+
+
+def _action_from_list(values):
+    # Positions were tuples before going through JSON
+    values = [tuple(value) if isinstance(value, list) else value for value in values]
+    return Action(**dict(zip(ACTION_FIELDS, values)))
+
+
+def write_snapshot(file, document, undo_stack, redo_stack, chunk_chars=1024 * 1024):
+    """
+    Write document, which may be a snapshot being read on another thread,
+    and its undo journal to the binary file.
+
+    The file holds a JSON header with the document's FileFormat and its
+    undo and redo stacks, followed by the text, UTF-8 encoded and
+    compressed a chunk at a time, so the text is never joined in memory.
+    """
+    file_format = document.file_format
+    header = json.dumps({
+        'encoding': file_format.encoding,
+        'bom': file_format.bom.hex(),
+        'line_ending': file_format.line_ending,
+        'length': len(document),
+        'undo': [_action_to_list(action) for action in undo_stack],
+        'redo': [_action_to_list(action) for action in redo_stack],
+    }).encode('utf-8')
+    file.write(MAGIC)
+    file.write(HEADER_LENGTH.pack(len(header)))
+    file.write(header)
+    compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    for chunk in document.iter_chunks(chunk_chars):
+        file.write(compressor.compress(chunk.encode('utf-8', 'surrogatepass')))
+    file.write(compressor.flush())
+
+
+def read_snapshot(data):
+    """
+    Return (text, file_format, undo_stack, redo_stack) from the bytes of a
+    file written by write_snapshot. Raises ValueError if they are not one.
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a document snapshot")
+    start = len(MAGIC) + HEADER_LENGTH.size
+    if len(data) < start:
+        raise ValueError("Truncated document snapshot")
+    (header_length,) = HEADER_LENGTH.unpack_from(data, len(MAGIC))
+    try:
+        header = json.loads(bytes(data[start:start + header_length]))
+        text = zlib.decompress(memoryview(data)[start + header_length:]).decode('utf-8', 'surrogatepass')
+        if len(text) != header['length']:
+            raise ValueError("Truncated document snapshot")
+        file_format = FileFormat(header['encoding'], bytes.fromhex(header['bom']), header['line_ending'])
+        undo_stack = [_action_from_list(values) for values in header['undo']]
+        redo_stack = [_action_from_list(values) for values in header['redo']]
+    except (zlib.error, struct.error, KeyError, TypeError) as e:
+        raise ValueError(f"Damaged document snapshot: {e}") from e
+    return text, file_format, undo_stack, redo_stack
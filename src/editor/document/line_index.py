@@ -0,0 +1,212 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class FenwickTree:
+    """Prefix sums over a fixed-size list of integers with O(log n) updates."""
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count):
+        """Sum of the first count values."""
+        total = 0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def search(self, target):
+        """
+        Return (index, before) for the first value whose running total exceeds
+        target, where before is the sum of all values preceding it.
+        """
+        index = 0
+        before = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.size and before + self.tree[nxt] <= target:
+                index = nxt
+                before += self.tree[nxt]
+            step >>= 1
+        return index, before
+
+
+class LineIndex:
+    """
+    Line-start index for a document, maintained incrementally on edits.
+
+    Line lengths (each counting its trailing newline) are stored in blocks of at
+    most BLOCK_SIZE entries. Fenwick trees over the per-block line and character
+    totals locate the block for a line number or offset in O(log n), and the
+    remaining work inside a block is bounded by the block size.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, text=''):
+        lengths = [len(line) + 1 for line in text.split('\n')]
+        lengths[-1] -= 1  # The last line has no trailing newline
+        self._blocks = [lengths[i:i + self.BLOCK_SIZE] for i in range(0, len(lengths), self.BLOCK_SIZE)]
+        self._block_chars = [sum(block) for block in self._blocks]
+        self._rebuild()
+
+    def copy(self):
+        """Return an independent copy of the index."""
+        index = LineIndex.__new__(LineIndex)
+        index._blocks = [list(block) for block in self._blocks]
+        index._block_chars = list(self._block_chars)
+        index._rebuild()
+        return index
+
+    def _rebuild(self):
+        """Rebuild the block trees after blocks were split or merged."""
+        self._line_tree = FenwickTree([len(block) for block in self._blocks])
+        self._char_tree = FenwickTree(self._block_chars)
+        self._line_total = sum(len(block) for block in self._blocks)
+        self._char_total = sum(self._block_chars)
+
+    def _resize_block(self, block, line_delta, char_delta):
+        self._block_chars[block] += char_delta
+        self._line_tree.add(block, line_delta)
+        self._char_tree.add(block, char_delta)
+        self._line_total += line_delta
+        self._char_total += char_delta
+
+    def line_count(self):
+        return self._line_total
+
+    def __len__(self):
+        return self._char_total
+
+    def _locate_line(self, line):
+        """Return (block_index, index_in_block) for a line number."""
+        block, before = self._line_tree.search(line)
+        if block >= len(self._blocks):
+            block = len(self._blocks) - 1
+            return block, len(self._blocks[block]) - 1
+        return block, line - before
+
+    def line_start(self, line):
+        """Return the absolute offset of the first character of a line."""
+        line = max(0, min(line, self._line_total - 1))
+        block, index = self._locate_line(line)
+        return self._char_tree.prefix_sum(block) + sum(self._blocks[block][:index])
+
+    def line_length(self, line):
+        """Return the length of a line, excluding its trailing newline."""
+        block, index = self._locate_line(line)
+        length = self._blocks[block][index]
+        return length if line == self._line_total - 1 else length - 1
+
+    def iter_line_starts(self, line=0):
+        """Yield the start offset of the given line and of every line after it."""
+        if line >= self._line_total:
+            return
+        line = max(0, line)
+        offset = self.line_start(line)
+        block, index = self._locate_line(line)
+        for lengths in self._blocks[block:]:
+            for length in lengths[index:]:
+                yield offset
+                offset += length
+            index = 0
+
+    def offset_of(self, line, column):
+        """Convert a (line, column) position to an absolute offset."""
+        return self.line_start(line) + column
+
+    def position_of(self, offset):
+        """Convert an absolute offset to a (line, column) position."""
+        offset = max(0, min(offset, self._char_total))
+        if offset == self._char_total:
+            last = self._line_total - 1
+            return last, offset - self.line_start(last)
+        block, before = self._char_tree.search(offset)
+        lines_before = self._line_tree.prefix_sum(block)
+        ends = list(accumulate(self._blocks[block]))
+        index = bisect_right(ends, offset - before)
+        line_start = before + (ends[index - 1] if index else 0)
+        return lines_before + index, offset - line_start
+
+    def insert(self, line, column, text):
+        """Update the index for text inserted at (line, column)."""
+        if not text:
+            return
+        segments = text.split('\n')
+        block, index = self._locate_line(line)
+        lengths = self._blocks[block]
+        old_length = lengths[index]
+        if len(segments) == 1:
+            lengths[index] = old_length + len(text)
+            self._resize_block(block, 0, len(text))
+            return
+
+        # The edited line is cut at the column: its head joins the first segment
+        # and its tail (including any trailing newline) follows the last one.
+        new_lengths = [column + len(segments[0]) + 1]
+        new_lengths.extend(len(segment) + 1 for segment in segments[1:-1])
+        new_lengths.append(len(segments[-1]) + old_length - column)
+        lengths[index:index + 1] = new_lengths
+        if len(lengths) > 2 * self.BLOCK_SIZE:
+            pieces = [lengths[i:i + self.BLOCK_SIZE] for i in range(0, len(lengths), self.BLOCK_SIZE)]
+            self._blocks[block:block + 1] = pieces
+            self._block_chars[block:block + 1] = [sum(piece) for piece in pieces]
+            self._rebuild()
+        else:
+            self._resize_block(block, len(segments) - 1, len(text))
+
+    def delete(self, start, end):
+        """Update the index for the text between two (line, column) positions being removed."""
+        start_line, start_column = start
+        end_line, end_column = end
+        removed = self.offset_of(end_line, end_column) - self.offset_of(start_line, start_column)
+        if removed <= 0:
+            return
+        if start_line == end_line:
+            block, index = self._locate_line(start_line)
+            self._blocks[block][index] -= removed
+            self._resize_block(block, 0, -removed)
+            return
+
+        end_block, end_index = self._locate_line(end_line)
+        tail = self._blocks[end_block][end_index] - end_column
+        first_block, first_index = self._locate_line(start_line)
+        self._blocks[first_block][first_index] = start_column + tail
+
+        touched = range(first_block, end_block + 1)
+        old_line_counts = [len(self._blocks[b]) for b in touched]
+
+        # Drop the lines after the start line up to and including the end line.
+        remaining = end_line - start_line
+        block, index = first_block, first_index + 1
+        while remaining:
+            lengths = self._blocks[block]
+            take = min(remaining, len(lengths) - index)
+            del lengths[index:index + take]
+            remaining -= take
+            block += 1
+            index = 0
+
+        if any(not self._blocks[b] for b in touched):
+            kept = [b for b in range(len(self._blocks)) if self._blocks[b]]
+            self._blocks = [self._blocks[b] for b in kept]
+            self._block_chars = [self._block_chars[b] if b not in touched else sum(self._blocks[i])
+                                 for i, b in enumerate(kept)]
+            self._rebuild()
+            return
+        for b, old_lines in zip(touched, old_line_counts):
+            self._resize_block(b, len(self._blocks[b]) - old_lines, sum(self._blocks[b]) - self._block_chars[b])
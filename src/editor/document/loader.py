@@ -0,0 +1,205 @@
+import logging
+import os
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QFont
+
+from .piece_table import PieceTable
+from .encoding import decode_file
+from .hibernation import read_snapshot
+from ..highlighting.formats import NO_SPANS
+from ..highlighting.lexers import lexer_registry
+from ..highlighting.pygments import PygmentsSyntaxHighlighter
+from ..rendering.column_offsets import ColumnOffsets
+from ..rendering.font_metrics import EditorFontMetrics
+from ..rendering.line_widths import measure_lines
+from ..themes.theme import Theme
+
+
+class LoadedFile:
+    """Outcome of a background load, ready to be shown in an editor."""
+    __slots__ = ('path', 'buffer', 'language', 'highlighter', 'highlighted_lines', 'line_widths',
+                 'max_measured_chars', 'undo_stack', 'redo_stack', 'error', 'cancelled')
+
+    def __init__(self, path, cancelled):
+        self.path = path
+        self.buffer = None              # PieceTable holding the text, with the file's FileFormat
+        self.language = None            # Detected language, or None for plain text
+        self.highlighter = None         # Highlighter that has lexed the first screen, or None
+        self.highlighted_lines = None   # Spans for every line, filled in for the first screen
+        self.line_widths = None         # Width of every line in the default editor font
+        self.max_measured_chars = None  # Limit the widths were measured with; see ColumnOffsets
+        self.undo_stack = None          # Undo and redo history when restored from a snapshot, else None
+        self.redo_stack = None
+        self.error = None               # Message for the user if the file could not be opened
+        self.cancelled = cancelled      # Event identifying the job
+
+
+class LoadJob(QRunnable):
+    """Reads, decodes, splits, measures and starts highlighting one file on a pool thread."""
+
+    def __init__(self, loader, path, visible, font, max_measured_chars, snapshot_path=None):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.visible = visible
+        self.font = font
+        self.max_measured_chars = max_measured_chars
+        self.cancelled = threading.Event()
+
+    def run(self):
+        result = LoadedFile(self.path, self.cancelled)
+        try:
+            data = self.read()
+            if data is not None:
+                self.prepare(result, data)
+        except OSError as e:
+            logging.error(f"Error opening file '{self.path}': {e}")
+            result.error = f"Could not open file:\n{e}"
+        except Exception as e:
+            # Such as a damaged snapshot or a MemoryError. Raised from here, it would abort the application.
+            reason = str(e) or type(e).__name__
+            if self.snapshot_path:
+                logging.error(f"Error restoring '{self.path}' from {self.snapshot_path}: {reason}")
+                result.error = f"Could not restore file:\n{reason}"
+            else:
+                logging.error(f"Error opening file '{self.path}': {reason}")
+                result.error = f"Could not open file:\n{reason}"
+        # Always sent, so the loader forgets the job; results of cancelled jobs are dropped there
+        try:
+            self.loader.jobFinished.emit(result)
+        except RuntimeError:
+            pass  # The loader was deleted while the job ran
+
+    def read(self):
+        """Read the whole file once, reporting progress after every chunk. Returns None if cancelled."""
+        with open(self.snapshot_path or self.path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            chunks = []
+            done = 0
+            while True:
+                chunk = file.read(DocumentLoader.READ_CHUNK)
+                if not chunk:
+                    break
+                if self.cancelled.is_set():
+                    return None
+                chunks.append(chunk)
+                done += len(chunk)
+                if size:
+                    try:
+                        self.loader.jobProgress.emit(self.cancelled, min(done / size, 1.0))
+                    except RuntimeError:
+                        return None  # The loader was deleted, e.g. on exit
+        return b''.join(chunks)
+
+    def prepare(self, result, data):
+        if self.snapshot_path:
+            text, file_format, result.undo_stack, result.redo_stack = read_snapshot(data)
+        else:
+            text, file_format = decode_file(data)
+        result.buffer = PieceTable(text, file_format)
+        result.highlighted_lines = [NO_SPANS] * result.buffer.line_count()
+        if self.cancelled.is_set():
+            return
+        column_offsets = ColumnOffsets(self.font)
+        column_offsets.set_max_measured_chars(self.max_measured_chars)
+        result.line_widths = measure_lines(result.buffer.iter_lines(), EditorFontMetrics(self.font), column_offsets)
+        result.max_measured_chars = self.max_measured_chars
+        if self.cancelled.is_set():
+            return
+        try:
+            result.language = lexer_registry.detect_language(self.path, text)
+            if result.language:
+                highlighter = PygmentsSyntaxHighlighter(result.language)
+                highlighter.cancel_event = self.cancelled
+                highlighter.rehighlight(result.buffer, result.highlighted_lines, self.visible)
+                highlighter.cancel_event = None
+                result.highlighter = highlighter
+        except Exception as e:
+            # The editor highlights from scratch instead
+            logging.error(f"Error highlighting '{self.path}' while loading: {e}")
+            result.highlighter = None
+            result.highlighted_lines = [NO_SPANS] * result.buffer.line_count()
+
+
+class DocumentLoader(QObject):
+    """
+    Opens files on a thread pool so the GUI stays responsive.
+
+    Each job reads its file once as bytes, detects its encoding and line
+    endings while decoding it (see decode_file), builds the PieceTable and
+    its line index, measures every line in the default editor font, detects
+    the language and lexes the lines that will be shown first. The GUI
+    thread only has to put the finished LoadedFile into an editor. Progress
+    is reported while the file is read.
+
+    A file can also be restored from a snapshot written by write_snapshot,
+    such as those of hibernated tabs, together with its undo history.
+
+    There is at most one job per path; loading a path again while it loads
+    reuses the pending job. Results of cancelled jobs are dropped.
+    """
+
+    jobProgress = pyqtSignal(object, float)  # Emitted from the pool thread
+    jobFinished = pyqtSignal(object)         # Likewise
+    progress = pyqtSignal(str, float)        # Path and fraction read, on the GUI thread
+    finished = pyqtSignal(object)            # LoadedFile, on the GUI thread
+
+    # Bytes read between progress reports
+    READ_CHUNK = 4 * 1024 * 1024
+
+    # Lines lexed before the file is handed over when no visible lines are given
+    FIRST_SCREEN_LINES = 100
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.jobs = {}  # Path -> cancel event of the pending job
+        self.jobProgress.connect(self.on_job_progress, Qt.ConnectionType.QueuedConnection)
+        self.jobFinished.connect(self.on_job_finished, Qt.ConnectionType.QueuedConnection)
+
+    def load(self, path, visible=None, max_measured_chars=ColumnOffsets.MAX_MEASURED_CHARS, snapshot_path=None):
+        """
+        Start loading path in the background, lexing the (first, last) visible
+        lines first. Lines are measured like an editor with the given
+        max_measured_chars would. With a snapshot_path, the text is read from
+        that snapshot instead of from path.
+        """
+        if path in self.jobs:
+            return
+        if visible is None:
+            visible = (0, self.FIRST_SCREEN_LINES - 1)
+        job = LoadJob(self, path, visible, QFont(Theme.get_default_font()), max_measured_chars, snapshot_path)
+        self.jobs[path] = job.cancelled
+        self.pool.start(job)
+
+    def cancel(self, path):
+        """Drop the pending load of path, if any."""
+        cancelled = self.jobs.pop(path, None)
+        if cancelled is not None:
+            cancelled.set()
+
+    def is_loading(self, path):
+        return path in self.jobs
+
+    def _path_of(self, cancelled):
+        for path, event in self.jobs.items():
+            if event is cancelled:
+                return path
+        return None
+
+    def on_job_progress(self, cancelled, fraction):
+        path = self._path_of(cancelled)
+        if path is not None:
+            self.progress.emit(path, fraction)
+
+    def on_job_finished(self, result):
+        if self.jobs.get(result.path) is not result.cancelled:
+            return  # Cancelled, or replaced by a newer load
+        del self.jobs[result.path]
+        self.finished.emit(result)
+
+
+document_loader = DocumentLoader()
@@ -0,0 +1,227 @@
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+from .encoding import FileFormat, detect_line_ending, sniff_encoding
+
+
+class MappedDocument:
+    """
+    Read-only document backed by a memory-mapped file, for files too large to
+    load into a PieceTable.
+
+    Nothing is read up front except the first INDEX_CHUNK bytes, whose lines
+    are indexed at once so the first screen can be shown. A background thread
+    indexes the rest: the start offset of every line is kept in an array of
+    64-bit integers, found a chunk at a time with bytes.split and running sums
+    so the scan runs in C. line_count() grows as indexing goes on. Indexing
+    reads the file rather than the mapping, so only the pages of lines that
+    are shown become part of the process. Lines are only decoded when read,
+    in the encoding sniffed from the start of the file as decode_file() would
+    (see file_format), and the last few are kept.
+
+    Offsets work as in PieceTable for selections and copying, but count from
+    the byte offset of their line's start: offset_of(line, column) is that
+    start plus the column. They are in document order, and slice() and
+    position_of() turn them back into text and positions.
+    """
+
+    read_only = True
+
+    # Files at least this large are opened as a MappedDocument
+    LARGE_FILE_SIZE = 64 * 1024 * 1024
+
+    # Bytes indexed per step; the scan holds the GIL for about this long
+    INDEX_CHUNK = 1024 * 1024
+
+    CACHED_LINES = 256
+
+    # Encodings whose newline is not the byte b'\n', which lines are indexed by.
+    # Files in them are loaded into a PieceTable instead, whatever their size.
+    WIDE_ENCODINGS = ('utf-16', 'utf-32')
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        # An empty file cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b''
+        self.file_format = self._sniff(self._map[:self.INDEX_CHUNK])
+        if self.file_format is None:
+            if self._size:
+                self._map.close()
+            self._file.close()
+            raise ValueError(f"The lines of {path} cannot be indexed from a memory map")
+        bom = self.file_format.bom
+        # The byte order mark is not part of the first line
+        self._file.seek(len(bom))
+        self._starts = array('q', [len(bom)])  # Start offset of every line found so far
+        self._indexed = len(bom)               # Bytes scanned so far
+        self._longest = 0                      # Length in bytes of the longest line found so far
+        self._done = False
+        self._lines = OrderedDict()
+        self._stop = threading.Event()
+        self._thread = None
+        self._index_chunk()
+        if not self._done:
+            self._thread = threading.Thread(target=self._index_rest, name='index ' + os.path.basename(path),
+                                            daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def _sniff(cls, head):
+        """
+        Return the FileFormat of a file starting with the bytes head, or None
+        if its lines cannot be indexed by the byte b'\\n'.
+        """
+        # Detected like decode_file() does, from the start of the file
+        encoding, bom = sniff_encoding(head)
+        # Lines are shown without their '\r'; the first line's ending is only recorded in the FileFormat
+        line_ending = detect_line_ending(head.decode('latin-1'), default='\n')
+        # Old Mac files end their lines with '\r' alone, so they have no b'\n' to index them by
+        if encoding.startswith(cls.WIDE_ENCODINGS) or line_ending == '\r':
+            return None
+        return FileFormat(encoding, bom, line_ending)
+
+    @classmethod
+    def is_large(cls, path):
+        """
+        Whether the file at path should be opened as a MappedDocument: it is
+        at least LARGE_FILE_SIZE bytes and its lines end in b'\\n', which
+        rules out the WIDE_ENCODINGS and files ending them with '\\r' alone.
+        """
+        if os.path.getsize(path) < cls.LARGE_FILE_SIZE:
+            return False
+        with open(path, 'rb') as file:
+            return cls._sniff(file.read(cls.INDEX_CHUNK)) is not None
+
+    def close(self):
+        """Stop indexing and unmap the file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _index_rest(self):
+        while not self._done and not self._stop.is_set():
+            self._index_chunk()
+
+    def _index_chunk(self):
+        start = self._indexed
+        # Only as far as was mapped, should the file have grown since
+        chunk = self._file.read(min(self.INDEX_CHUNK, self._size - start))
+        end = start + len(chunk)
+        if not chunk:
+            # Cut short since it was mapped
+            self._size = end
+        lengths = list(map(len, chunk.split(b'\n')))
+        # The first part ends the line the previous chunk left open, and the
+        # last part runs on into the next chunk
+        line_start = self._starts[-1]
+        longest = max(start + lengths[0] - line_start, max(lengths[1:-1], default=0))
+        starts = list(accumulate(map((1).__add__, lengths[:-1]), initial=start))[1:]
+        if end == self._size:
+            longest = max(longest, end - (starts[-1] if starts else line_start))
+        self._longest = max(self._longest, longest)
+        # The GUI thread reads the starts without a lock while this runs on the indexing
+        # thread. That is safe only because extend() adds them all while holding the GIL.
+        self._starts.extend(starts)
+        self._indexed = end
+        # Set last, as line_count() relies on the starts being complete by then
+        self._done = end == self._size
+        if self._done:
+            self._file.close()
+
+    def is_indexed(self):
+        """Whether every line has been found."""
+        return self._done
+
+    def max_line_length(self):
+        """Length in bytes of the longest line found so far."""
+        return self._longest
+
+    def add_listener(self, callback):
+        """Edits are not possible, so listeners are never called."""
+
+    def remove_listener(self, callback):
+        pass
+
+    def snapshot(self):
+        # Already immutable
+        return self
+
+    def __len__(self):
+        last = self.line_count() - 1
+        return self.offset_of(last, self.line_length(last))
+
+    def line_count(self):
+        # Until indexing is done, the last start found is that of a line whose end is not
+        if self._done:
+            return len(self._starts)
+        return len(self._starts) - 1
+
+    def _line_end(self, i):
+        """Byte offset where line i ends, before its newline."""
+        if i + 1 < len(self._starts):
+            return self._starts[i + 1] - 1
+        return self._size
+
+    def _decode(self, start, end):
+        text = self._map[start:end].decode(self.file_format.encoding, errors='replace')
+        return text.replace('\r\n', '\n')
+
+    def line(self, i):
+        """Return the text of line i without its trailing newline."""
+        text = self._lines.get(i)
+        if text is not None:
+            self._lines.move_to_end(i)
+            return text
+        text = self._decode(self._starts[i], self._line_end(i))
+        if text.endswith('\r'):
+            text = text[:-1]
+        self._lines[i] = text
+        if len(self._lines) > self.CACHED_LINES:
+            self._lines.popitem(last=False)
+        return text
+
+    def line_length(self, i):
+        return len(self.line(i))
+
+    def line_start(self, i):
+        return self._starts[i]
+
+    def iter_lines(self):
+        """Iterate over every line found so far."""
+        for i in range(self.line_count()):
+            yield self.line(i)
+
+    def offset_of(self, line, column):
+        """Convert a (line, column) position to an offset, counted from the line's byte offset."""
+        return self._starts[line] + column
+
+    def position_of(self, offset):
+        """Convert an offset from offset_of back to a (line, column) position."""
+        line = max(0, min(bisect_right(self._starts, offset) - 1, self.line_count() - 1))
+        # Offsets inside a byte order mark belong to the start of the first line
+        return line, max(0, min(offset - self._starts[line], self.line_length(line)))
+
+    def slice(self, span):
+        """Return the text between two offsets from offset_of."""
+        first_line, first_column = self.position_of(span[0])
+        last_line, last_column = self.position_of(span[1])
+        if first_line == last_line:
+            return self.line(first_line)[first_column:last_column]
+        # The lines in between are decoded in one go
+        middle = self._decode(self._starts[first_line + 1], self._starts[last_line])
+        return self.line(first_line)[first_column:] + '\n' + middle + self.line(last_line)[:last_column]
+
+    def text(self):
+        """Return the whole document, decoding all of it."""
+        return self.slice((self.offset_of(0, 0), len(self)))
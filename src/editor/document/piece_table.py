@@ -0,0 +1,281 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from .line_index import LineIndex
+from .changes import TextChange
+from .encoding import FileFormat
+
+
+class Piece:
+    """A run of text taken from one of the piece table's buffers."""
+    __slots__ = ('buffer', 'start', 'length')
+
+    def __init__(self, buffer, start, length):
+        self.buffer = buffer  # Index into PieceTable._buffers
+        self.start = start    # Start offset inside that buffer
+        self.length = length  # Number of characters in the run
+
+
+class PieceTable:
+    """
+    Text buffer made of an immutable original buffer and an append-only add buffer.
+
+    The document is described by an ordered list of pieces, each pointing at a
+    slice of one of the buffers. Edits only split or trim pieces and append the
+    inserted text to the add buffer, so their cost depends on the number of
+    pieces rather than the size of the file.
+
+    Positions are absolute character offsets; ranges are ``(start, end)`` pairs.
+    Line lookups and offset <-> (line, column) conversion go through a LineIndex
+    that is updated alongside every edit.
+
+    Every edit bumps version and is reported to the registered listeners as a
+    TextChange.
+
+    file_format records how the text was stored on disk, so it can be saved
+    the same way.
+    """
+
+    read_only = False
+
+    # Once the add chunk being typed into reaches this size a new chunk is started,
+    # which keeps the cost of extending it constant.
+    ADD_CHUNK_SIZE = 4096
+
+    # Lines stitched together from more pieces than this are rewritten as a single
+    # piece the next time they are read, so heavy editing of one line stays cheap.
+    MAX_LINE_PIECES = 16
+
+    # The last line read at least this long is kept until the next edit
+    CACHED_LINE_LENGTH = 4096
+
+    def __init__(self, text='', file_format=None):
+        self.file_format = file_format or FileFormat()
+        # Buffer 0 is the original text; every later buffer is an add chunk.
+        self._buffers = [text]
+        self._pieces = []
+        if text:
+            self._pieces.append(Piece(0, 0, len(text)))
+        self.index = LineIndex(text)
+        self.version = 0
+        self._listeners = []
+        self._text = None  # Whole-document string, kept until the next edit
+        self._last_line = None  # (line number, text) of the last long line read, likewise
+        self._rebuild_prefixes()
+
+    def snapshot(self):
+        """
+        Return a copy of the document as it is now, unaffected by later edits.
+
+        Pieces are never modified in place and the buffers are immutable strings,
+        so only the piece list and the line index are duplicated. The copy is safe
+        to read from another thread while this table keeps being edited.
+        """
+        snapshot = PieceTable.__new__(PieceTable)
+        snapshot._buffers = list(self._buffers)
+        snapshot._pieces = list(self._pieces)
+        snapshot._piece_starts = list(self._piece_starts)
+        snapshot.index = self.index.copy()
+        snapshot.version = self.version
+        snapshot.file_format = self.file_format
+        snapshot._listeners = []
+        snapshot._text = self._text
+        snapshot._last_line = self._last_line
+        return snapshot
+
+    def add_listener(self, callback):
+        """Call callback(change) with a TextChange after every edit."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, start, removed_end, inserted_end, offset, removed_length, inserted_length):
+        self.version += 1
+        self._text = None
+        self._last_line = None
+        change = TextChange(start, removed_end, inserted_end, offset, removed_length, inserted_length, self.version)
+        for callback in list(self._listeners):
+            callback(change)
+
+    def _rebuild_prefixes(self):
+        """Recompute piece start offsets after an edit."""
+        self._piece_starts = [0]
+        self._piece_starts.extend(accumulate(p.length for p in self._pieces))
+
+    def _locate(self, offset):
+        """Return (piece_index, offset_within_piece) for an absolute offset."""
+        index = bisect_right(self._piece_starts, offset) - 1
+        index = min(index, len(self._pieces))
+        return index, offset - self._piece_starts[index]
+
+    def _append_to_add_buffer(self, text):
+        """Append text to the add buffer and return (buffer, start) for it."""
+        last = len(self._buffers) - 1
+        if last > 0 and len(self._buffers[last]) + len(text) <= self.ADD_CHUNK_SIZE:
+            start = len(self._buffers[last])
+            self._buffers[last] += text
+            return last, start
+        self._buffers.append(text)
+        return len(self._buffers) - 1, 0
+
+    def __len__(self):
+        return self._piece_starts[-1]
+
+    def line_count(self):
+        return self.index.line_count()
+
+    def offset_of(self, line, column):
+        """Convert a (line, column) position to an absolute offset."""
+        return self.index.offset_of(line, column)
+
+    def position_of(self, offset):
+        """Convert an absolute offset to a (line, column) position."""
+        return self.index.position_of(offset)
+
+    def insert(self, pos, text):
+        """Insert text at the absolute offset pos."""
+        if not text:
+            return
+        pos = max(0, min(pos, len(self)))
+        start = self.position_of(pos)
+        self.index.insert(*start, text)
+        self._insert_pieces(pos, text)
+        self._notify(start, start, self.position_of(pos + len(text)), pos, 0, len(text))
+
+    def _insert_pieces(self, pos, text):
+        index, within = self._locate(pos)
+        buffer, start = self._append_to_add_buffer(text)
+
+        # Typing usually continues right where the previous insert ended, in which
+        # case the previous piece can simply grow instead of adding a new one.
+        if within == 0 and index > 0:
+            prev = self._pieces[index - 1]
+            if prev.buffer == buffer and prev.start + prev.length == start:
+                self._pieces[index - 1] = Piece(buffer, prev.start, prev.length + len(text))
+                self._rebuild_prefixes()
+                return
+
+        new_piece = Piece(buffer, start, len(text))
+        if within == 0:
+            self._pieces.insert(index, new_piece)
+        else:
+            piece = self._pieces[index]
+            left = Piece(piece.buffer, piece.start, within)
+            right = Piece(piece.buffer, piece.start + within, piece.length - within)
+            self._pieces[index:index + 1] = [left, new_piece, right]
+        self._rebuild_prefixes()
+
+    def delete(self, span):
+        """Delete the characters in the (start, end) offset range."""
+        start, end = span
+        start = max(0, start)
+        end = min(end, len(self))
+        if start >= end:
+            return
+        start_position = self.position_of(start)
+        end_position = self.position_of(end)
+        self.index.delete(start_position, end_position)
+        self._replace_pieces(start, end, [])
+        self._notify(start_position, end_position, start_position, start, end - start, 0)
+
+    def _replace_pieces(self, start, end, new_pieces):
+        """Replace the pieces covering (start, end) with new_pieces."""
+        first, first_within = self._locate(start)
+        last, last_within = self._locate(end)
+
+        replacement = []
+        if first_within > 0:
+            piece = self._pieces[first]
+            replacement.append(Piece(piece.buffer, piece.start, first_within))
+        if last < len(self._pieces) and last_within > 0:
+            piece = self._pieces[last]
+            replacement.append(Piece(piece.buffer, piece.start + last_within, piece.length - last_within))
+            last += 1
+        replacement[first_within > 0:first_within > 0] = new_pieces
+        self._pieces[first:last] = replacement
+        self._rebuild_prefixes()
+
+    def slice(self, span):
+        """Return the text in the (start, end) offset range."""
+        start, end = span
+        start = max(0, start)
+        end = min(end, len(self))
+        if start >= end:
+            return ''
+        index, within = self._locate(start)
+        parts = []
+        remaining = end - start
+        while remaining > 0 and index < len(self._pieces):
+            piece = self._pieces[index]
+            take = min(piece.length - within, remaining)
+            begin = piece.start + within
+            parts.append(self._buffers[piece.buffer][begin:begin + take])
+            remaining -= take
+            within = 0
+            index += 1
+        return ''.join(parts)
+
+    def text(self):
+        """Return the whole document; the string is reused until the next edit."""
+        if self._text is None:
+            self._text = self.slice((0, len(self)))
+        return self._text
+
+    def iter_chunks(self, size):
+        """
+        Iterate over the document as consecutive strings of size characters,
+        the last one shorter, without joining the whole text.
+        """
+        parts = []
+        length = 0
+        for piece in self._pieces:
+            text = self._buffers[piece.buffer]
+            start = piece.start
+            end = start + piece.length
+            while start < end:
+                take = min(end - start, size - length)
+                parts.append(text[start:start + take])
+                length += take
+                start += take
+                if length == size:
+                    yield ''.join(parts)
+                    parts = []
+                    length = 0
+        if parts:
+            yield ''.join(parts)
+
+    def iter_lines(self):
+        """Iterate over every line of the document."""
+        yield from self.text().split('\n')
+
+    def line_start(self, i):
+        """Return the absolute offset of the first character of line i."""
+        return self.index.line_start(i)
+
+    def line_length(self, i):
+        return self.index.line_length(i)
+
+    def line(self, i):
+        """Return the text of line i without its trailing newline."""
+        # Painting, measuring and cursor movement read the same line in turn,
+        # which for a line megabytes long costs more than everything else
+        if self._last_line is not None and self._last_line[0] == i:
+            return self._last_line[1]
+        start = self.line_start(i)
+        end = start + self.line_length(i)
+        first, _ = self._locate(start)
+        last, _ = self._locate(end)
+        text = self.slice((start, end))
+        if last - first > self.MAX_LINE_PIECES:
+            self._compact(start, end, text)
+        if len(text) >= self.CACHED_LINE_LENGTH:
+            self._last_line = (i, text)
+        return text
+
+    def _compact(self, start, end, text):
+        """Rewrite the (start, end) range as a single piece without changing its text."""
+        self._buffers.append(text)
+        piece = Piece(len(self._buffers) - 1, 0, len(text))
+        self._replace_pieces(start, end, [piece])
@@ -0,0 +1,215 @@
+import codecs
+import logging
+import os
+import stat
+import tempfile
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+
+from .encoding import FileFormat
+
+
+def _read_umask():
+    # The umask can only be read by setting it; done once, before any thread writes files
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+UMASK = _read_umask()
+
+
+class SaveResult:
+    """Outcome of a background save."""
+    __slots__ = ('path', 'document', 'version', 'file_format', 'error')
+
+    def __init__(self, path, document, version, file_format):
+        self.path = path                # Path the document was written to
+        self.document = document        # The document saved, not the snapshot that was written
+        self.version = version          # Document version that was written
+        self.file_format = file_format  # Format written; UTF-8 if the document's own could not hold the text
+        self.error = None               # Why the file could not be written, if it could not
+
+
+class SaveJob(QRunnable):
+    """Writes a snapshot of one document to disk on a pool thread."""
+
+    def __init__(self, saver, path, document):
+        super().__init__()
+        # Kept until its result has been handled, which refers back to it
+        self.setAutoDelete(False)
+        self.saver = saver
+        self.path = path
+        self.document = document
+        # Taken now, so edits made while the job waits or runs are not written
+        self.snapshot = document.snapshot()
+        self.result = None
+
+    def run(self):
+        snapshot = self.snapshot
+        result = SaveResult(self.path, self.document, snapshot.version, snapshot.file_format)
+        try:
+            result.file_format = self.write()
+        except Exception as e:
+            logging.error(f"Error saving file '{self.path}': {e}")
+            result.error = e.strerror if isinstance(e, OSError) and e.strerror else str(e)
+        self.result = result
+        try:
+            self.saver.jobFinished.emit(self, result)
+        except RuntimeError:
+            pass  # The saver was deleted, e.g. on exit
+
+    def write(self):
+        """
+        Write the snapshot next to the file, make sure it reached the disk and
+        move it over the file. Returns the FileFormat written.
+        """
+        # Replace the file a link points to, not the link
+        path = os.path.realpath(self.path)
+        directory, name = os.path.split(path)
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+        except OSError as e:
+            e.filename = self.path  # Log the file being saved, not the temporary one
+            raise
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file_format = self.snapshot.file_format
+                try:
+                    self.write_text(file, file_format)
+                except UnicodeEncodeError:
+                    logging.warning(f"{file_format.encoding} cannot hold the text of {self.path}; saving it as UTF-8")
+                    file_format = FileFormat('utf-8', b'', file_format.line_ending)
+                    file.seek(0)
+                    file.truncate()
+                    self.write_text(file, file_format)
+                file.flush()
+                os.fsync(file.fileno())
+            # mkstemp creates the file readable by its owner only
+            try:
+                mode = stat.S_IMODE(os.stat(path).st_mode)
+            except FileNotFoundError:
+                mode = 0o666 & ~UMASK
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.sync_directory(directory)
+        return file_format
+
+    def write_text(self, file, file_format):
+        """Encode the snapshot a chunk at a time, reporting progress after each."""
+        snapshot = self.snapshot
+        total = len(snapshot)
+        encoder = codecs.getincrementalencoder(file_format.encoding)()
+        line_ending = file_format.line_ending
+        file.write(file_format.bom)
+        written = 0
+        for chunk in snapshot.iter_chunks(DocumentSaver.CHUNK_CHARS):
+            written += len(chunk)
+            if line_ending != '\n':
+                chunk = chunk.replace('\n', line_ending)
+            file.write(encoder.encode(chunk))
+            if written < total:
+                try:
+                    self.saver.jobProgress.emit(self, written / total)
+                except RuntimeError:
+                    pass
+        file.write(encoder.encode('', final=True))
+
+    @staticmethod
+    def sync_directory(directory):
+        """Make the rename itself durable, where directories can be opened."""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return  # Not possible on Windows, which needs no separate sync
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+class DocumentSaver(QObject):
+    """
+    Saves documents on a thread pool of its own.
+
+    save() takes a snapshot of the document, so it can be edited while it is
+    written. The text is written a chunk at a time, encoded in the document's
+    FileFormat, to a temporary file in the same directory. That file is
+    fsynced and then renamed over the original, so the file on disk is
+    always either the old or the new version, whatever happens meanwhile.
+
+    Saves of the same path run one after the other. Saving a path again while
+    it is being written queues one more save of it; further saves until that
+    one starts replace it, so repeated saves coalesce into at most two writes.
+    """
+
+    jobProgress = pyqtSignal(object, float)  # Emitted from the pool thread
+    jobFinished = pyqtSignal(object, object)  # Likewise
+    progress = pyqtSignal(str, float)        # Path and fraction written, on the GUI thread
+    finished = pyqtSignal(object)            # SaveResult, on the GUI thread
+
+    # Characters encoded and written at a time
+    CHUNK_CHARS = 1024 * 1024
+
+    # Files written at the same time
+    MAX_THREADS = 4
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        if pool is None:
+            pool = QThreadPool(self)
+            pool.setMaxThreadCount(self.MAX_THREADS)
+        self.pool = pool
+        self.running = {}  # Path -> job being written
+        self.queued = {}   # Path -> job to start once the running one finishes
+        self.jobProgress.connect(self.on_job_progress, Qt.ConnectionType.QueuedConnection)
+        self.jobFinished.connect(self.on_job_finished, Qt.ConnectionType.QueuedConnection)
+
+    def save(self, path, document):
+        """Write document to path in the background; finished reports the outcome."""
+        job = SaveJob(self, path, document)
+        if path in self.running:
+            self.queued[path] = job
+            return
+        self.running[path] = job
+        self.pool.start(job)
+
+    def is_saving(self, path=None):
+        """Whether path, or any file if path is None, is being saved."""
+        if path is None:
+            return bool(self.running)
+        return path in self.running
+
+    def wait(self):
+        """Block until every save, queued ones included, has been written, e.g. before exiting."""
+        while self.running:
+            self.pool.waitForDone()
+            # Their queued signals are ignored once handled here
+            for job in list(self.running.values()):
+                if job.result is not None:
+                    self.on_job_finished(job, job.result)
+
+    def on_job_progress(self, job, fraction):
+        if self.running.get(job.path) is job:
+            self.progress.emit(job.path, fraction)
+
+    def on_job_finished(self, job, result):
+        if self.running.get(job.path) is not job:
+            return
+        del self.running[job.path]
+        queued = self.queued.pop(job.path, None)
+        if queued is not None:
+            self.running[job.path] = queued
+            self.pool.start(queued)
+        self.finished.emit(result)
+
+
+document_saver = DocumentSaver()
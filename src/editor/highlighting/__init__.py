@@ -0,0 +1,21 @@
+# src/editor/highlighting/__init__.py
+
+from .base import SyntaxHighlighter
+from .pygments import PygmentsSyntaxHighlighter
+from .lexers import LexerRegistry, lexer_registry
+from .worker import HighlightWorker, HighlightResult
+from .formats import FORMAT_NAMES, FORMAT_IDS, NO_SPANS, pack_spans, unpack_spans
+
+__all__ = [
+    'SyntaxHighlighter',
+    'PygmentsSyntaxHighlighter',
+    'LexerRegistry',
+    'lexer_registry',
+    'HighlightWorker',
+    'HighlightResult',
+    'FORMAT_NAMES',
+    'FORMAT_IDS',
+    'NO_SPANS',
+    'pack_spans',
+    'unpack_spans',
+]
@@ -1,8 +1,49 @@
+import copy
 from abc import ABC, abstractmethod
 
 
 class SyntaxHighlighter(ABC):
+    # Set on clones running in the background; long passes stop once it is set
+    cancel_event = None
+
     @abstractmethod
-    def highlight(self, lines):
+    def highlight(self, buffer):
+        """Return a span array for every line of buffer; see highlighting.formats."""
+        pass
+
+    def invalidate(self, change):
+        """Record an edit so the next rehighlight knows which lines to redo."""
+        pass
+
+    def reset(self):
+        """Forget any incremental state so the next rehighlight covers everything."""
+        pass
+
+    def rehighlight(self, buffer, highlighted_lines, visible=None):
+        """
+        Bring highlighted_lines up to date after edits and return the (first, last)
+        lines that changed. Incremental highlighters may do this in several calls,
+        starting with the visible (first, last) lines, until is_complete() is true.
+        Highlighters without incremental support redo everything.
+        """
+        highlighted_lines[:] = self.highlight(buffer)
+        return 0, len(highlighted_lines) - 1
+
+    def is_complete(self):
+        """Whether every line has been highlighted since the last edit."""
+        return True
+
+    def covers(self, first, last):
+        """Whether the lines from first to last have been highlighted."""
+        return True
+
+    def clone(self):
+        """Return a copy whose state a background pass can advance independently."""
+        return copy.copy(self)
+
+    def adopt(self, other):
+        """Take over the state of a clone that finished a pass."""
         pass
 
+    def is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
@@ -0,0 +1,68 @@
+from array import array
+
+# Every format a highlighter can produce. Spans refer to formats by their index
+# in this tuple, so the order must only ever be appended to.
+FORMAT_NAMES = (
+    'text',
+    'keyword',
+    'keyword_declaration',
+    'keyword_namespace',
+    'keyword_pseudo',
+    'keyword_reserved',
+    'keyword_type',
+    'name',
+    'name_builtin',
+    'name_function',
+    'name_class',
+    'name_decorator',
+    'name_exception',
+    'name_variable',
+    'name_constant',
+    'name_attribute',
+    'string',
+    'string_doc',
+    'string_interpol',
+    'string_escape',
+    'number',
+    'literal',
+    'operator',
+    'punctuation',
+    'comment',
+    'comment_multiline',
+    'comment_preproc',
+    'generic',
+    'generic_deleted',
+    'generic_emph',
+    'generic_error',
+    'generic_heading',
+    'generic_inserted',
+    'generic_output',
+    'generic_prompt',
+    'generic_strong',
+    'generic_subheading',
+    'generic_traceback',
+    'error',
+)
+
+FORMAT_IDS = {name: format_id for format_id, name in enumerate(FORMAT_NAMES)}
+
+# The spans of a line are packed into an unsigned int array as consecutive
+# (start, length, format_id) triples.
+SPAN_FIELDS = 3
+
+# Shared by every line without spans. Span arrays are never modified in place.
+NO_SPANS = array('I')
+
+
+def pack_spans(spans):
+    """Pack (start, length, format_name) tuples into a span array."""
+    packed = array('I')
+    for start, length, format_name in spans:
+        packed.extend((start, length, FORMAT_IDS[format_name]))
+    return packed or NO_SPANS
+
+
+def unpack_spans(packed):
+    """Yield the (start, length, format_name) tuples stored in a span array."""
+    for i in range(0, len(packed), SPAN_FIELDS):
+        yield packed[i], packed[i + 1], FORMAT_NAMES[packed[i + 2]]
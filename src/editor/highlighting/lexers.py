@@ -0,0 +1,194 @@
+import os
+import re
+import threading
+
+from pygments.lexers import find_lexer_class_by_name, find_lexer_class_for_filename, get_lexer_by_name, guess_lexer
+from pygments.modeline import get_filetype_from_buffer
+from pygments.util import ClassNotFound
+
+# Extensions resolved without asking Pygments, which has to scan every lexer's
+# filename patterns (and load its plugin list the first time).
+EXTENSION_LANGUAGES = {
+    'py': 'python',
+    'js': 'javascript',
+    'html': 'html',
+    'css': 'css',
+    'cpp': 'cpp',
+    'c': 'c',
+    'java': 'java',
+    'json': 'json',
+    'xml': 'xml',
+    'md': 'markdown',
+    'yaml': 'yaml',
+    'yml': 'yaml',
+    'php': 'php',
+    'rb': 'ruby',
+    'go': 'go',
+    'rs': 'rust',
+}
+
+# Interpreters named in shebang lines that are not Pygments aliases themselves
+INTERPRETER_LANGUAGES = {
+    'node': 'javascript',
+    'nodejs': 'javascript',
+}
+
+EMACS_MODELINE = re.compile(r'-\*-.*?\bmode:\s*([\w+#.-]+).*?-\*-|-\*-\s*([\w+#.-]+)\s*-\*-')
+
+
+class LexerRegistry:
+    """
+    Process-wide cache of Pygments lexers and of the language detected per file.
+
+    Lexers only hold their options and compiled rules, so one instance per
+    language is shared by every highlighter, including the ones running on the
+    highlight worker. Creating the first lexer of a language imports its module
+    and compiles its rules, which prewarm() does ahead of time on a background
+    thread for the common languages.
+    """
+
+    # Characters of the document passed to guess_lexer when nothing else matched
+    GUESS_SAMPLE_CHARS = 8192
+
+    # Languages created by prewarm() when no list is given
+    COMMON_LANGUAGES = ('python', 'javascript', 'html', 'css', 'json', 'markdown', 'cpp', 'c')
+
+    def __init__(self):
+        self._lexers = {}      # Language name -> lexer, or None if Pygments has none
+        self._languages = {}   # File path -> detected language name, or None
+        self._lock = threading.Lock()
+
+    def get_lexer(self, language):
+        """Return the shared lexer for a language name, or None if there is none."""
+        if not language:
+            return None
+        with self._lock:
+            if language in self._lexers:
+                return self._lexers[language]
+        # Created outside the lock so a slow first lexer does not hold up others
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            lexer = None
+        with self._lock:
+            return self._lexers.setdefault(language, lexer)
+
+    def prewarm(self, languages=None):
+        """Create the lexers for the given (or the common) languages on a background thread."""
+        languages = tuple(languages or self.COMMON_LANGUAGES)
+
+        def warm():
+            for language in languages:
+                self.get_lexer(language)
+            # Loads the filename patterns used by detect_language for other extensions
+            find_lexer_class_for_filename('prewarm.txt')
+
+        thread = threading.Thread(target=warm, name='lexer-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def language_for_extension(self, ext):
+        """Map a file extension, without the dot, to a language name."""
+        return EXTENSION_LANGUAGES.get(ext.lower().lstrip('.'))
+
+    def detect_language(self, file_path, text=''):
+        """
+        Return the language name for a file, or None for no highlighting.
+
+        The extension is checked first, then a shebang or editor modeline, and
+        finally guess_lexer on the start of the text. The result is cached per
+        path; forget() drops it.
+        """
+        if file_path:
+            with self._lock:
+                if file_path in self._languages:
+                    return self._languages[file_path]
+        language = (self._language_from_filename(file_path)
+                    or self._language_from_header(text)
+                    or self.guess_language(text))
+        if file_path:
+            with self._lock:
+                self._languages[file_path] = language
+        return language
+
+    def forget(self, file_path):
+        """Drop the cached language of a file, e.g. after it was renamed."""
+        with self._lock:
+            self._languages.pop(file_path, None)
+
+    def guess_language(self, text):
+        """Return the language guess_lexer picks for the start of text, or None."""
+        if not text:
+            return None
+        try:
+            lexer = guess_lexer(text[:self.GUESS_SAMPLE_CHARS])
+        except ClassNotFound:
+            return None
+        language = lexer.aliases[0] if lexer.aliases else None
+        if language:
+            with self._lock:
+                self._lexers.setdefault(language, lexer)
+        return language
+
+    def _language_from_filename(self, file_path):
+        if not file_path:
+            return None
+        name = os.path.basename(file_path)
+        _, ext = os.path.splitext(name)
+        language = self.language_for_extension(ext) if ext else None
+        if language:
+            return language
+        lexer_class = find_lexer_class_for_filename(name)
+        if lexer_class and lexer_class.aliases:
+            return lexer_class.aliases[0]
+        return None
+
+    def _language_from_header(self, text):
+        """Return the language named by a shebang line or an Emacs/Vim modeline."""
+        if not text:
+            return None
+        first_line = text[:1024].split('\n', 1)[0]
+        if first_line.startswith('#!'):
+            language = self._language_from_shebang(first_line)
+            if language:
+                return language
+        match = EMACS_MODELINE.search(first_line)
+        if match:
+            language = self._known_language(match.group(1) or match.group(2))
+            if language:
+                return language
+        # Vim modelines may be in the first or last few lines
+        head = text[:4096]
+        tail = text[-4096:] if len(text) > 4096 else ''
+        filetype = get_filetype_from_buffer(head + '\n' + tail if tail else head)
+        return self._known_language(filetype) if filetype else None
+
+    def _language_from_shebang(self, line):
+        words = line[2:].split()
+        if not words:
+            return None
+        interpreter = os.path.basename(words[0])
+        if interpreter == 'env':
+            # Skip env's own options, such as -S
+            words = [word for word in words[1:] if not word.startswith('-')]
+            if not words:
+                return None
+            interpreter = os.path.basename(words[0])
+        interpreter = INTERPRETER_LANGUAGES.get(interpreter, interpreter)
+        # python3.11 -> python3 -> python
+        return self._known_language(interpreter) or self._known_language(interpreter.rstrip('0123456789.'))
+
+    def _known_language(self, name):
+        """Return the main alias of the lexer known as name, or None if there is none."""
+        if not name:
+            return None
+        name = name.lower()
+        if name in EXTENSION_LANGUAGES.values():
+            return name
+        try:
+            return find_lexer_class_by_name(name).aliases[0]
+        except (ClassNotFound, IndexError):
+            return None
+
+
+lexer_registry = LexerRegistry()
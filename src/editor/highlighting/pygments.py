@@ -1,55 +1,389 @@
-from pygments import lex
-from pygments.lexers import get_lexer_by_name, guess_lexer
-from pygments.token import Token
+from array import array
+
+from pygments.lexer import RegexLexer, ExtendedRegexLexer
+from pygments.token import Token, Error, Whitespace, _TokenType
 from src.editor.highlighting.base import SyntaxHighlighter
+from src.editor.highlighting.formats import FORMAT_IDS, NO_SPANS
+from src.editor.highlighting.lexers import lexer_registry
 
 class PygmentsSyntaxHighlighter(SyntaxHighlighter):
+    """
+    Highlighter backed by a Pygments lexer.
+
+    Spans are produced per line as packed arrays of (start, length, format_id)
+    triples; see highlighting.formats.
+
+    For plain RegexLexer lexers the document is lexed in slices. The lexer's
+    state stack is recorded at the start of every CHECKPOINT_INTERVAL-th line,
+    and `regions` lists the [start, end) runs of lines lexed so far, each one
+    continuing from the state stored for its first line. Only the region at line
+    0 starts from a known state; any other region starts from a guess, and when
+    the region above grows into it the two are merged as soon as the state and
+    the line's tokens agree. Until then the guessed lines are relexed.
+
+    This lets the visible lines be lexed first wherever they are, and it also
+    handles edits. An edit cuts the lines between the checkpoints around it out
+    of their region. Relexing that gap from the checkpoint above stops at the
+    checkpoint below, unless the edit changed how the rest of the file lexes.
+
+    Other lexers are re-run over the whole document.
+
+    Rules that look ahead across lines (an unterminated docstring or block
+    comment, say) can make a line depend on text typed below it; those lines
+    are only corrected once they are relexed again.
+    """
+
+    # Lexer states are kept for every CHECKPOINT_INTERVAL-th line
+    CHECKPOINT_INTERVAL = 16
+
+    # Lines lexed by one background slice
+    SLICE_LINES = 1000
+
+    # How often, in lines, a background pass checks whether it was cancelled
+    CANCEL_CHECK_INTERVAL = 64
+
+    # Format ID for every token type seen so far, shared by all instances.
+    # Subclasses that change token_to_format_name need a table of their own.
+    _format_ids = {}
+
     def __init__(self, language_name=None):
-        if language_name:
-            try:
-                self.lexer = get_lexer_by_name(language_name)
-            except Exception:
-                self.lexer = None
-        else:
-            self.lexer = None
+        # Lexers are shared through the registry; they keep no per-document state
+        self.lexer = lexer_registry.get_lexer(language_name)
+        self.line_states = []     # Lexer stack at the start of each line, or None
+        self.regions = []         # Sorted [start, end) runs of lexed lines
+        self._text_cache = None   # (buffer text, text padded for the lexer)
 
-    def highlight(self, lines):
-        text = '\n'.join(lines)
-        if self.lexer:
-            tokens = lex(text, self.lexer)
-        else:
-            # Guess the lexer if not specified
-            try:
-                self.lexer = guess_lexer(text)
-                tokens = lex(text, self.lexer)
-            except Exception:
+    def reset(self):
+        self.line_states = []
+        self.regions = []
+
+    def clone(self):
+        clone = super().clone()
+        clone.line_states = list(self.line_states)
+        clone.regions = [list(region) for region in self.regions]
+        return clone
+
+    def adopt(self, other):
+        self.lexer = other.lexer
+        self.line_states = other.line_states
+        self.regions = other.regions
+        self._text_cache = other._text_cache
+
+    def is_complete(self):
+        return self.regions == [[0, len(self.line_states)]]
+
+    def covers(self, first, last):
+        """Whether every line from first to last has been lexed."""
+        return any(start <= first and last < end for start, end in self.regions)
+
+    def supports_checkpoints(self):
+        """Whether the lexer state can be captured and resumed at line starts."""
+        lexer_type = type(self.lexer)
+        return (isinstance(self.lexer, RegexLexer)
+                and not isinstance(self.lexer, ExtendedRegexLexer)
+                and lexer_type.get_tokens_unprocessed is RegexLexer.get_tokens_unprocessed)
+
+    def _document_text(self, buffer):
+        """Return the text to lex, ending in the newline lexers expect, and the document length."""
+        text = buffer.text()
+        if self._text_cache is None or self._text_cache[0] is not text:
+            padded = text if text.endswith('\n') else text + '\n'
+            self._text_cache = (text, padded)
+        return self._text_cache[1], len(text)
+
+    def highlight(self, buffer):
+        line_count = buffer.line_count()
+        if not self.lexer:
+            # Guess the lexer from the start of the document if not specified
+            self.lexer = lexer_registry.get_lexer(lexer_registry.guess_language(buffer.text()))
+            if not self.lexer:
                 # Default to no highlighting
-                return [[] for _ in lines]
+                self.line_states = [None] * line_count
+                self.line_states[0] = ('root',)
+                self.regions = [[0, line_count]]
+                return [NO_SPANS] * line_count
 
-        highlighted_lines = [[] for _ in lines]
-        current_line = 0
-        current_pos = 0
+        text, doc_length = self._document_text(buffer)
+        highlighted_lines = []
+        self.line_states = []
+        line_starts = buffer.index.iter_line_starts(1)
+        for line, (spans, state) in enumerate(self._lex_lines(text, 0, doc_length, ('root',), line_starts)):
+            highlighted_lines.append(spans)
+            self.line_states.append(self._checkpoint(line, state))
+            if line % self.CANCEL_CHECK_INTERVAL == 0 and self.is_cancelled():
+                break
+        self.line_states[0] = ('root',)
+        self.regions = [[0, line_count]]
+        return highlighted_lines
+
+    def invalidate(self, change):
+        """Keep the checkpoints aligned with an edit and cut the edited lines out of their region."""
+        first = change.first_line
+        last = change.inserted_end[0]
+        self.line_states[first + 1:first + 1 + change.removed_lines] = [None] * change.inserted_lines
+        removed_last = change.removed_end[0]
+
+        regions = []
+        for start, end in self.regions:
+            if end <= first:
+                regions.append([start, end])
+            elif start > removed_last:
+                regions.append([start + change.line_delta, end + change.line_delta])
+            else:
+                # Keep the part above the checkpoint before the edit and the
+                # part from the first checkpoint after it.
+                if start <= first:
+                    cut = first
+                    while cut > start and self.line_states[cut] is None:
+                        cut -= 1
+                    if cut > start:
+                        regions.append([start, cut])
+                end += change.line_delta
+                resume = last + 1
+                while resume < end and self.line_states[resume] is None:
+                    resume += 1
+                if resume < end:
+                    regions.append([resume, end])
+        self.regions = regions
 
-        for tok_type, tok_value in tokens:
-            tok_lines = tok_value.split('\n')
-            for i, tok_line in enumerate(tok_lines):
-                if i > 0:
-                    current_line += 1
-                    current_pos = 0
+    def rehighlight(self, buffer, highlighted_lines, visible=None):
+        """
+        Lex one slice of the lines that are not highlighted yet, updating
+        highlighted_lines in place. The visible (first, last) lines come first,
+        then the gap nearest to them. Returns the (first, last) lines that were
+        recomputed, or None if there was nothing to do or the pass was cancelled.
+        """
+        line_count = buffer.line_count()
+        if len(highlighted_lines) != line_count:
+            highlighted_lines[:] = [NO_SPANS] * line_count
+        if not self.supports_checkpoints():
+            if self.is_complete():
+                return None
+            highlighted_lines[:] = self.highlight(buffer)
+            return 0, line_count - 1
+        if len(self.line_states) != line_count:
+            self.line_states = [None] * line_count
+            self.regions = []
+        if self.is_complete():
+            return None
 
-                if current_line >= len(lines):
+        line, target = self._next_slice(line_count, visible)
+        if line == 0:
+            self.line_states[0] = ('root',)
+        index = 0
+        while index < len(self.regions) and self.regions[index][1] < line:
+            index += 1
+        if index == len(self.regions) or self.regions[index][1] != line:
+            # Nothing above to continue from: start a region from a guessed state
+            self.regions.insert(index, [line, line])
+            if line:
+                self.line_states[line] = ('root',)
+        return self._extend(buffer, highlighted_lines, index, target)
+
+    def _next_slice(self, line_count, visible):
+        """Return the line to lex from and the line to lex up to for the next slice."""
+        gaps = []
+        previous_end = 0
+        for start, end in self.regions + [[line_count, line_count]]:
+            if start > previous_end:
+                gaps.append((previous_end, start))
+            previous_end = end
+        if visible is None:
+            start, _ = gaps[0]
+            return start, start + self.SLICE_LINES
+
+        first = max(0, min(visible[0], line_count - 1))
+        last = max(first, min(visible[1], line_count - 1))
+        for start, end in gaps:
+            if start <= last and end > first:
+                # Lex the visible lines first. Unless the lexed text above is
+                # close, start at the top of the view from a guessed state.
+                if first - start > last - first:
+                    start = first
+                return start, last + 1
+
+        def distance(gap):
+            start = gap[0]
+            return first - start if start < first else start - last
+        start, _ = min(gaps, key=distance)
+        return start, start + self.SLICE_LINES
+
+    def _extend(self, buffer, highlighted_lines, index, target):
+        """
+        Lex onward from the end of regions[index] until at least the target line,
+        merging with the next region once they agree. Returns the (first, last)
+        lines that were recomputed, or None if the pass was cancelled.
+        """
+        region = self.regions[index]
+        first = region[1]
+        text, doc_length = self._document_text(buffer)
+        line_starts = buffer.index.iter_line_starts(first + 1)
+        lines = self._lex_lines(text, buffer.line_start(first), doc_length, self.line_states[first], line_starts)
+
+        line = first
+        for spans, state in lines:
+            if line % self.CANCEL_CHECK_INTERVAL == 0 and self.is_cancelled():
+                return None
+            following = self.regions[index + 1] if index + 1 < len(self.regions) else None
+            if following is not None and line == following[0]:
+                if state is not None and state == self.line_states[line] and spans == highlighted_lines[line]:
+                    # Everything from here on lexes as it did before
+                    region[1] = following[1]
+                    del self.regions[index + 1]
+                    return first, line - 1
+                # The following region started from the wrong state: take over
+                # its lines up to its next checkpoint and compare again there
+                following[0] += 1
+                while following[0] < following[1] and self.line_states[following[0]] is None:
+                    following[0] += 1
+                if following[0] >= following[1]:
+                    del self.regions[index + 1]
+            elif line >= target and state is not None:
+                # Stop at a line start the next slice can resume from
+                region[1] = line
+                self.line_states[line] = state
+                return first, line - 1
+            highlighted_lines[line] = spans
+            if line != first:
+                self.line_states[line] = self._checkpoint(line, state)
+            line += 1
+
+        region[1] = line
+        return first, line - 1
+
+    def _checkpoint(self, line, state):
+        return state if line % self.CHECKPOINT_INTERVAL == 0 else None
+
+    def _lex_lines(self, text, pos, doc_length, stack, line_starts):
+        """
+        Lex text from the line starting at pos with the given state stack and
+        yield (spans, state) for each line, where state is the stack at the start
+        of the line, or None if a token runs across the line break before it.
+
+        line_starts iterates over the offsets of the following lines; anything
+        from doc_length on is padding and gets no spans.
+        """
+        line_starts = iter(line_starts)
+        line_start = pos
+        next_line_start = next(line_starts, doc_length + 1)
+        spans = array('I')
+        state = tuple(stack)
+        format_ids = self._format_ids
+
+        for offset, tok_type, tok_value in self._tokenize(text, pos, stack):
+            if tok_type is None:
+                # State marker for the line starting at offset
+                if offset > doc_length:
                     break
+                while offset >= next_line_start:
+                    yield spans or NO_SPANS, state
+                    spans = array('I')
+                    state = None
+                    line_start = next_line_start
+                    next_line_start = next(line_starts, doc_length + 1)
+                if offset == line_start and state is None and not spans:
+                    state = tok_value
+                continue
+            if offset >= doc_length:
+                break
 
-                length = len(tok_line)
-                if length == 0:
-                    continue
+            end = offset + len(tok_value)
+            format_id = format_ids.get(tok_type)
+            if format_id is None:
+                format_id = self.token_format_id(tok_type)
+            while offset < end:
+                while offset >= next_line_start:
+                    yield spans or NO_SPANS, state
+                    spans = array('I')
+                    state = None
+                    line_start = next_line_start
+                    next_line_start = next(line_starts, doc_length + 1)
+                # Spans never include the newline that ends their line
+                span_end = min(end, next_line_start - 1)
+                if span_end > offset:
+                    spans.extend((offset - line_start, span_end - offset, format_id))
+                    offset = span_end
+                else:
+                    offset = next_line_start
 
-                format_name = self.token_to_format_name(tok_type)
+        yield spans or NO_SPANS, state
+        if next_line_start <= doc_length:
+            yield NO_SPANS, None
+            for _ in line_starts:
+                yield NO_SPANS, None
 
-                highlighted_lines[current_line].append((current_pos, length, format_name))
-                current_pos += length
+    def _tokenize(self, text, pos, stack):
+        """
+        Run the lexer over text from pos, yielding (offset, token_type, value) tuples.
 
-        return highlighted_lines
+        For RegexLexer lexers this follows RegexLexer.get_tokens_unprocessed, and
+        also yields (offset, None, stack) whenever a match ends at a line start so
+        the state there can be recorded. Other lexers always start at the
+        beginning of the text.
+        """
+        if not self.supports_checkpoints():
+            yield from self.lexer.get_tokens_unprocessed(text)
+            return
+
+        lexer = self.lexer
+        tokendefs = lexer._tokens
+        statestack = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        while True:
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if m:
+                    if action is not None:
+                        if type(action) is _TokenType:
+                            yield pos, action, m.group()
+                        else:
+                            yield from action(lexer, m)
+                    moved = m.end() > pos
+                    pos = m.end()
+                    if new_state is not None:
+                        if isinstance(new_state, tuple):
+                            for state in new_state:
+                                if state == '#pop':
+                                    if len(statestack) > 1:
+                                        statestack.pop()
+                                elif state == '#push':
+                                    statestack.append(statestack[-1])
+                                else:
+                                    statestack.append(state)
+                        elif isinstance(new_state, int):
+                            # Pop, but keep at least one state on the stack
+                            if abs(new_state) >= len(statestack):
+                                del statestack[1:]
+                            else:
+                                del statestack[new_state:]
+                        elif new_state == '#push':
+                            statestack.append(statestack[-1])
+                        statetokens = tokendefs[statestack[-1]]
+                    if moved and text[pos - 1] == '\n':
+                        yield pos, None, tuple(statestack)
+                    break
+            else:
+                # No rule matched at pos
+                if pos >= len(text):
+                    break
+                if text[pos] == '\n':
+                    # At the end of a line, reset the state to "root"
+                    statestack = ['root']
+                    statetokens = tokendefs['root']
+                    yield pos, Whitespace, '\n'
+                    pos += 1
+                    yield pos, None, ('root',)
+                    continue
+                yield pos, Error, text[pos]
+                pos += 1
+
+    def token_format_id(self, token_type):
+        """Return the format ID for a token type, resolving it on first sight."""
+        format_id = self._format_ids.get(token_type)
+        if format_id is None:
+            format_id = FORMAT_IDS[self.token_to_format_name(token_type)]
+            self._format_ids[token_type] = format_id
+        return format_id
 
     def token_to_format_name(self, token_type):
         """
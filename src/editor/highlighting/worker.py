@@ -0,0 +1,99 @@
+import logging
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+
+
+class HighlightResult:
+    """Outcome of a background highlighting pass."""
+    __slots__ = ('version', 'highlighter', 'highlighted_lines', 'lines', 'cancelled')
+
+    def __init__(self, version, highlighter, highlighted_lines, lines, cancelled):
+        self.version = version                      # Buffer version the pass was run on
+        self.highlighter = highlighter              # Clone holding the updated highlighter state
+        self.highlighted_lines = highlighted_lines  # Spans for every line of that version
+        self.lines = lines                          # (first, last) lines that changed, or None
+        self.cancelled = cancelled                  # Event identifying the job
+
+
+class HighlightJob(QRunnable):
+    """Runs one highlighting pass over a buffer snapshot on a pool thread."""
+
+    def __init__(self, worker, buffer, highlighter, highlighted_lines, visible):
+        super().__init__()
+        self.worker = worker
+        self.buffer = buffer
+        self.highlighter = highlighter
+        self.highlighted_lines = highlighted_lines
+        self.visible = visible
+        self.cancelled = threading.Event()
+        self.highlighter.cancel_event = self.cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        try:
+            lines = self.highlighter.rehighlight(self.buffer, self.highlighted_lines, self.visible)
+        except Exception as e:
+            logging.error(f"Error highlighting document: {e}")
+            return
+        if self.cancelled.is_set():
+            return
+        self.highlighter.cancel_event = None
+        result = HighlightResult(self.buffer.version, self.highlighter, self.highlighted_lines,
+                                 lines, self.cancelled)
+        try:
+            self.worker.jobFinished.emit(result)
+        except RuntimeError:
+            pass  # The editor was closed while the job ran
+
+
+class HighlightWorker(QObject):
+    """
+    Runs highlighting passes for one editor on a thread pool.
+
+    submit() takes a snapshot of the buffer, a clone of the highlighter and a
+    copy of the current spans, so the GUI thread can keep editing while the pass
+    runs. Submitting again cancels the previous job, and results from cancelled
+    jobs are dropped, so only the newest pass ever reaches `finished`.
+
+    The snapshot is reused while the buffer version stays the same, so a
+    document highlighted over several slices is only copied once.
+    """
+
+    jobFinished = pyqtSignal(object)  # Emitted from the pool thread
+    finished = pyqtSignal(object)     # HighlightResult of the latest job, on the GUI thread
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.current = None
+        self.snapshot = None
+        self.snapshot_source = None
+        self.jobFinished.connect(self.on_job_finished, Qt.ConnectionType.QueuedConnection)
+
+    def submit(self, buffer, highlighter, highlighted_lines, visible=None):
+        """Cancel any pending pass and queue a new one for the buffer as it is now."""
+        self.cancel()
+        if (self.snapshot is None or self.snapshot_source is not buffer
+                or self.snapshot.version != buffer.version):
+            self.snapshot = buffer.snapshot()
+            self.snapshot_source = buffer
+        job = HighlightJob(self, self.snapshot, highlighter.clone(), list(highlighted_lines), visible)
+        self.current = job.cancelled
+        self.pool.start(job)
+
+    def cancel(self):
+        """Drop the pending pass, if any."""
+        if self.current is not None:
+            self.current.set()
+            self.current = None
+
+    def is_busy(self):
+        return self.current is not None
+
+    def on_job_finished(self, result):
+        if result.cancelled is not self.current:
+            return  # A newer job has replaced this one
+        self.current = None
+        self.finished.emit(result)
@@ -5,6 +5,8 @@ from .selection import SelectionMixin
 from .clipboard import ClipboardMixin
 from .undoredo import UndoRedoMixin
 from .painting import PaintingMixin
+from .zoom import ZoomMixin
+from .wrapping import WrapMixin
 
 __all__ = [
     'CursorMixin',
@@ -12,4 +14,6 @@ __all__ = [
     'ClipboardMixin',
     'UndoRedoMixin',
     'PaintingMixin',
+    'ZoomMixin',
+    'WrapMixin',
 ]
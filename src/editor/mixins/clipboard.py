@@ -9,12 +9,14 @@ class ClipboardMixin:
 
     def cut(self):
         clipboard = QApplication.instance().clipboard()
-        if self.has_selection():
+        if self.has_selection() and not self.buffer.read_only:
             self.copy()
             self.delete_selection()
-            self.update()
+            self.update_cursor_and_selection()
 
     def paste(self):
+        if self.buffer.read_only:
+            return
         clipboard = QApplication.instance().clipboard()
         clipboard_text = clipboard.text()
         cursor_before = (self.cursor_line, self.cursor_column)
@@ -33,41 +35,23 @@ class ClipboardMixin:
         # Add paste action to undo stack
         self.add_undo_action('insert', (self.cursor_line, self.cursor_column), clipboard_text, cursor_before)
 
-        # Handle first line
-        line = self.lines[self.cursor_line]
-        before_cursor = line[:self.cursor_column]
-        after_cursor = line[self.cursor_column:]
-        self.lines[self.cursor_line] = before_cursor + lines_to_paste[0]
-
-        # Insert any additional lines
-        for i in range(1, len(lines_to_paste)):
-            self.lines.insert(self.cursor_line + i, lines_to_paste[i])
-
-        # Append the remaining text after the cursor to the last inserted line
-        if len(lines_to_paste) > 1:
-            self.lines[self.cursor_line + len(lines_to_paste) - 1] += after_cursor
+        # Insert the clipboard text at the cursor
+        self.insert_text((self.cursor_line, self.cursor_column), clipboard_text)
 
         # Update cursor position safely
-        self.cursor_line = min(self.cursor_line + len(lines_to_paste) - 1, len(self.lines) - 1)
-        last_line = self.lines[self.cursor_line]
         if len(lines_to_paste) == 1:
             # For single-line paste, cursor should be at the end of pasted content plus original position
-            self.cursor_column = len(before_cursor) + len(lines_to_paste[0])
+            self.cursor_column += len(lines_to_paste[0])
         else:
             # For multi-line paste, cursor should be at the end of pasted content before the remaining text
-            self.cursor_column = len(last_line) - len(after_cursor)
+            self.cursor_line = min(self.cursor_line + len(lines_to_paste) - 1, self.buffer.line_count() - 1)
+            self.cursor_column = len(lines_to_paste[-1])
         
         # Ensure cursor position is valid
-        self.cursor_column = min(self.cursor_column, len(last_line))
+        self.cursor_column = min(self.cursor_column, self.buffer.line_length(self.cursor_line))
         
         # Clear selection after paste
         self.clear_selection()
         
         self.after_text_change()
-        self.ensure_cursor_visible()
-        self.updateGeometry()
-        self.update_highlighting()
-        self.update_line_number_area_width(0)
-        self.line_number_area.update()
-        self.update_scrollbars()
         
\ No newline at end of file
@@ -4,12 +4,12 @@ from PyQt6.QtCore import Qt
 class CursorMixin:
     def move_cursor_to_previous_word(self):
         """Move cursor to the start of the previous token."""
-        line = self.lines[self.cursor_line]
+        line = self.buffer.line(self.cursor_line)
         
         if self.cursor_column == 0:
             if self.cursor_line > 0:
                 self.cursor_line -= 1
-                self.cursor_column = len(self.lines[self.cursor_line])
+                self.cursor_column = self.buffer.line_length(self.cursor_line)
             return
 
         # Get the token boundaries for the current position
@@ -19,10 +19,10 @@ class CursorMixin:
 
     def move_cursor_to_next_word(self):
         """Move cursor to the start of the next token."""
-        line = self.lines[self.cursor_line]
+        line = self.buffer.line(self.cursor_line)
         
         if self.cursor_column >= len(line):
-            if self.cursor_line < len(self.lines) - 1:
+            if self.cursor_line < self.buffer.line_count() - 1:
                 self.cursor_line += 1
                 self.cursor_column = 0
             return
@@ -37,26 +37,37 @@ class CursorMixin:
             self.cursor_column -= 1
         elif self.cursor_line > 0:
             self.cursor_line -= 1
-            self.cursor_column = len(self.lines[self.cursor_line])
+            self.cursor_column = self.buffer.line_length(self.cursor_line)
         self.ensure_cursor_visible()
 
     def move_cursor_right(self):
-        line_length = len(self.lines[self.cursor_line])
+        line_length = self.buffer.line_length(self.cursor_line)
         if self.cursor_column < line_length:
             self.cursor_column += 1
-        elif self.cursor_line < len(self.lines) - 1:
+        elif self.cursor_line < self.buffer.line_count() - 1:
             self.cursor_line += 1
             self.cursor_column = 0
         self.ensure_cursor_visible()
 
+    def move_cursor_by_rows(self, rows):
+        """Move the cursor up or down by visual rows, staying as close as possible to its x offset."""
+        row, x = self.row_and_x(self.cursor_line, self.cursor_column)
+        if 0 <= row + rows < self.row_count():
+            self.cursor_line, self.cursor_column = self.position_in_row(row + rows, x)
+            self.ensure_cursor_visible()
+
     def move_cursor_up(self):
-        if self.cursor_line > 0:
+        if self.word_wrap:
+            self.move_cursor_by_rows(-1)
+        elif self.cursor_line > 0:
             self.cursor_line -= 1
-            self.cursor_column = min(self.cursor_column, len(self.lines[self.cursor_line]))
+            self.cursor_column = min(self.cursor_column, self.buffer.line_length(self.cursor_line))
             self.ensure_cursor_visible()
 
     def move_cursor_down(self):
-        if self.cursor_line < len(self.lines) - 1:
+        if self.word_wrap:
+            self.move_cursor_by_rows(1)
+        elif self.cursor_line < self.buffer.line_count() - 1:
             self.cursor_line += 1
-            self.cursor_column = min(self.cursor_column, len(self.lines[self.cursor_line]))
+            self.cursor_column = min(self.cursor_column, self.buffer.line_length(self.cursor_line))
             self.ensure_cursor_visible()
@@ -1,33 +1,57 @@
-from PyQt6.QtGui import QPainter, QFontMetrics
+from bisect import bisect_right
+from operator import itemgetter
+
+from PyQt6.QtGui import QPainter
 from PyQt6.QtCore import QRect, QSize, Qt
 
 from src.editor.themes.theme import Theme
+from src.editor.highlighting.formats import FORMAT_NAMES, NO_SPANS
+from src.editor.cursor_blink import cursor_blinker
 
 import logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class PaintingMixin:
+    # Syntax colors indexed by format ID, built on first use
+    _syntax_colors = None
+
+    @classmethod
+    def syntax_colors(cls):
+        """Return the syntax color for every format ID, in FORMAT_IDS order."""
+        if cls._syntax_colors is None:
+            cls._syntax_colors = [Theme.SYNTAX_COLORS.get(name, Theme.TEXT_COLOR) for name in FORMAT_NAMES]
+        return cls._syntax_colors
+
     def paintEvent(self, event):
-        if not hasattr(self, 'lines') or not self.lines:
+        if not hasattr(self, 'buffer'):
             return
 
         painter = QPainter(self.viewport())
         painter.setFont(self.font())
-        fm = painter.fontMetrics()
+        # The viewport is opaque, so nothing has cleared the background
+        painter.fillRect(event.rect(), Theme.EDITOR_BACKGROUND_COLOR)
 
         x_offset = self.horizontalScrollBar().value()
         y_offset = self.verticalScrollBar().value()
-        line_height = fm.height()
-        y_text_offset = fm.ascent()
+        line_height = self.font_metrics.line_height
         visible_rect = event.rect()
 
-        # Calculate visible line range
-        first_visible_line = max(0, int((y_offset + visible_rect.top()) / line_height))
-        last_visible_line = min(len(self.lines) - 1, int((y_offset + visible_rect.bottom()) / line_height))
+        # Calculate the visible rows. Glyphs can reach a pixel or two into the
+        # neighbouring rows, so when only some rows are repainted the rows
+        # around them are drawn too.
+        first_visible_row = max(0, int((y_offset + visible_rect.top()) / line_height))
+        last_visible_row = int((y_offset + visible_rect.bottom()) / line_height)
+        rows = list(self.iter_rows(max(0, first_visible_row - 1), last_visible_row + 1))
+        line_count = self.buffer.line_count()
 
-        # Ensure highlighted_lines exists and has correct length
-        if not hasattr(self, 'highlighted_lines') or len(self.highlighted_lines) != len(self.lines):
-            self.highlighted_lines = [{} for _ in self.lines]
+        # Ensure highlighted_lines exists and has correct length. A large
+        # file is never highlighted, and listing its lines would take as
+        # much memory as the index of the file.
+        if not self.is_large_file() and (not hasattr(self, 'highlighted_lines')
+                                         or len(self.highlighted_lines) != line_count):
+            self.highlighted_lines = [NO_SPANS] * line_count
+
+        column_offsets = self.column_offsets
 
         # Draw selection background first
         selection = self.selection_range()
@@ -35,92 +59,137 @@ class PaintingMixin:
             start_line, start_col, end_line, end_col = selection
             painter.setPen(Qt.PenStyle.NoPen)
             painter.setBrush(Theme.SELECTION_COLOR)
-            for i in range(start_line, end_line + 1):
-                if i < first_visible_line or i > last_visible_line or i >= len(self.lines):
+            for row, i, line, start, end in rows:
+                if i < start_line or i > end_line:
                     continue
-                line = self.lines[i]
-                line_y = (i * line_height) - y_offset
-                if i == start_line:
-                    sel_start_col = start_col
-                else:
-                    sel_start_col = 0
-                if i == end_line:
-                    sel_end_col = end_col
-                else:
-                    sel_end_col = len(line)
-                if sel_start_col == sel_end_col:
+                line_y = (row * line_height) - y_offset
+                sel_start_col = max(start, start_col if i == start_line else 0)
+                sel_end_col = min(end, end_col if i == end_line else len(line))
+                if sel_start_col >= sel_end_col:
                     continue
-                x_start = fm.horizontalAdvance(line[:sel_start_col]) - x_offset
-                x_end = fm.horizontalAdvance(line[:sel_end_col]) - x_offset
+                row_left = column_offsets.x_for(line, start) + x_offset
+                x_start = column_offsets.x_for(line, sel_start_col) - row_left
+                x_end = column_offsets.x_for(line, sel_end_col) - row_left
                 rect = QRect(x_start, line_y, x_end - x_start, line_height)
                 painter.fillRect(rect, Theme.SELECTION_COLOR)
 
-        # Draw text with syntax highlighting
-        painter.setPen(Theme.TEXT_COLOR)
-        for i in range(first_visible_line, last_visible_line + 1):
-            if i >= len(self.lines):
-                break
-
-            line = self.lines[i]
-            line_y = y_text_offset + (i * line_height) - y_offset
-            x = -x_offset
-
-            # Get highlighting spans safely
+        # Draw text with syntax highlighting. Lines are shaped once and then
+        # drawn from the render cache until their text or spans change; of
+        # long lines only the part in view is shaped and drawn.
+        cache = self.line_render_cache
+        visible_left = x_offset + visible_rect.left()
+        visible_right = x_offset + visible_rect.right() + 1
+        cache.set_visible_lines(self.viewport().height() // line_height + 1)
+        colors = self.syntax_colors()
+        current_color = None
+        for row, i, line, start, end in rows:
+            line_top = (row * line_height) - y_offset
+
+            # Get highlighting spans safely. Lines the highlight worker has not
+            # caught up with yet keep their last known spans, or none if new.
             try:
-                spans = self.highlighted_lines[i] if i < len(self.highlighted_lines) else {}
+                spans = self.highlighted_lines[i] if i < len(self.highlighted_lines) else NO_SPANS
             except (IndexError, AttributeError):
-                spans = {}
-
-            if not spans:
-                # No highlighting, draw the whole line with default color
-                painter.setPen(Theme.TEXT_COLOR)
-                painter.drawText(x, line_y, line)
-            else:
-                # Draw text with highlighting
-                pos = 0
-                for span in spans:
-                    span_start, length, format_name = span
-                    # Draw any text before the span
-                    if pos < span_start:
-                        text = line[pos:span_start]
-                        painter.setPen(Theme.TEXT_COLOR)
-                        painter.drawText(x, line_y, text)
-                        x += fm.horizontalAdvance(text)
-                        pos = span_start
-
-                    # Draw the highlighted span
-                    text = line[span_start:span_start + length]
-                    color = Theme.SYNTAX_COLORS.get(format_name, Theme.TEXT_COLOR)
+                spans = NO_SPANS
+
+            if start == 0 and end == len(line):
+                runs = cache.runs(line, spans, colors, Theme.TEXT_COLOR, visible_left, visible_right)
+                for x, color, static_text in runs:
+                    if color is not current_color:
+                        painter.setPen(color)
+                        current_color = color
+                    painter.drawStaticText(x - x_offset, line_top, static_text)
+                continue
+
+            # One row of a wrapped line: the line's runs shifted left to the
+            # row's first column, cut off at both ends of the row
+            row_left = column_offsets.x_for(line, start)
+            row_width = column_offsets.x_for(line, end) - row_left if end < len(line) else self.viewport().width()
+            runs = cache.runs(line, spans, colors, Theme.TEXT_COLOR, row_left, row_left + row_width)
+            painter.save()
+            painter.setClipRect(QRect(0, line_top - line_height, row_width, 3 * line_height),
+                                Qt.ClipOperation.IntersectClip)
+            for k in range(max(0, bisect_right(runs, row_left, key=itemgetter(0)) - 1), len(runs)):
+                x, color, static_text = runs[k]
+                if x >= row_left + row_width:
+                    break
+                if color is not current_color:
                     painter.setPen(color)
-                    painter.drawText(x, line_y, text)
-                    x += fm.horizontalAdvance(text)
-                    pos += length
-
-                # Draw any remaining text after the last span
-                if pos < len(line):
-                    text = line[pos:]
-                    painter.setPen(Theme.TEXT_COLOR)
-                    painter.drawText(x, line_y, text)
+                    current_color = color
+                painter.drawStaticText(x - row_left, line_top, static_text)
+            painter.restore()
+            current_color = None
 
         # Draw cursor
         if self.hasFocus() and self.cursor_visible:
             # Ensure cursor position is valid
-            cursor_line = min(self.cursor_line, len(self.lines) - 1)
+            cursor_line = min(self.cursor_line, line_count - 1)
             cursor_line = max(0, cursor_line)
-            line = self.lines[cursor_line]
-            cursor_column = min(self.cursor_column, len(line))
+            cursor_column = min(self.cursor_column, self.buffer.line_length(cursor_line))
             cursor_column = max(0, cursor_column)
 
-            cursor_x = fm.horizontalAdvance(line[:cursor_column]) - x_offset
-            cursor_y = (cursor_line * line_height) - y_offset
+            cursor_row, cursor_x = self.row_and_x(cursor_line, cursor_column)
+            cursor_x -= x_offset
+            cursor_y = (cursor_row * line_height) - y_offset
 
             cursor_rect = QRect(cursor_x, cursor_y, 2, line_height)
             painter.fillRect(cursor_rect, Theme.CURSOR_COLOR)
 
+        if getattr(self, 'first_paint_pending', False):
+            self.report_first_highlighted_paint()
+
+    def cursor_rect(self):
+        """Viewport rectangle covering the text cursor."""
+        line_height = self.font_metrics.line_height
+        cursor_line = max(0, min(self.cursor_line, self.buffer.line_count() - 1))
+        cursor_row, cursor_x = self.row_and_x(cursor_line, self.cursor_column)
+        cursor_x -= self.horizontalScrollBar().value()
+        cursor_y = cursor_row * line_height - self.verticalScrollBar().value()
+        return QRect(cursor_x - 1, cursor_y, 4, line_height)
+
+    def update_cursor_and_selection(self):
+        """
+        Repaint the rows whose cursor or selection changed since the last call.
+
+        Rows are compared against the cursor position and selection recorded at
+        the previous call, so moving the cursor repaints two rows and growing a
+        selection repaints only the rows it grew over.
+        """
+        cursor = (self.cursor_line, self.cursor_column)
+        selection = self.selection_range()
+        rows = []
+        if cursor != self.painted_cursor:
+            rows.append((cursor[0], cursor[0]))
+            if self.painted_cursor is not None:
+                rows.append((self.painted_cursor[0], self.painted_cursor[0]))
+            # Keep the cursor solid while it is being moved around
+            if cursor_blinker.editor is self:
+                cursor_blinker.restart()
+        rows.extend(self.changed_selection_rows(self.painted_selection, selection))
+        self.painted_cursor = cursor
+        self.painted_selection = selection
+        viewport = self.viewport()
+        for first, last in rows:
+            viewport.update(self.line_rect(first, last))
+
+    @staticmethod
+    def changed_selection_rows(old, new):
+        """Return (first, last) row ranges whose selected columns differ between two selection ranges."""
+        if old == new:
+            return []
+        if old is None or new is None:
+            selection = old or new
+            return [(selection[0], selection[2])]
+        rows = []
+        if old[:2] != new[:2]:
+            rows.append((min(old[0], new[0]), max(old[0], new[0])))
+        if old[2:] != new[2:]:
+            rows.append((min(old[2], new[2]), max(old[2], new[2])))
+        return rows
+
     def sizeHint(self):
-        fm = QFontMetrics(self.font())
-        line_height = fm.height()
-        content_width = max(fm.horizontalAdvance(line) for line in self.lines) + 20
-        content_height = line_height * len(self.lines) + 20
+        line_height = self.font_metrics.line_height
+        content_width = self.line_widths.max() + 20
+        content_height = line_height * self.row_count() + 20
         return QSize(content_width, content_height)
 
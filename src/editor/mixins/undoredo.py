@@ -36,8 +36,7 @@ class UndoRedoMixin:
             self.current_text += text
 
         # Update the text in the editor
-        line = self.lines[self.cursor_line]
-        self.lines[self.cursor_line] = line[:self.cursor_column] + text + line[self.cursor_column:]
+        self.insert_text((self.cursor_line, self.cursor_column), text)
         self.cursor_column += len(text)
         
         self.redo_stack.clear()
@@ -78,7 +77,6 @@ class UndoRedoMixin:
         action = self.undo_stack.pop()
         self.apply_action(action, undo=True)
         self.redo_stack.append(action)
-        self.update()
 
     def redo(self):
         """Redo the previously undone action."""
@@ -88,7 +86,6 @@ class UndoRedoMixin:
         action = self.redo_stack.pop()
         self.apply_action(action, undo=False)
         self.undo_stack.append(action)
-        self.update()
 
     def apply_action(self, action, undo=False):
         """Apply an undo/redo action."""
@@ -107,48 +104,16 @@ class UndoRedoMixin:
                 self.delete_text(action.position, action.text)
                 self.cursor_line, self.cursor_column = action.cursor_after
 
-        if hasattr(self, 'highlighter') and self.highlighter:
-            self.highlighted_lines = self.highlighter.highlight(self.lines)
-        else:
-            self.highlighted_lines = [{} for _ in self.lines]
-
         self.synchronize_editor_state()
-        self.update()
 
     def insert_text(self, position, text):
         """Insert text at the given position."""
-        line_idx, col_idx = position
-        lines_to_insert = text.split('\n')
-        line = self.lines[line_idx]
-        before = line[:col_idx]
-        after = line[col_idx:]
-        
-        if len(lines_to_insert) == 1:
-            # Single line insertion
-            self.lines[line_idx] = before + lines_to_insert[0] + after
-        else:
-            # Multi-line insertion
-            self.lines[line_idx] = before + lines_to_insert[0]
-            for i in range(1, len(lines_to_insert) - 1):
-                self.lines.insert(line_idx + i, lines_to_insert[i])
-            last_line_idx = line_idx + len(lines_to_insert) - 1
-            self.lines.insert(last_line_idx, lines_to_insert[-1] + after)
+        self.buffer.insert(self.buffer.offset_of(*position), text)
 
     def delete_text(self, position, text):
         """Delete text at the given position."""
-        start_line, start_col = position
-        lines = text.split('\n')
-        
-        if len(lines) == 1:
-            # Single line deletion
-            line = self.lines[start_line]
-            self.lines[start_line] = line[:start_col] + line[start_col + len(text):]
-        else:
-            # Multi-line deletion
-            first_line = self.lines[start_line]
-            last_line = self.lines[start_line + len(lines) - 1]
-            self.lines[start_line] = first_line[:start_col] + last_line[len(lines[-1]):]
-            del self.lines[start_line + 1:start_line + len(lines)]
+        start = self.buffer.offset_of(*position)
+        self.buffer.delete((start, start + len(text)))
 
     def handle_backspace(self, cursor_before):
         """Handle backspace with word-based undo support."""
@@ -161,7 +126,7 @@ class UndoRedoMixin:
             self.delete_selection()
             return
 
-        line = self.lines[self.cursor_line]
+        line = self.buffer.line(self.cursor_line)
         if self.cursor_column > 0:
             # Ctrl+Backspace: Delete the previous word
             if QApplication.keyboardModifiers() & Qt.KeyboardModifier.ControlModifier:
@@ -174,22 +139,21 @@ class UndoRedoMixin:
                 
                 deleted_text = line[pos:self.cursor_column]
                 self.add_undo_action('delete', (self.cursor_line, pos), deleted_text, cursor_before, f"Delete Word")
-                self.lines[self.cursor_line] = line[:pos] + line[self.cursor_column:]
+                self.delete_text((self.cursor_line, pos), deleted_text)
                 self.cursor_column = pos
             else:
                 # Regular backspace
                 deleted_text = line[self.cursor_column - 1]
                 self.add_undo_action('delete', (self.cursor_line, self.cursor_column - 1), deleted_text, cursor_before)
-                self.lines[self.cursor_line] = line[:self.cursor_column - 1] + line[self.cursor_column:]
+                self.delete_text((self.cursor_line, self.cursor_column - 1), deleted_text)
                 self.cursor_column -= 1
         elif self.cursor_line > 0:
             # Join with previous line
-            prev_line = self.lines[self.cursor_line - 1]
-            curr_line = self.lines.pop(self.cursor_line)
+            prev_length = self.buffer.line_length(self.cursor_line - 1)
             deleted_text = '\n'
-            self.add_undo_action('delete', (self.cursor_line - 1, len(prev_line)), deleted_text, cursor_before, "Join Lines")
+            self.add_undo_action('delete', (self.cursor_line - 1, prev_length), deleted_text, cursor_before, "Join Lines")
             self.cursor_line -= 1
-            self.cursor_column = len(prev_line)
-            self.lines[self.cursor_line] = prev_line + curr_line
+            self.cursor_column = prev_length
+            self.delete_text((self.cursor_line, prev_length), deleted_text)
 
         self.after_text_change()
\ No newline at end of file
@@ -0,0 +1,175 @@
+from bisect import bisect_right
+
+from PyQt6.QtCore import Qt
+
+from src.editor.rendering.wrap_index import SINGLE_ROW
+
+
+class WrapMixin:
+    """
+    Soft word wrap, and the visual rows the rest of the editor works in.
+
+    Painting, the gutter, vertical cursor movement, hit testing and the scroll
+    bars all go through the row methods below. Without wrapping every line is
+    one row, and they map rows to lines directly. With wrapping they go
+    through the editor's WrapIndex.
+    """
+
+    # Time spent wrapping estimated lines per idle slice
+    REFLOW_BUDGET = 0.008  # s
+
+    word_wrap = False
+
+    def set_word_wrap(self, enabled):
+        """Turn soft wrapping at the viewport's width on or off."""
+        if enabled == self.word_wrap or (enabled and self.is_large_file()):
+            # Wrapping needs the width of every line, which large files are not measured for
+            return
+        top = self.top_position()
+        self.word_wrap = enabled
+        self.reset_wrap(top[0])
+        # Hiding the horizontal scroll bar resizes the viewport, which rewraps
+        self.setHorizontalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAlwaysOff if enabled else Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.horizontalScrollBar().setValue(0)
+        self.apply_scrollbar_ranges()
+        self.scroll_to_position(*top)
+        self.viewport().update()
+        self.line_number_area.update()
+
+    def wrap_width(self):
+        """Width lines are wrapped at, leaving room for the cursor after the last character."""
+        space_width = self.font_metrics.space_width
+        return max(8 * space_width, self.viewport().width() - space_width)
+
+    def reset_wrap(self, top_line=0):
+        """Estimate every line's rows again from the measured line widths, to be wrapped from top_line on."""
+        if self.word_wrap:
+            self.wrap_index.reset(self.line_widths, self.wrap_width(), top_line)
+            self.reflow_timer.start()
+
+    def rewrap(self):
+        """Wrap again after the viewport width changed, keeping the top line in view."""
+        if not self.word_wrap or self.wrap_width() == self.wrap_index.width:
+            return
+        top = self.top_position()
+        self.reset_wrap(top[0])
+        self.apply_scrollbar_ranges()
+        self.scroll_to_position(*top)
+        self.viewport().update()
+        self.line_number_area.update()
+
+    def reflow_lines(self):
+        """Wrap the next lines that only have estimated rows, without moving the view."""
+        if not self.word_wrap:
+            return
+        top = self.top_position()
+        changed_from = self.wrap_index.reflow(self.buffer.line, self.REFLOW_BUDGET)
+        if changed_from is not None:
+            self.apply_scrollbar_ranges()
+            # Rows below the view only change the scroll range
+            if changed_from <= self.visible_lines()[1]:
+                self.scroll_to_position(*top)
+                self.viewport().update()
+                self.line_number_area.update()
+        if self.wrap_index.has_pending():
+            self.reflow_timer.start()
+
+    def update_wrap_for_change(self, change):
+        """Wrap the edited lines, repainting everything below them if their row count changed."""
+        if not self.word_wrap:
+            return
+        first = change.first_line
+        row_delta = self.wrap_index.splice(first, change.removed_lines + 1, change.inserted_end[0] - first + 1,
+                                           self.buffer.line)
+        if row_delta and not change.line_delta:
+            # No lines moved, but the rows below the edit did
+            rect = self.line_rect(first)
+            self.viewport().update(rect)
+            self.line_number_area.update(0, rect.top(), self.line_number_area.width(), rect.height())
+        if self.wrap_index.has_pending():
+            self.reflow_timer.start()
+
+    def row_count(self):
+        if self.word_wrap:
+            return self.wrap_index.row_count()
+        return self.buffer.line_count()
+
+    def row_starts(self, line):
+        """Return the columns the visual rows of a line start at."""
+        if not self.word_wrap:
+            return SINGLE_ROW
+        starts = self.wrap_index.starts(line, self.buffer.line(line))
+        if self.wrap_index.changed_from is not None:
+            # Its estimate was off: the scroll bars catch up when idle
+            self.reflow_timer.start()
+        return starts
+
+    def first_row(self, line):
+        """Return the visual row a line starts on."""
+        if self.word_wrap:
+            return self.wrap_index.first_row(line)
+        return line
+
+    def line_at_row(self, row):
+        """Return (line, index of the row within the line) for a visual row."""
+        if not self.word_wrap:
+            return max(0, min(row, self.buffer.line_count() - 1)), 0
+        while True:
+            line, index = self.wrap_index.line_at_row(max(0, row))
+            if self.wrap_index.is_wrapped(line):
+                return line, index
+            # Rows were estimated up to here; wrapping the line may move the row to another line
+            self.row_starts(line)
+
+    def row_and_x(self, line, column):
+        """Return the visual row showing a position and the position's x offset in that row."""
+        text = self.buffer.line(line)
+        x = self.column_offsets.x_for(text, column)
+        if not self.word_wrap:
+            return line, x
+        starts = self.row_starts(line)
+        index = bisect_right(starts, column) - 1
+        return self.first_row(line) + index, x - self.column_offsets.x_for(text, starts[index])
+
+    def position_in_row(self, row, x):
+        """Return the (line, column) nearest to the x offset in a visual row."""
+        line, index = self.line_at_row(row)
+        text = self.buffer.line(line)
+        if not self.word_wrap:
+            return line, self.column_offsets.column_at(text, x)
+        starts = self.row_starts(line)
+        start = starts[index]
+        column = self.column_offsets.column_at(text, x + self.column_offsets.x_for(text, start))
+        if index + 1 < len(starts):
+            # The end of a row is the start of the next one, so stop before it
+            column = min(column, max(start, starts[index + 1] - 1))
+        return line, max(start, column)
+
+    def iter_rows(self, first_row, last_row):
+        """Yield (row, line, text, start, end) for the visual rows first_row to last_row."""
+        if first_row >= self.row_count():
+            return
+        line_count = self.buffer.line_count()
+        line, index = self.line_at_row(first_row)
+        row = first_row
+        while row <= last_row and line < line_count:
+            text = self.buffer.line(line)
+            starts = self.row_starts(line)
+            for index in range(index, len(starts)):
+                if row > last_row:
+                    return
+                end = starts[index + 1] if index + 1 < len(starts) else len(text)
+                yield row, line, text, starts[index], end
+                row += 1
+            line += 1
+            index = 0
+
+    def top_position(self):
+        """Return the (line, column) at the start of the top visual row."""
+        line, index = self.line_at_row(self.verticalScrollBar().value() // self.font_metrics.line_height)
+        return line, self.row_starts(line)[index]
+
+    def scroll_to_position(self, line, column):
+        """Scroll so that the visual row showing a position is at the top."""
+        self.verticalScrollBar().setValue(self.row_and_x(line, column)[0] * self.font_metrics.line_height)
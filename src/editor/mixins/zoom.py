@@ -0,0 +1,69 @@
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt
+
+
+class ZoomMixin:
+    """
+    Ctrl+wheel and Ctrl+=/Ctrl+-/Ctrl+0 zoom.
+
+    Zooming changes the editor font by whole points from editor_font, and the
+    resulting font change rebuilds the font metrics, the shaped lines and the
+    measured widths (see apply_font).
+    """
+    MIN_FONT_SIZE = 6
+    MAX_FONT_SIZE = 72
+
+    # Angle delta of one notch of a standard mouse wheel
+    WHEEL_STEP = 120
+
+    ZOOM_IN_KEYS = (Qt.Key.Key_Equal, Qt.Key.Key_Plus)
+    ZOOM_OUT_KEYS = (Qt.Key.Key_Minus, Qt.Key.Key_Underscore)
+    RESET_ZOOM_KEYS = (Qt.Key.Key_0,)
+
+    zoom_level = 0         # Points added to the size of editor_font
+    zoom_wheel_delta = 0   # Wheel movement not yet turned into a zoom step
+
+    def zoom_in(self):
+        self.set_zoom(self.zoom_level + 1)
+
+    def zoom_out(self):
+        self.set_zoom(self.zoom_level - 1)
+
+    def reset_zoom(self):
+        self.set_zoom(0)
+
+    def set_zoom(self, level):
+        """Show the text level points larger (or smaller, if negative) than editor_font."""
+        base_size = self.editor_font.pointSizeF()
+        size = max(self.MIN_FONT_SIZE, min(self.MAX_FONT_SIZE, base_size + level))
+        level = size - base_size
+        if level == self.zoom_level:
+            return
+        self.zoom_level = level
+        font = QFont(self.editor_font)
+        font.setPointSizeF(size)
+        self.setFont(font)
+
+    def handle_zoom_key(self, key):
+        """Zoom for a Ctrl+key press, returning whether the key was a zoom key."""
+        if key in self.ZOOM_IN_KEYS:
+            self.zoom_in()
+        elif key in self.ZOOM_OUT_KEYS:
+            self.zoom_out()
+        elif key in self.RESET_ZOOM_KEYS:
+            self.reset_zoom()
+        else:
+            return False
+        return True
+
+    def wheelEvent(self, event):
+        if not event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            super().wheelEvent(event)
+            return
+        # Touchpads send many small deltas, so whole notches are accumulated
+        self.zoom_wheel_delta += event.angleDelta().y()
+        steps = int(self.zoom_wheel_delta / self.WHEEL_STEP)
+        if steps:
+            self.zoom_wheel_delta -= steps * self.WHEEL_STEP
+            self.set_zoom(self.zoom_level + steps)
+        event.accept()
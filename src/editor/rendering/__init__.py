@@ -0,0 +1,17 @@
+# src/editor/rendering/__init__.py
+
+from .line_cache import LineRenderCache, RenderedLine
+from .line_widths import LineWidths, measure_lines
+from .column_offsets import ColumnOffsets
+from .font_metrics import EditorFontMetrics
+from .wrap_index import WrapIndex
+
+__all__ = [
+    'LineRenderCache',
+    'RenderedLine',
+    'LineWidths',
+    'measure_lines',
+    'ColumnOffsets',
+    'EditorFontMetrics',
+    'WrapIndex',
+]
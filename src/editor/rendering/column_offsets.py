@@ -0,0 +1,146 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+from PyQt6.QtGui import QFontMetricsF
+
+
+class CharAdvances(dict):
+    """Advance of every character measured so far, measuring new ones on lookup."""
+
+    def __init__(self, advance):
+        super().__init__()
+        self._advance = advance
+
+    def __missing__(self, ch):
+        advance = self[ch] = self._advance(ch)
+        return advance
+
+
+class ColumnOffsets:
+    """
+    X offset of every column of a line, shared by hit testing, the cursor,
+    selection painting and the placement of text runs.
+
+    Offsets add up the advance of each character, measured once per distinct
+    character, with tabs moving to the next tab stop. Each line's offsets are
+    kept in a least recently used cache keyed by its text, so dragging across
+    a long line measures it once and then binary-searches.
+
+    When the font gives every ASCII character the same advance, ASCII lines
+    without tabs skip the cache and columns are computed arithmetically.
+    Lines longer than max_measured_chars, such as minified bundles, are not
+    measured at all: every column gets the font's average advance, so editing
+    them costs the same wherever the cursor is.
+    """
+
+    MAX_LINES = 512
+
+    # Default for max_measured_chars
+    MAX_MEASURED_CHARS = 10_000
+
+    def __init__(self, font=None):
+        self._lines = OrderedDict()
+        self._font = None
+        self.max_measured_chars = self.MAX_MEASURED_CHARS
+        if font is not None:
+            self.set_font(font)
+
+    def set_max_measured_chars(self, count):
+        """Approximate the offsets of lines longer than count characters from now on."""
+        if count != self.max_measured_chars:
+            self.max_measured_chars = count
+            self._lines.clear()
+
+    def set_font(self, font):
+        """Measure with font from now on, dropping offsets measured with another one."""
+        if font == self._font:
+            return
+        self._font = font
+        self._lines.clear()
+        metrics = QFontMetricsF(font)
+        self._advances = CharAdvances(metrics.horizontalAdvance)
+        self._tab_width = metrics.horizontalAdvance('\t') or 8 * metrics.horizontalAdvance(' ')
+        widths = {metrics.horizontalAdvance(ch) for ch in ' .iMW_'}
+        self.char_width = widths.pop() if len(widths) == 1 else None
+        self.average_width = self.char_width or metrics.averageCharWidth()
+
+    def column_width(self, line):
+        """
+        Return the advance every column of line has, or None if line has to
+        be measured. Lines over max_measured_chars get the average advance.
+        """
+        if len(line) > self.max_measured_chars:
+            return self.average_width
+        if self.char_width is not None and line.isascii() and '\t' not in line:
+            return self.char_width
+        return None
+
+    def offsets(self, line):
+        """Return the x offset of every column of line, from 0 up to len(line)."""
+        offsets = self._lines.get(line)
+        if offsets is not None:
+            self._lines.move_to_end(line)
+            return offsets
+        advances = self._advances
+        if '\t' not in line:
+            # Rounded running sums of the advances, without a Python-level loop
+            offsets = array('i', map(int, map((0.5).__add__, accumulate(map(advances.__getitem__, line), initial=0.0))))
+        else:
+            tab_width = self._tab_width
+            offsets = array('i', [0])
+            x = 0.0
+            for ch in line:
+                if ch == '\t':
+                    x = (math.floor(x / tab_width) + 1) * tab_width
+                else:
+                    x += advances[ch]
+                offsets.append(int(x + 0.5))
+        self._lines[line] = offsets
+        if len(self._lines) > self.MAX_LINES:
+            self._lines.popitem(last=False)
+        return offsets
+
+    def measure(self, line):
+        """
+        Return the x offset of every column of line like offsets(), but
+        unrounded unless the line has tabs, and without caching them. For
+        scanning many lines once, as wrapping does, without evicting the
+        offsets of the lines on screen.
+        """
+        if '\t' in line:
+            return self.offsets(line)
+        return list(accumulate(map(self._advances.__getitem__, line), initial=0.0))
+
+    def x_for(self, line, column):
+        """Return the x offset of column in line."""
+        column = max(0, min(column, len(line)))
+        width = self.column_width(line)
+        if width is not None:
+            return int(column * width + 0.5)
+        return self.offsets(line)[column]
+
+    def last_column_within(self, line, x):
+        """Return the last column of line whose x offset is at most x."""
+        width = self.column_width(line)
+        if width is not None:
+            return max(0, min(len(line), int(x / width)))
+        return max(0, bisect_right(self.offsets(line), x) - 1)
+
+    def column_at(self, line, x):
+        """Return the column boundary in line nearest to the x offset."""
+        width = self.column_width(line)
+        if width is not None:
+            return max(0, min(len(line), int(x / width + 0.5)))
+        offsets = self.offsets(line)
+        column = bisect_left(offsets, x)
+        if column == 0:
+            return 0
+        if column == len(offsets):
+            return len(line)
+        # Between two boundaries the nearer one wins, the left one on a tie
+        if x - offsets[column - 1] <= offsets[column] - x:
+            return column - 1
+        return column
@@ -0,0 +1,27 @@
+from PyQt6.QtGui import QFont, QFontMetrics
+
+
+class EditorFontMetrics:
+    """
+    Measurements of the editor font, taken once per font.
+
+    Painting, scrolling, hit testing and the line number area all need the
+    line height and a few advances, several times per keystroke. The editor
+    keeps one of these and replaces it when its font changes, instead of
+    constructing QFontMetrics at every call site.
+    """
+    __slots__ = ('font', 'metrics', 'line_height', 'ascent', 'space_width', 'digit_width', 'monospace')
+
+    def __init__(self, font):
+        self.font = QFont(font)
+        self.metrics = metrics = QFontMetrics(font)
+        self.line_height = metrics.height()
+        self.ascent = metrics.ascent()
+        self.space_width = metrics.horizontalAdvance(' ')
+        self.digit_width = max(metrics.horizontalAdvance(digit) for digit in '0123456789')
+        # Same test as ColumnOffsets: narrow, wide and punctuation characters all alike
+        self.monospace = len({metrics.horizontalAdvance(ch) for ch in ' .iMW_'}) == 1
+
+    def width(self, text):
+        """Return the advance of text."""
+        return self.metrics.horizontalAdvance(text)
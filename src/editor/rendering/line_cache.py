@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QStaticText, QTransform
+
+from src.editor.highlighting.formats import SPAN_FIELDS, NO_SPANS
+
+
+class RenderedLine:
+    """The shaped text runs of one line, ready to be drawn."""
+    __slots__ = ('runs', 'width')
+
+    def __init__(self, runs, width):
+        self.runs = runs    # (x, color, QStaticText) for every run with visible glyphs
+        self.width = width  # X offset of the end of the line
+
+
+class LineRenderCache:
+    """
+    Least recently used cache of shaped lines for the painter.
+
+    Lines are keyed by their text and their highlight spans, so a line is only
+    shaped again when one of those changes, wherever it has moved to. Every run
+    of text with its own color becomes a QStaticText laid out once for the
+    current font and placed at the x offset of its first column, as given by
+    ColumnOffsets, so text lines up with the cursor and selection. Whitespace
+    only runs have nothing to draw and are left out.
+
+    Lines longer than CHUNK_CHARS are split into chunks of that many columns,
+    cached by their own text and spans, and only the chunks reaching into the
+    visible x range are shaped (see runs()). Runs of a chunk keep their start
+    columns, which are turned into x offsets each time they are drawn, so a
+    chunk whose text moved along the line is placed correctly.
+    """
+
+    # The cache holds this many screens worth of lines
+    SCREENS = 4
+    MIN_CAPACITY = 256
+
+    CHUNK_CHARS = 512
+
+    def __init__(self, column_offsets):
+        self._lines = OrderedDict()
+        self._chunks = OrderedDict()
+        self.capacity = self.MIN_CAPACITY
+        self._font = None
+        self._column_offsets = column_offsets
+        self._transform = QTransform()
+
+    def clear(self):
+        self._lines.clear()
+        self._chunks.clear()
+
+    def set_font(self, font):
+        """Use font for shaping, dropping every line shaped with another font."""
+        if font != self._font:
+            self._font = font
+            self.clear()
+
+    def set_visible_lines(self, count):
+        """Size the cache for a view showing count lines."""
+        self.capacity = max(self.MIN_CAPACITY, self.SCREENS * count)
+        for cache in (self._lines, self._chunks):
+            while len(cache) > self.capacity:
+                cache.popitem(last=False)
+
+    def runs(self, line, spans, colors, default_color, left, right):
+        """
+        Return the (x, color, QStaticText) runs of line to draw between the x
+        offsets left and right, in order. Lines up to CHUNK_CHARS long are
+        shaped whole and all their runs returned.
+        """
+        if len(line) <= self.CHUNK_CHARS:
+            return self.get(line, spans, colors, default_color).runs
+        offsets = self._column_offsets
+        chunk_chars = self.CHUNK_CHARS
+        # The glyph before left can reach into the range
+        first = max(0, offsets.last_column_within(line, left) - 1) // chunk_chars
+        last = min(len(line) - 1, offsets.last_column_within(line, right)) // chunk_chars
+        runs = []
+        for start in range(first * chunk_chars, (last + 1) * chunk_chars, chunk_chars):
+            end = min(start + chunk_chars, len(line))
+            for column, color, static_text in self._chunk(line[start:end], self._chunk_spans(spans, start, end),
+                                                          colors, default_color):
+                runs.append((offsets.x_for(line, start + column), color, static_text))
+        return runs
+
+    def _chunk(self, text, spans, colors, default_color):
+        key = (text, spans.tobytes())
+        runs = self._chunks.get(key)
+        if runs is not None:
+            self._chunks.move_to_end(key)
+            return runs
+        runs = self._chunks[key] = self._shape_runs(text, spans, colors, default_color)
+        if len(self._chunks) > self.capacity:
+            self._chunks.popitem(last=False)
+        return runs
+
+    @staticmethod
+    def _chunk_spans(spans, start, end):
+        """Return the parts of spans between columns start and end, relative to start."""
+        if not spans:
+            return NO_SPANS
+        # Spans do not overlap, so their ends are in order too
+        k = bisect_right(range(len(spans) // SPAN_FIELDS), start,
+                         key=lambda k: spans[k * SPAN_FIELDS] + spans[k * SPAN_FIELDS + 1]) * SPAN_FIELDS
+        chunk_spans = array('I')
+        while k < len(spans) and spans[k] < end:
+            span_start = max(spans[k], start)
+            span_end = min(spans[k] + spans[k + 1], end)
+            chunk_spans.extend((span_start - start, span_end - span_start, spans[k + 2]))
+            k += SPAN_FIELDS
+        return chunk_spans or NO_SPANS
+
+    def get(self, line, spans, colors, default_color):
+        """Return the RenderedLine for line with the given spans, shaping it if needed."""
+        key = (line, spans.tobytes())
+        rendered = self._lines.get(key)
+        if rendered is not None:
+            self._lines.move_to_end(key)
+            return rendered
+        rendered = self._shape(line, spans, colors, default_color)
+        self._lines[key] = rendered
+        if len(self._lines) > self.capacity:
+            self._lines.popitem(last=False)
+        return rendered
+
+    def _shape(self, line, spans, colors, default_color):
+        x_for = self._column_offsets.x_for
+        runs = [(x_for(line, column), color, static_text)
+                for column, color, static_text in self._shape_runs(line, spans, colors, default_color)]
+        return RenderedLine(runs, x_for(line, len(line)))
+
+    def _shape_runs(self, line, spans, colors, default_color):
+        """Return (start column, color, QStaticText) for every run of line with visible glyphs."""
+        runs = []
+        pos = 0
+        for k in range(0, len(spans), SPAN_FIELDS):
+            start = spans[k]
+            if pos < start:
+                self._add_run(runs, line, pos, start, default_color)
+            pos = start + spans[k + 1]
+            self._add_run(runs, line, start, pos, colors[spans[k + 2]])
+        if pos < len(line):
+            self._add_run(runs, line, pos, len(line), default_color)
+        return runs
+
+    def _add_run(self, runs, line, start, end, color):
+        text = line[start:end]
+        if text.isspace():
+            return
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.TextFormat.PlainText)
+        static_text.setPerformanceHint(QStaticText.PerformanceHint.AggressiveCaching)
+        static_text.prepare(self._transform, self._font)
+        runs.append((start, color, static_text))
@@ -0,0 +1,78 @@
+import heapq
+
+
+def measure_lines(lines, font_metrics, column_offsets):
+    """
+    Return the width of every line: its advance in the font of font_metrics,
+    or where column_offsets places its end if it is too long to measure.
+    """
+    limit = column_offsets.max_measured_chars
+    width = font_metrics.width
+    x_for = column_offsets.x_for
+    return [x_for(text, len(text)) if len(text) > limit else width(text) for text in lines]
+
+
+class LineWidths:
+    """
+    Measured width of every line, with the widest one available at any time.
+
+    Widths are kept in a list that edits splice, and in a counted multiset
+    (width -> number of lines that wide). The largest width in the multiset
+    sits on top of a max-heap; widths no line has any more are only popped
+    when they reach the top. An edit therefore costs O(log n) per
+    touched line, and removing the widest line needs no re-measuring.
+    """
+
+    def __init__(self, widths=()):
+        self.reset(widths)
+
+    def reset(self, widths):
+        """Replace every width, e.g. after the font changed."""
+        self._widths = list(widths)
+        self._counts = {}
+        for width in self._widths:
+            self._counts[width] = self._counts.get(width, 0) + 1
+        self._heap = [-width for width in self._counts]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._widths)
+
+    def __getitem__(self, line):
+        return self._widths[line]
+
+    def __iter__(self):
+        return iter(self._widths)
+
+    def _add(self, width):
+        count = self._counts.get(width, 0)
+        self._counts[width] = count + 1
+        if not count:
+            heapq.heappush(self._heap, -width)
+            if len(self._heap) > 2 * len(self._counts) + 64:
+                # Too many stale widths below the top: rebuild from the live ones
+                self._heap = [-width for width in self._counts]
+                heapq.heapify(self._heap)
+
+    def _remove(self, width):
+        count = self._counts[width] - 1
+        if count:
+            self._counts[width] = count
+        else:
+            del self._counts[width]
+
+    def splice(self, first, removed, widths):
+        """Replace the widths of the removed lines starting at first with widths."""
+        for width in self._widths[first:first + removed]:
+            self._remove(width)
+        for width in widths:
+            self._add(width)
+        self._widths[first:first + removed] = widths
+
+    def max(self):
+        """Return the largest width, or 0 if there are no lines."""
+        heap = self._heap
+        counts = self._counts
+        while heap and -heap[0] not in counts:
+            heapq.heappop(heap)
+        return -heap[0] if heap else 0
@@ -0,0 +1,203 @@
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+# Start columns of a line that fits on one row
+SINGLE_ROW = (0,)
+
+
+class WrapIndex:
+    """
+    Visual rows of soft-wrapped lines.
+
+    Every line has the columns its rows start at, and its row count. Lines
+    no wider than the wrap width are known to take one row. Longer lines are
+    wrapped lazily: until then their row count is estimated from their width.
+    Lines are wrapped when they are painted or when the cursor reaches them,
+    and the rest by reflow() in the background, starting from the top of the
+    view.
+
+    Row counts are also summed per block of BLOCK lines. Mapping between
+    lines and visual rows adds up the block sums and at most one block, and
+    an edit only adds its own blocks up again.
+    """
+
+    BLOCK = 1024
+
+    # Edits inserting more lines than this leave them to be wrapped lazily
+    EAGER_LINES = 256
+
+    def __init__(self, column_offsets):
+        self._column_offsets = column_offsets
+        self.width = None
+        self.changed_from = None  # First line whose estimated row count turned out wrong
+        self._starts = []        # Start columns of each line's rows, or None until wrapped
+        self._pending = 0        # Number of lines not wrapped yet
+        self._next = 0           # Where reflow() looks for them next
+        self._rows = []          # Row count of each line, an estimate until it is wrapped
+        self._block_rows = []    # Row count of each block of lines
+        self._block_first = [0]  # First row of each block, followed by the total
+
+    def reset(self, widths, width, first_line=0):
+        """
+        Estimate the rows of lines with the given widths when wrapped at width
+        pixels. reflow() wraps them from first_line on, then the ones above.
+        """
+        self.width = width
+        self.changed_from = None
+        widths = list(widths)
+        self._starts = [SINGLE_ROW if w <= width else None for w in widths]
+        self._rows = [1 if w <= width else -(-w // width) for w in widths]
+        self._pending = self._starts.count(None)
+        self._next = first_line
+        self._sum_blocks(0)
+
+    def row_count(self):
+        return self._block_first[-1]
+
+    def has_pending(self):
+        """Whether any line still only has estimated rows."""
+        return self._pending > 0
+
+    def is_wrapped(self, line):
+        return self._starts[line] is not None
+
+    def starts(self, line, text):
+        """Return the start columns of the rows of line, whose text is text, wrapping it if needed."""
+        starts = self._starts[line]
+        if starts is None:
+            starts = self._starts[line] = self.wrap(text)
+            self._pending -= 1
+            self._set_rows(line, len(starts))
+        return starts
+
+    def first_row(self, line):
+        """Return the visual row the line starts on."""
+        block = line // self.BLOCK
+        return self._block_first[block] + sum(self._rows[block * self.BLOCK:line])
+
+    def line_at_row(self, row):
+        """Return (line, index of the row within the line) for a visual row."""
+        if row >= self.row_count():
+            line = len(self._rows) - 1
+            return line, self._rows[line] - 1
+        block = bisect_right(self._block_first, row) - 1
+        start = block * self.BLOCK
+        firsts = list(accumulate(self._rows[start:start + self.BLOCK], initial=self._block_first[block]))
+        index = bisect_right(firsts, row) - 1
+        return start + index, row - firsts[index]
+
+    def splice(self, first, removed, inserted, line_text):
+        """
+        Replace the rows of the removed lines starting at first with those of
+        the inserted lines, whose text line_text(line) returns. Return the
+        change in the number of rows.
+        """
+        removed_rows = sum(self._rows[first:first + removed])
+        self._pending -= self._starts[first:first + removed].count(None)
+        if inserted <= self.EAGER_LINES:
+            starts = [self.wrap(line_text(line)) for line in range(first, first + inserted)]
+            rows = [len(line_starts) for line_starts in starts]
+        else:
+            starts = [None] * inserted
+            rows = [1] * inserted
+            self._pending += inserted
+            self._next = min(self._next, first)
+        self._starts[first:first + removed] = starts
+        self._rows[first:first + removed] = rows
+        if inserted == removed:
+            self._sum_blocks(first, first + inserted)
+        else:
+            self._sum_blocks(first)
+        return sum(rows) - removed_rows
+
+    def reflow(self, line_text, budget):
+        """
+        Wrap lines that only have estimated rows for up to budget seconds.
+        Return the first line whose row count changed since the last call, or
+        None if no estimate was wrong.
+        """
+        deadline = time.perf_counter() + budget
+        starts = self._starts
+        while self._pending and time.perf_counter() < deadline:
+            try:
+                line = starts.index(None, self._next)
+            except ValueError:
+                # Past the end: on to the lines above where reflowing started
+                line = starts.index(None)
+            self._next = line
+            self.starts(line, line_text(line))
+        changed_from = self.changed_from
+        self.changed_from = None
+        return changed_from
+
+    def wrap(self, text):
+        """Return the start columns of the rows text wraps into, breaking after spaces where possible."""
+        end = len(text)
+        width = self.width
+        char_width = self._column_offsets.column_width(text)
+        if char_width is not None:
+            if end * char_width <= width:
+                return SINGLE_ROW
+            # Every column is char_width wide: rows hold a fixed number of them
+            per_row = max(1, int(width / char_width))
+            if end > self._column_offsets.max_measured_chars:
+                # Too long to look for spaces in on every edit
+                return tuple(range(0, end, per_row))
+
+            def last_column(start):
+                return min(end, start + per_row)
+        else:
+            # Measure the line once and search its offsets for each row
+            offsets = self._column_offsets.measure(text)
+            if offsets[end] <= width:
+                return SINGLE_ROW
+
+            def last_column(start):
+                return bisect_right(offsets, offsets[start] + width) - 1
+        starts = [0]
+        start = 0
+        while True:
+            column = last_column(start)
+            if column >= end:
+                break
+            if text[column] == ' ':
+                # A space at the edge hangs past it rather than starting the next row
+                column += 1
+            else:
+                space = text.rfind(' ', start, column)
+                if space >= start:
+                    column = space + 1
+            if column >= end:
+                break
+            # Even a single character wider than the row gets a row of its own
+            column = max(column, start + 1)
+            starts.append(column)
+            start = column
+        return tuple(starts)
+
+    def _set_rows(self, line, rows):
+        delta = rows - self._rows[line]
+        if not delta:
+            return
+        if self.changed_from is None or line < self.changed_from:
+            self.changed_from = line
+        self._rows[line] = rows
+        block = line // self.BLOCK
+        self._block_rows[block] += delta
+        self._block_first[block + 1:] = [first + delta for first in self._block_first[block + 1:]]
+
+    def _sum_blocks(self, first_line, end_line=None):
+        """Add up the row counts of the blocks from first_line up to end_line, or to the end."""
+        rows = self._rows
+        block = self.BLOCK
+        first_block = first_line // block
+        if end_line is None:
+            end_block = -(-len(rows) // block)
+        else:
+            end_block = -(-end_line // block)
+        self._block_rows[first_block:end_block] = [sum(rows[start:start + block])
+                                                   for start in range(first_block * block, end_block * block, block)]
+        if end_line is None:
+            del self._block_rows[end_block:]
+        self._block_first = list(accumulate(self._block_rows, initial=0))
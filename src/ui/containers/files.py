@@ -535,41 +535,18 @@ class FileTreeContainer(QWidget):
 
     def open_file_in_tab(self, file_path):
         """
-        Attempt to open a file with different encodings and display it in a new tab.
+        Open a file in a new tab. It is read and decoded in the background, and
+        the tab shows its progress until then.
         """
-        encodings = ['utf-8', 'latin1', 'cp1252', 'ascii']
-        content = None
-        used_encoding = None
-
-        for encoding in encodings:
+        if hasattr(self.main_window, 'load_file_in_tab'):
+            logging.info(f"Opening file in tab: {file_path}")
             try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    used_encoding = encoding
-                    break
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
+                self.main_window.load_file_in_tab(file_path)
+            except OSError as e:
                 QMessageBox.critical(self, "Error", f"Could not open file:\n{e}")
                 logging.error(f"Error opening file '{file_path}': {e}")
-                return
-
-        if content is None:
-            QMessageBox.critical(
-                self,
-                "Error",
-                "Could not decode the file with any supported encoding.\n"
-                "The file might be binary or use an unsupported encoding."
-            )
-            return
-
-        file_name = os.path.basename(file_path)
-        logging.info(f"Opening file in tab: {file_path} (using {used_encoding} encoding)")
-
-        if hasattr(self.main_window, 'add_new_tab'):
-            self.main_window.add_new_tab(content, title=file_name, file_path=file_path)
         else:
-            logging.error("MainWindow does not have add_new_tab method.")
+            logging.error("MainWindow does not have load_file_in_tab method.")
             QMessageBox.critical(self, "Error", "Internal error: Could not open the file in a new tab.")
 
     def rename_item(self, item, path):
@@ -0,0 +1,184 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt6 import sip
+from src.editor.document import write_snapshot
+from .widgets.loading import LoadingPlaceholder
+import logging
+import os
+import shutil
+import tempfile
+
+
+class HibernateJob(QRunnable):
+    """Writes a snapshot of one editor's document and undo history on a pool thread."""
+
+    def __init__(self, hibernator, text_editor, path):
+        super().__init__()
+        self.hibernator = hibernator
+        self.text_editor = text_editor
+        self.path = path
+        # Taken now, so the editor can be checked for changes once it is written
+        self.snapshot = text_editor.buffer.snapshot()
+        self.undo_stack = list(text_editor.undo_stack)
+        self.redo_stack = list(text_editor.redo_stack)
+        self.error = None
+
+    def run(self):
+        try:
+            with open(self.path, 'wb') as file:
+                write_snapshot(file, self.snapshot, self.undo_stack, self.redo_stack)
+        except Exception as e:
+            logging.error(f"Error writing snapshot of '{self.text_editor.file_path}': {e}")
+            self.error = e
+        try:
+            self.hibernator.jobFinished.emit(self)
+        except RuntimeError:
+            pass  # The hibernator was deleted, e.g. on exit
+
+
+class TabHibernator(QObject):
+    """
+    Keeps the memory held by the editors of open tabs within a budget.
+
+    Every editor's memory is estimated from its text, its lines (their
+    index, widths and highlight spans) and its undo and redo history. When
+    the total goes over the budget, unmodified editors in background tabs
+    are hibernated, least recently shown first: their text and undo history
+    are written to a compressed snapshot file on a pool thread, and the
+    editor is then replaced by a LoadingPlaceholder holding the snapshot and
+    the cursor and scroll positions. Showing the tab again restores it from
+    the snapshot through the DocumentLoader, like any other placeholder.
+
+    An editor edited, saved or shown while its snapshot is written is kept.
+    """
+
+    jobFinished = pyqtSignal(object)  # Emitted from the pool thread
+
+    # Rough bytes held per line: its line index entry, width, wrap rows and lexer state
+    LINE_BYTES = 40
+
+    # Added per line of a highlighted editor, for its span array
+    HIGHLIGHTED_LINE_BYTES = 60
+
+    # Held per undo or redo action besides its text
+    ACTION_BYTES = 300
+
+    # Memory the editors of all tabs may hold before background tabs are hibernated
+    DEFAULT_BUDGET_MB = 512
+
+    # Delay after a tab is shown or loaded before memory is checked
+    CHECK_DELAY_MS = 1000
+
+    def __init__(self, main_window, pool=None):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.pool = pool or QThreadPool.globalInstance()
+        self.budget_mb = self.DEFAULT_BUDGET_MB
+        self.last_used = {}  # Editor -> when it was last shown, as a count of tab switches
+        self.clock = 0
+        self.jobs = {}       # Editor -> job writing its snapshot
+        self.directory = None
+        self.check_timer = QTimer(self)
+        self.check_timer.setSingleShot(True)
+        self.check_timer.setInterval(self.CHECK_DELAY_MS)
+        self.check_timer.timeout.connect(self.check)
+        self.jobFinished.connect(self.on_job_finished, Qt.ConnectionType.QueuedConnection)
+
+    def touch(self, text_editor):
+        """Record that text_editor was shown or loaded, and check memory soon."""
+        self.clock += 1
+        self.last_used[text_editor] = self.clock
+        self.check_timer.start()
+
+    @classmethod
+    def memory_usage(cls, text_editor):
+        """Estimate in bytes of the memory held by text_editor's document, spans and undo history."""
+        if text_editor.is_large_file():
+            return 0  # Read from its memory map; nothing to release
+        line_bytes = cls.LINE_BYTES
+        if text_editor.highlighter is not None:
+            line_bytes += cls.HIGHLIGHTED_LINE_BYTES
+        history = text_editor.undo_stack + text_editor.redo_stack
+        return (len(text_editor.buffer) + text_editor.buffer.line_count() * line_bytes
+                + sum(len(action.text) for action in history) + len(history) * cls.ACTION_BYTES)
+
+    def can_hibernate(self, text_editor):
+        main_window = self.main_window
+        return (text_editor.file_path and not text_editor.is_modified and not text_editor.is_large_file()
+                and not text_editor.current_text  # Typing not yet committed to the undo stack
+                and text_editor.parent() is not main_window.tab_widget.currentWidget()
+                and text_editor not in self.jobs
+                and text_editor.buffer not in main_window.pending_saves)
+
+    def check(self):
+        """Hibernate background tabs, least recently shown first, until the budget is met."""
+        text_editors = [text_editor for _, text_editor in self.main_window.text_editors()]
+        usage = {text_editor: self.memory_usage(text_editor) for text_editor in text_editors}
+        # Forget editors of tabs closed since
+        self.last_used = {text_editor: self.last_used.get(text_editor, 0) for text_editor in text_editors}
+        total = sum(usage.values()) - sum(usage[text_editor] for text_editor in self.jobs if text_editor in usage)
+        budget = self.budget_mb * 1024 * 1024
+        if total <= budget:
+            return
+        candidates = sorted(filter(self.can_hibernate, text_editors), key=self.last_used.get)
+        for text_editor in candidates:
+            if total <= budget:
+                break
+            self.hibernate(text_editor)
+            total -= usage[text_editor]
+
+    def hibernate(self, text_editor):
+        """Write a snapshot of text_editor in the background; on_job_finished then releases it."""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='editor-hibernated-')
+        fd, path = tempfile.mkstemp(prefix=f'{os.path.basename(text_editor.file_path)}.', suffix='.snapshot',
+                                    dir=self.directory)
+        os.close(fd)
+        job = HibernateJob(self, text_editor, path)
+        self.jobs[text_editor] = job
+        self.pool.start(job)
+
+    def on_job_finished(self, job):
+        text_editor = job.text_editor
+        self.jobs.pop(text_editor, None)
+        if job.error is None and not sip.isdeleted(text_editor) \
+                and self.can_hibernate(text_editor) \
+                and text_editor.buffer.version == job.snapshot.version \
+                and text_editor.undo_stack == job.undo_stack and text_editor.redo_stack == job.redo_stack:
+            tab = text_editor.parent()
+            if self.main_window.tab_widget.indexOf(tab) != -1:
+                self.release(text_editor, job.path)
+                return
+        self.discard(job.path)
+
+    def release(self, text_editor, snapshot_path):
+        """Replace text_editor with a placeholder that restores it from snapshot_path."""
+        placeholder = LoadingPlaceholder(
+            text_editor.file_path,
+            cursor_position=(text_editor.cursor_line, text_editor.cursor_column),
+            scroll_position={
+                "vertical": text_editor.verticalScrollBar().value(),
+                "horizontal": text_editor.horizontalScrollBar().value()
+            },
+            snapshot_path=snapshot_path
+        )
+        logging.info(f"Hibernated tab: {text_editor.file_path}")
+        text_editor.parent().layout().replaceWidget(text_editor, placeholder)
+        text_editor.highlight_worker.cancel()
+        self.last_used.pop(text_editor, None)
+        text_editor.setParent(None)
+        text_editor.deleteLater()
+
+    def discard(self, snapshot_path):
+        """Delete a snapshot that is no longer needed."""
+        if snapshot_path:
+            try:
+                os.remove(snapshot_path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """Delete every snapshot, e.g. on exit. Snapshots still being written are deleted with them."""
+        self.check_timer.stop()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
@@ -0,0 +1,56 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QProgressBar
+from PyQt6.QtCore import Qt
+from src.editor.themes.theme import Theme
+import os
+
+
+class LoadingPlaceholder(QWidget):
+    """
+    Shown in a tab while its file is read in the background.
+
+    Holds the path and the cursor and scroll positions to give the editor
+    that replaces it. The tab of a hibernated editor also holds the snapshot
+    its text and undo history were written to; see TabHibernator.
+    """
+
+    def __init__(self, file_path, cursor_position=None, scroll_position=None, parent=None, snapshot_path=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.cursor_position = cursor_position
+        self.scroll_position = scroll_position
+        self.snapshot_path = snapshot_path
+
+        self.setAutoFillBackground(True)
+        self.setStyleSheet(f"""
+            QWidget {{
+                background-color: {Theme.EDITOR_BACKGROUND_COLOR.name()};
+                color: {Theme.EDITOR_TEXT_COLOR.name()};
+            }}
+            QProgressBar {{
+                background-color: {Theme.EDITOR_SCROLLBAR_BACKGROUND.name()};
+                border: none;
+                max-height: 4px;
+            }}
+            QProgressBar::chunk {{
+                background-color: {Theme.EDITOR_SCROLLBAR_HANDLE_HOVER.name()};
+            }}
+        """)
+
+        self.label = QLabel(f"Opening {os.path.basename(file_path)}…")
+        self.label.setFont(Theme.get_default_font())
+        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setFixedWidth(Theme.scaled_size(240))
+
+        layout = QVBoxLayout(self)
+        layout.addStretch()
+        layout.addWidget(self.label, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.progress_bar, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addStretch()
+
+    def set_progress(self, fraction):
+        """Show how much of the file has been read, from 0 to 1."""
+        self.progress_bar.setValue(round(fraction * 100))
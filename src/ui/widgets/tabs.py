@@ -6,6 +6,7 @@ from src.editor.themes.theme import Theme
 
 class CustomTabWidget(QWidget):
     tabCloseRequested = pyqtSignal(int)
+    currentChanged = pyqtSignal(int)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -32,6 +33,7 @@ class CustomTabWidget(QWidget):
         self.tab_bar.setFont(Theme.get_tab_font())
         self.tab_bar.tabCloseRequested.connect(self.close_tab)
         self.tab_bar.currentChanged.connect(self.stacked_widget.setCurrentIndex)
+        self.tab_bar.currentChanged.connect(self.currentChanged)
 
     def setup_splitter(self):
         """Set up the splitter to allow resizing the tab bar."""
@@ -66,11 +68,12 @@ class CustomTabWidget(QWidget):
         """Apply custom stylesheets."""
         self.apply_tab_bar_stylesheet()
 
-    def addTab(self, widget, title):
-        """Add a new tab with the given widget and title."""
+    def addTab(self, widget, title, current=True):
+        """Add a new tab with the given widget and title, and make it the current one unless current is False."""
         index = self.stacked_widget.addWidget(widget)
         self.tab_bar.addTab(title)
-        self.setCurrentIndex(index)
+        if current:
+            self.setCurrentIndex(index)
         return index
 
     def removeTab(self, index):
@@ -113,6 +116,14 @@ class CustomTabWidget(QWidget):
         """Set the text of the tab at the specified index."""
         self.tab_bar.setTabText(index, text)
 
+    def tabToolTip(self, index):
+        """Return the tooltip of the tab at the specified index."""
+        return self.tab_bar.tabToolTip(index)
+
+    def setTabToolTip(self, index, text):
+        """Set the tooltip of the tab at the specified index."""
+        self.tab_bar.setTabToolTip(index, text)
+
     def apply_tab_bar_stylesheet(self):
         """Apply custom stylesheet to the tab bar using Theme settings."""
         tab_bar_stylesheet = f"""
@@ -159,6 +159,9 @@ class CustomTitleBar(QWidget):
         save_as_action = self.create_action('Save As...', None, self.parent.save_file_as)
         menu.addAction(save_as_action)
 
+        save_all_action = self.create_action('Save All', 'Ctrl+Shift+S', self.parent.save_all_files)
+        menu.addAction(save_all_action)
+
         menu.addSeparator()
 
         exit_action = self.create_action('Exit', 'Ctrl+Q', self.parent.close)
@@ -187,6 +190,20 @@ class CustomTitleBar(QWidget):
         paste_action = self.create_action('Paste', 'Ctrl+V', self.parent.paste_text)
         menu.addAction(paste_action)
 
+        menu.addSeparator()
+
+        zoom_in_action = self.create_action('Zoom In', 'Ctrl+=', self.parent.zoom_in_editor)
+        menu.addAction(zoom_in_action)
+
+        zoom_out_action = self.create_action('Zoom Out', 'Ctrl+-', self.parent.zoom_out_editor)
+        menu.addAction(zoom_out_action)
+
+        reset_zoom_action = self.create_action('Reset Zoom', 'Ctrl+0', self.parent.reset_zoom_editor)
+        menu.addAction(reset_zoom_action)
+
+        word_wrap_action = self.create_action('Word Wrap', 'Alt+Z', self.parent.toggle_word_wrap)
+        menu.addAction(word_wrap_action)
+
         return menu
 
     def create_selection_menu(self):
@@ -3,13 +3,15 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QMessageBox, QFileDialog, QVBoxLayout, QWidget, QHBoxLayout, QLabel, QSizePolicy, QFrame
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QIcon
 
 # Relative imports for custom widgets and containers
 from .widgets.titlebar import CustomTitleBar
 from .widgets.tabs import CustomTabWidget
 from .widgets.sidebar import Sidebar
+from .widgets.loading import LoadingPlaceholder
+from .hibernator import TabHibernator
 from .containers.base import ContainersManager
 from .containers.files import FileTreeContainer
 from .containers.settings import SettingsContainer
@@ -19,11 +21,16 @@ from src.editor import (
     TextEditor,
     Theme,
     PygmentsSyntaxHighlighter,
+    lexer_registry,
+    cursor_blinker,
     FileOperationsMixin,
     EditActionsMixin,
 )
+from src.editor.rendering import ColumnOffsets
+from src.editor.document import MappedDocument, document_loader, document_saver
 
 import json
+import re
 import os
 import logging
 
@@ -33,6 +40,15 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
     SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".my_text_editor_settings.json")
 
+    # Added to a tab's title while its file is written
+    SAVING_SUFFIX = re.compile(r' \(saving \d+%\)$')
+
+    # Restored tabs on either side of the current one loaded before they are shown
+    PREFETCH_TABS = 3
+
+    # Idle time before the next of them is loaded
+    PREFETCH_DELAY_MS = 300
+
     def __init__(self):
         super().__init__()
 
@@ -51,6 +67,11 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
             ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
         self.setWindowTitle('TextForge')
+
+        # Soft wrap for every editor, toggled from the Edit menu
+        self.word_wrap = False
+        # Lines longer than this are laid out as if the font were monospace
+        self.max_measured_line_length = ColumnOffsets.MAX_MEASURED_CHARS
         self.setGeometry(
             100, 100,
             Theme.scaled_size(Theme.WINDOW_WIDTH),
@@ -123,9 +144,35 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
         # Connect sidebar signals
         self.sidebar.icon_clicked.connect(self.toggle_container)
 
+        # Files are read in the background and shown once loaded
+        document_loader.progress.connect(self.on_file_load_progress)
+        document_loader.finished.connect(self.on_file_loaded)
+
+        # Likewise written; see FileOperationsMixin.on_document_saved
+        self.pending_saves = {}          # Document -> (editor, version) of its latest save
+        self.save_batch = set()          # Documents of a Save All still being written
+        self.save_failures = []          # SaveResults of the batch that could not be written
+        self.close_after_save = set()    # Editors whose tab closes once they are saved
+        self.closing_after_save = False  # Whether the window closes once every save is done
+        document_saver.progress.connect(self.on_save_progress)
+        document_saver.finished.connect(self.on_document_saved)
+
+        # Editors of background tabs are released when they hold too much memory
+        self.tab_hibernator = TabHibernator(self)
+
+        # Restored tabs around the current one are loaded while idle
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(self.PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self.prefetch_tabs)
+
         # Load application settings
         self.load_settings()
 
+        # Restored tabs are loaded once shown; see on_current_tab_changed
+        self.tab_widget.currentChanged.connect(self.on_current_tab_changed)
+        self.on_current_tab_changed(self.tab_widget.currentIndex())
+
     def add_sidebar_icons(self):
         """Add icons to the sidebar and corresponding containers."""
         # Define icons and their corresponding container indices
@@ -159,17 +206,61 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
             self.v_line2.setVisible(False)
             self.containers_manager.setVisible(False)
 
-    def add_new_tab(self, content='', title='Untitled', file_path=None):
-        """Add a new tab with a TextEditor widget."""
+    def find_tab(self, file_path):
+        """Return the index of the tab showing or loading file_path, or -1."""
+        for index in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(index)
+            text_editor = widget.findChild(TextEditor)
+            if text_editor and text_editor.file_path == file_path:
+                return index
+            placeholder = widget.findChild(LoadingPlaceholder)
+            if placeholder and placeholder.file_path == file_path:
+                return index
+        return -1
+
+    def focus_tab(self, index):
+        """Make the tab at index current and give its editor focus."""
+        self.tab_widget.setCurrentIndex(index)
+        text_editor = self.tab_widget.widget(index).findChild(TextEditor)
+        if text_editor:
+            text_editor.setFocus()
+
+    def create_text_editor(self, content='', file_path=None, document=None, loaded=None):
+        """Create a TextEditor from content, a document such as a MappedDocument, or a LoadedFile."""
+        line_widths = None
+        if loaded is not None:
+            document = loaded.buffer
+            if loaded.max_measured_chars == self.max_measured_line_length:
+                line_widths = loaded.line_widths
+        text_editor = TextEditor(content, file_path, self, document=document,  # Pass self to TextEditor
+                                 max_measured_chars=self.max_measured_line_length, line_widths=line_widths)
+        text_editor.modifiedChanged.connect(self.update_tab_title)
+        text_editor.set_word_wrap(self.word_wrap)
+
+        # Set the syntax highlighter based on file extension. Large files
+        # are not highlighted.
+        if loaded is not None:
+            # Already set up, and the first screen lexed, by the loader
+            text_editor.set_highlighter(loaded.highlighter, loaded.highlighted_lines)
+        elif file_path and not text_editor.is_large_file():
+            language = lexer_registry.detect_language(file_path, content)
+            highlighter = PygmentsSyntaxHighlighter(language) if language else None
+            text_editor.set_highlighter(highlighter)
+        else:
+            # Default to plain text (no highlighting)
+            text_editor.set_highlighter(None)
+        return text_editor
+
+    def add_new_tab(self, content='', title='Untitled', file_path=None, document=None):
+        """Add a new tab with a TextEditor widget, showing content or a document such as a MappedDocument."""
         # Check if the file is already open
         if file_path:
-            for index in range(self.tab_widget.count()):
-                widget = self.tab_widget.widget(index)
-                text_editor = widget.findChild(TextEditor)
-                if text_editor and text_editor.file_path == file_path:
-                    self.tab_widget.setCurrentIndex(index)
-                    text_editor.setFocus()  # Set focus to existing TextEditor
-                    return index
+            index = self.find_tab(file_path)
+            if index != -1:
+                if document is not None:
+                    document.close()
+                self.focus_tab(index)
+                return index
 
         # Create a new tab widget
         new_tab = QWidget()
@@ -178,19 +269,7 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
         layout.setSpacing(0)
 
         # Initialize the TextEditor
-        text_editor = TextEditor(content, file_path, self)  # Pass self to TextEditor
-        text_editor.modifiedChanged.connect(self.update_tab_title)
-
-        # Set the syntax highlighter based on file extension
-        if file_path:
-            _, ext = os.path.splitext(file_path)
-            ext = ext.lower().lstrip('.')
-            language = self.get_language_from_extension(ext)
-            highlighter = PygmentsSyntaxHighlighter(language)
-            text_editor.set_highlighter(highlighter)
-        else:
-            # Default to plain text (no highlighting)
-            text_editor.set_highlighter(None)
+        text_editor = self.create_text_editor(content, file_path, document)
 
         # Add the TextEditor to the layout
         layout.addWidget(text_editor)
@@ -201,28 +280,169 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
         text_editor.setFocus()  # Set focus to new TextEditor
         return index
 
+    def load_file_in_tab(self, file_path, cursor_position=None, scroll_position=None):
+        """
+        Open a file in a new tab, or switch to it if it is already open, and
+        return the tab's index. The file is read in the background: the tab
+        shows its progress until the editor replaces it in on_file_loaded.
+        Files too large to load are opened read only at once.
+        """
+        index = self.find_tab(file_path)
+        if index != -1:
+            self.focus_tab(index)
+            self.materialize_tab(index)  # A restored tab that was not shown yet
+            return index
+
+        if MappedDocument.is_large(file_path):
+            index = self.open_large_file(file_path)
+            text_editor = self.tab_widget.widget(index).findChild(TextEditor)
+            self.restore_editor_state(text_editor, cursor_position, scroll_position)
+            return index
+
+        index = self.add_placeholder_tab(file_path, cursor_position, scroll_position)
+        self.tab_widget.setCurrentIndex(index)
+        self.start_loading(self.tab_widget.widget(index).findChild(LoadingPlaceholder))
+        return index
+
+    def add_placeholder_tab(self, file_path, cursor_position=None, scroll_position=None):
+        """
+        Add a tab holding a LoadingPlaceholder for file_path, without loading
+        it or switching to it, and return its index.
+        """
+        new_tab = QWidget()
+        layout = QVBoxLayout(new_tab)
+        layout.setContentsMargins(0, 0, 0, 0)  # Remove margins
+        layout.setSpacing(0)
+        layout.addWidget(LoadingPlaceholder(file_path, cursor_position, scroll_position))
+        return self.tab_widget.addTab(new_tab, os.path.basename(file_path), current=False)
+
+    def start_loading(self, placeholder):
+        """Read the placeholder's file in the background; on_file_loaded replaces it with the editor."""
+        # Lex around the cursor first, where a restored tab will be scrolled to
+        visible = None
+        if placeholder.cursor_position:
+            half = document_loader.FIRST_SCREEN_LINES // 2
+            line = placeholder.cursor_position[0]
+            visible = (max(0, line - half), line + half)
+        document_loader.load(placeholder.file_path, visible, self.max_measured_line_length, placeholder.snapshot_path)
+
+    def unloaded_placeholder(self, index):
+        """Return the LoadingPlaceholder of the tab at index if its file has not started loading, else None."""
+        placeholder = self.tab_widget.widget(index).findChild(LoadingPlaceholder)
+        if placeholder is None or document_loader.is_loading(placeholder.file_path):
+            return None
+        return placeholder
+
+    def materialize_tab(self, index):
+        """Load the file of a restored tab that has not been loaded yet. Files too large to load are opened at once."""
+        placeholder = self.unloaded_placeholder(index)
+        if placeholder is None:
+            return
+        file_path = placeholder.file_path
+        if not MappedDocument.is_large(file_path):
+            self.start_loading(placeholder)
+            return
+        try:
+            document = MappedDocument(file_path)
+        except OSError as e:
+            logging.error(f"Error opening file '{file_path}': {e}")
+            self.tab_widget.removeTab(index)
+            QMessageBox.critical(self, "Error", f"Could not open file:\n{e}")
+            return
+        self.replace_placeholder(placeholder, self.create_text_editor(file_path=file_path, document=document))
+        self.tab_widget.setTabToolTip(index, self.large_file_tooltip(file_path))
+
+    def on_current_tab_changed(self, index):
+        if index != -1:
+            self.materialize_tab(index)
+            self.prefetch_timer.start()
+            text_editor = self.tab_widget.widget(index).findChild(TextEditor)
+            if text_editor:
+                self.tab_hibernator.touch(text_editor)
+
+    def prefetch_tabs(self):
+        """
+        Load the nearest restored tab around the current one that is not
+        loaded yet, one at a time while nothing else loads, so switching to
+        a neighbouring tab usually finds it ready. Tabs further away are only
+        loaded when shown.
+        """
+        if document_loader.jobs:
+            return  # Tried again once the file being loaded is shown; see on_file_loaded
+        current = self.tab_widget.currentIndex()
+        for distance in range(1, self.PREFETCH_TABS + 1):
+            for index in (current + distance, current - distance):
+                if 0 <= index < self.tab_widget.count():
+                    placeholder = self.unloaded_placeholder(index)
+                    # Hibernated tabs are only restored when shown
+                    if placeholder and not placeholder.snapshot_path:
+                        self.materialize_tab(index)
+                        return
+
+    def find_placeholder(self, file_path):
+        """Return the LoadingPlaceholder of the tab loading file_path, or None."""
+        index = self.find_tab(file_path)
+        if index == -1:
+            return None
+        return self.tab_widget.widget(index).findChild(LoadingPlaceholder)
+
+    def on_file_load_progress(self, file_path, fraction):
+        placeholder = self.find_placeholder(file_path)
+        if placeholder:
+            placeholder.set_progress(fraction)
+
+    def on_file_loaded(self, loaded):
+        """Replace the placeholder of a file that finished loading with its editor."""
+        placeholder = self.find_placeholder(loaded.path)
+        if placeholder is None:
+            return  # The tab was closed meanwhile
+        index = self.tab_widget.indexOf(placeholder.parentWidget())
+        snapshot_path, placeholder.snapshot_path = placeholder.snapshot_path, None
+        self.tab_hibernator.discard(snapshot_path)
+        if loaded.error and snapshot_path:
+            # The file was unmodified when its tab was hibernated; only its undo history is lost
+            logging.warning(f"Reopening {loaded.path} from disk instead of its snapshot")
+            self.start_loading(placeholder)
+            return
+        if loaded.error:
+            self.tab_widget.removeTab(index)
+            QMessageBox.critical(self, "Error", loaded.error)
+            return
+
+        text_editor = self.create_text_editor(file_path=loaded.path, loaded=loaded)
+        if loaded.undo_stack is not None:
+            # Restored from hibernation
+            text_editor.undo_stack = loaded.undo_stack
+            text_editor.redo_stack = loaded.redo_stack
+        self.replace_placeholder(placeholder, text_editor)
+        logging.info(f"Opened file in tab: {loaded.path} ({loaded.buffer.file_format})")
+        self.prefetch_timer.start()
+        self.tab_hibernator.touch(text_editor)
+
+    def replace_placeholder(self, placeholder, text_editor):
+        """Show text_editor in the placeholder's tab instead, where the placeholder's file was left."""
+        tab = placeholder.parentWidget()
+        tab.layout().replaceWidget(placeholder, text_editor)
+        self.restore_editor_state(text_editor, placeholder.cursor_position, placeholder.scroll_position)
+        placeholder.setParent(None)
+        placeholder.deleteLater()
+        if self.tab_widget.currentWidget() is tab:
+            text_editor.setFocus()
+
+    def restore_editor_state(self, text_editor, cursor_position=None, scroll_position=None):
+        """Put the cursor and scroll bars back where they were when the tab was last saved."""
+        if cursor_position:
+            line = min(cursor_position[0], text_editor.buffer.line_count() - 1)
+            column = min(cursor_position[1], text_editor.buffer.line_length(line))
+            text_editor.cursor_line = line
+            text_editor.cursor_column = column
+        if scroll_position:
+            text_editor.verticalScrollBar().setValue(scroll_position.get("vertical", 0))
+            text_editor.horizontalScrollBar().setValue(scroll_position.get("horizontal", 0))
+
     def get_language_from_extension(self, ext):
         """Map file extensions to Pygments lexer names."""
-        extension_mapping = {
-            'py': 'python',
-            'js': 'javascript',
-            'html': 'html',
-            'css': 'css',
-            'cpp': 'cpp',
-            'c': 'c',
-            'java': 'java',
-            'json': 'json',
-            'xml': 'xml',
-            'md': 'markdown',
-            'yaml': 'yaml',
-            'yml': 'yaml',
-            'php': 'php',
-            'rb': 'ruby',
-            'go': 'go',
-            'rs': 'rust',
-            # Add more extensions as needed
-        }
-        return extension_mapping.get(ext, None)
+        return lexer_registry.language_for_extension(ext)
 
     def new_file(self):
         """Create a new file in a new tab."""
@@ -240,44 +460,45 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
                 QMessageBox.StandardButton.Save
             )
             if reply == QMessageBox.StandardButton.Save:
-                # Save the file
-                if text_editor.file_path:
-                    try:
-                        with open(text_editor.file_path, 'w', encoding='utf-8') as file:
-                            file.write(text_editor.toPlainText())
-                        text_editor.set_modified(False)
-                        self.update_tab_title(text_editor)
-                    except Exception as e:
-                        QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
-                        return  # Do not close the tab
-                else:
+                if not text_editor.file_path:
                     file_path, _ = QFileDialog.getSaveFileName(
                         self, "Save File As", "Untitled.txt", "Text Files (*.txt);;All Files (*)"
                     )
-                    if file_path:
-                        try:
-                            with open(file_path, 'w', encoding='utf-8') as file:
-                                file.write(text_editor.toPlainText())
-                            text_editor.file_path = file_path
-                            text_editor.set_modified(False)
-                            self.tab_widget.setTabText(index, os.path.basename(file_path))
-                        except Exception as e:
-                            QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
-                    else:
+                    if not file_path:
                         return  # Do not close the tab
+                    text_editor.file_path = file_path
+                    self.tab_widget.setTabText(index, os.path.basename(file_path))
+                # Closed by on_document_saved once written, or kept open if that fails
+                self.close_after_save.add(text_editor)
+                self.save_editor(text_editor)
+                return
             elif reply == QMessageBox.StandardButton.Cancel:
                 return  # Do not close the tab
             elif reply == QMessageBox.StandardButton.Discard:
                 pass  # Proceed to close the tab
 
+        placeholder = widget.findChild(LoadingPlaceholder)
+        if placeholder:
+            document_loader.cancel(placeholder.file_path)
+            self.tab_hibernator.discard(placeholder.snapshot_path)
+
         self.tab_widget.removeTab(index)
         widget.deleteLater()
+        if text_editor and text_editor.is_large_file():
+            # Release the mapping now rather than whenever the editor is collected
+            text_editor.buffer.close()
 
     def change_tab(self, index):
         """Change the current tab."""
         if index != -1:
             self.tab_widget.setCurrentIndex(index)
 
+    def on_save_progress(self, file_path, fraction):
+        index = self.find_tab(file_path)
+        if index != -1:
+            title = self.SAVING_SUFFIX.sub('', self.tab_widget.tabText(index))
+            self.tab_widget.setTabText(index, f"{title} (saving {int(fraction * 100)}%)")
+
     def update_tab_title(self, text_editor):
         """Update the tab title based on the TextEditor instance."""
         index = self.tab_widget.indexOf(text_editor.parent())
@@ -285,7 +506,7 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
             return
 
         current_title = self.tab_widget.tabText(index)
-        title = current_title.rstrip('*').strip()
+        title = self.SAVING_SUFFIX.sub('', current_title).rstrip('*').strip()
 
         if text_editor.is_modified:
             new_title = f"{title}*"
@@ -312,6 +533,12 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
                 "expanded_paths": [],
                 "visible": False
             },
+            "editor": {
+                "cursor_blink": cursor_blinker.enabled,
+                "word_wrap": self.word_wrap,
+                "max_measured_line_length": self.max_measured_line_length,
+                "memory_budget_mb": self.tab_hibernator.budget_mb
+            },
             "open_tabs": []
         }
 
@@ -339,6 +566,15 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
                 }
                 if text_editor.file_path:  # Only save if it's a real file
                     settings["open_tabs"].append(tab_data)
+                continue
+            placeholder = widget.findChild(LoadingPlaceholder)
+            if placeholder:
+                # Not loaded yet, or hibernated; keep what it was restored with
+                settings["open_tabs"].append({
+                    "file_path": placeholder.file_path,
+                    "cursor_position": placeholder.cursor_position,
+                    "scroll_position": placeholder.scroll_position or {}
+                })
 
         try:
             os.makedirs(os.path.dirname(self.SETTINGS_FILE), exist_ok=True)
@@ -367,6 +603,14 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
                     if geometry.get("maximized", False):
                         self.showMaximized()
 
+            # Blinking can be turned off for low-power or remote sessions
+            cursor_blinker.set_enabled(settings.get("editor", {}).get("cursor_blink", True))
+            self.word_wrap = settings.get("editor", {}).get("word_wrap", False)
+            self.max_measured_line_length = settings.get("editor", {}).get(
+                "max_measured_line_length", ColumnOffsets.MAX_MEASURED_CHARS)
+            self.tab_hibernator.budget_mb = settings.get("editor", {}).get(
+                "memory_budget_mb", TabHibernator.DEFAULT_BUDGET_MB)
+
             # Restore File Tree State
             if "file_tree" in settings:
                 file_tree_settings = settings["file_tree"]
@@ -385,57 +629,32 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
             while self.tab_widget.count() > 0:
                 self.tab_widget.removeTab(0)
 
-            # Restore Open Tabs
+            # Restore Open Tabs. Only placeholders are created here; a file is
+            # loaded when its tab is first shown, or by prefetch_tabs
             restored_tabs = []
+            restored_paths = set()
             for tab_data in settings.get("open_tabs", []):
                 file_path = tab_data.get("file_path")
+                if file_path in restored_paths:
+                    continue
                 if file_path and os.path.exists(file_path) and os.path.isfile(file_path):
                     try:
-                        # Read file content
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            content = file.read()
-
-                        # Create new tab without focusing it yet
-                        index = self.add_new_tab(
-                            content=content,
-                            title=os.path.basename(file_path),
-                            file_path=file_path
+                        index = self.add_placeholder_tab(
+                            file_path,
+                            cursor_position=tab_data.get("cursor_position"),
+                            scroll_position=tab_data.get("scroll_position", {})
                         )
-
-                        if index >= 0:
-                            widget = self.tab_widget.widget(index)
-                            text_editor = widget.findChild(TextEditor)
-                            if text_editor:
-                                # Restore cursor position
-                                cursor_pos = tab_data.get("cursor_position")
-                                if cursor_pos:
-                                    line = min(cursor_pos[0], len(text_editor.lines) - 1)
-                                    column = min(cursor_pos[1], len(text_editor.lines[line]))
-                                    text_editor.cursor_line = line
-                                    text_editor.cursor_column = column
-
-                                # Restore scroll position
-                                scroll_pos = tab_data.get("scroll_position", {})
-                                if scroll_pos:
-                                    text_editor.verticalScrollBar().setValue(scroll_pos.get("vertical", 0))
-                                    text_editor.horizontalScrollBar().setValue(scroll_pos.get("horizontal", 0))
-
-                                restored_tabs.append(index)
-                                text_editor.set_modified(False)  # Mark as unmodified after loading
+                        restored_tabs.append(index)
+                        restored_paths.add(file_path)
 
                     except Exception as e:
-                        logging.error(f"Error loading tab for '{file_path}': {e}")
+                        logging.error(f"Error restoring tab for '{file_path}': {e}")
                 else:
                     logging.warning(f"File '{file_path}' does not exist or is not accessible")
 
             # Set focus to the first tab if any were restored
             if restored_tabs:
-                self.tab_widget.setCurrentIndex(restored_tabs[0])
-                current_widget = self.tab_widget.currentWidget()
-                if current_widget:
-                    text_editor = current_widget.findChild(TextEditor)
-                    if text_editor:
-                        text_editor.setFocus()
+                self.focus_tab(restored_tabs[0])
             else:
                 # If no tabs were restored, create a new empty tab
                 self.new_file()
@@ -459,3 +678,4 @@ class MainWindow(FileOperationsMixin, EditActionsMixin, QMainWindow):
         if event.isAccepted():
             # Save settings before closing
             self.save_settings()
+            self.tab_hibernator.shutdown()